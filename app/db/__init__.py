@@ -4,6 +4,7 @@ from config import Config
 from .main_db import MainDb
 from .main_db import DbPersist
 from .media_db import MediaDb
+from .media_db import MediaSyncWriter
 from alembic.config import Config as AlembicConfig
 from alembic.command import upgrade as alembic_upgrade
 
@@ -24,6 +25,7 @@ def init_data():
     """
     log.console('开始初始化数据...')
     MainDb().init_data()
+    MainDb().init_fts()
     log.console('数据初始化完成')
 
 
@@ -12,6 +12,11 @@ from app.utils import ExceptionUtils, PathUtils
 from config import Config
 
 lock = threading.Lock()
+# 全文索引表 -> (内容表, 索引字段)，使用 trigram 分词，支持任意位置的子串匹配
+FTS_TABLES = {
+    "TRANSFER_HISTORY_FTS": ("TRANSFER_HISTORY", ["SOURCE_FILENAME", "TITLE"]),
+    "TRANSFER_UNKNOWN_FTS": ("TRANSFER_UNKNOWN", ["PATH"]),
+}
 _Engine = create_engine(
     f"sqlite:///{os.path.join(Config().get_config_path(), 'user.db')}",
     echo=False,
@@ -36,6 +41,8 @@ def _set_sqlite_pragma(dbapi_connection, connection_record):
 
 
 class MainDb:
+    # SQLite 是否支持并已建立FTS5全文索引
+    fts_enabled = False
 
     @property
     def session(self):
@@ -82,6 +89,44 @@ class MainDb:
             config['app']['init_files'] = init_files
             Config().save_config(config)
 
+    def init_fts(self):
+        """
+        建立FTS5全文索引及同步触发器，索引或触发器缺失时（首次建立、迁移重建表后）重建索引数据
+        """
+        with lock:
+            try:
+                with _Engine.begin() as conn:
+                    for fts_table, (table, columns) in FTS_TABLES.items():
+                        self.__create_fts(conn, fts_table, table, columns)
+                MainDb.fts_enabled = True
+            except Exception as err:
+                MainDb.fts_enabled = False
+                print(f"全文索引不可用，使用LIKE查询：{str(err)}")
+
+    @staticmethod
+    def __create_fts(conn, fts_table, table, columns):
+        names = {row[0] for row in conn.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND tbl_name IN (?, ?)",
+            (table, fts_table))}
+        triggers = [f"{fts_table}_AI", f"{fts_table}_AD", f"{fts_table}_AU"]
+        if fts_table in names and all(trigger in names for trigger in triggers):
+            return
+        cols = ", ".join(columns)
+        new_cols = ", ".join(f"new.{col}" for col in columns)
+        old_cols = ", ".join(f"old.{col}" for col in columns)
+        conn.exec_driver_sql(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                             f"{cols}, content='{table}', content_rowid='ID', tokenize='trigram')")
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AI AFTER INSERT ON {table} BEGIN "
+                             f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.ID, {new_cols}); END")
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AD AFTER DELETE ON {table} BEGIN "
+                             f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) "
+                             f"VALUES ('delete', old.ID, {old_cols}); END")
+        conn.exec_driver_sql(f"CREATE TRIGGER IF NOT EXISTS {fts_table}_AU AFTER UPDATE OF {cols} ON {table} BEGIN "
+                             f"INSERT INTO {fts_table}({fts_table}, rowid, {cols}) "
+                             f"VALUES ('delete', old.ID, {old_cols}); "
+                             f"INSERT INTO {fts_table}(rowid, {cols}) VALUES (new.ID, {new_cols}); END")
+        conn.exec_driver_sql(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+
     def insert(self, data):
         """
         插入数据
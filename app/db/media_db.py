@@ -4,14 +4,14 @@ import threading
 import time
 
 from cachetools import cached, TTLCache
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, insert
 from sqlalchemy.orm import sessionmaker, scoped_session
 from sqlalchemy.pool import NullPool
 from sqlalchemy.exc import OperationalError
 
 from app.db.models import BaseMedia, MEDIASYNCITEMS, MEDIASYNCSTATISTIC
 from app.utils import ExceptionUtils
-from config import Config
+from config import Config, MEDIA_SYNC_BATCH_SIZE
 
 lock = threading.Lock()
 _Engine = create_engine(
@@ -91,6 +91,65 @@ class MediaDb:
             self.session.rollback()
         return False
 
+    def bulk_upsert(self, server_type, items):
+        """
+        批量写入媒体项目，在一个事务中删除同ITEM_ID的旧记录后插入
+        :param items: (iteminfo, seasoninfo) 列表
+        """
+        if not server_type or not items:
+            return False
+        rows = {}
+        for iteminfo, seasoninfo in items:
+            if not iteminfo:
+                continue
+            rows[iteminfo.get("id")] = {
+                "SERVER": server_type,
+                "LIBRARY": iteminfo.get("library"),
+                "ITEM_ID": iteminfo.get("id"),
+                "ITEM_TYPE": iteminfo.get("type"),
+                "TITLE": iteminfo.get("title"),
+                "ORGIN_TITLE": iteminfo.get("originalTitle"),
+                "YEAR": iteminfo.get("year"),
+                "TMDBID": iteminfo.get("tmdbid"),
+                "IMDBID": iteminfo.get("imdbid"),
+                "PATH": iteminfo.get("path"),
+                "JSON": json.dumps(seasoninfo)
+            }
+        if not rows:
+            return False
+        try:
+            self.session.query(MEDIASYNCITEMS).filter(MEDIASYNCITEMS.SERVER == server_type,
+                                                      MEDIASYNCITEMS.ITEM_ID.in_(list(rows.keys()))
+                                                      ).delete(synchronize_session=False)
+            self.session.execute(insert(MEDIASYNCITEMS), list(rows.values()))
+            self.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
+    def delete_except(self, server_type, item_ids):
+        """
+        删除媒体服务器中ITEM_ID不在item_ids中的记录，即本次同步未出现的旧记录
+        :param item_ids: 本次同步写入的ITEM_ID集合（字符串）
+        """
+        if not server_type:
+            return False
+        try:
+            stale_ids = [row.ID for row in self.session.query(MEDIASYNCITEMS.ID, MEDIASYNCITEMS.ITEM_ID).filter(
+                MEDIASYNCITEMS.SERVER == server_type) if str(row.ITEM_ID) not in item_ids]
+            for i in range(0, len(stale_ids), MEDIA_SYNC_BATCH_SIZE):
+                self.session.query(MEDIASYNCITEMS).filter(
+                    MEDIASYNCITEMS.ID.in_(stale_ids[i:i + MEDIA_SYNC_BATCH_SIZE])
+                ).delete(synchronize_session=False)
+            self.commit()
+            return True
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self.session.rollback()
+        return False
+
     def empty(self, server_type=None, library=None):
         try:
             if server_type and library:
@@ -157,5 +216,54 @@ class MediaDb:
         return self.session.query(MEDIASYNCSTATISTIC).filter(MEDIASYNCSTATISTIC.SERVER == server_type).first()
 
 
+class MediaSyncWriter(object):
+    """
+    媒体库批量同步写入器，项目按批写入，每批一个事务并立即提交，不会长时间占用写锁
+    同步期间读取方仍能查到旧数据，完成后删除本次同步未出现的旧记录
+    """
+
+    def __init__(self, server_type, batch_size=MEDIA_SYNC_BATCH_SIZE):
+        self._mediadb = MediaDb()
+        self._server_type = server_type
+        self._batch_size = batch_size
+        self._items = []
+        # 已添加的项目数
+        self.count = 0
+        # 是否有批次写入失败，失败时保留旧记录
+        self._failed = False
+        # 本次同步写入的ITEM_ID，完成时删除其它记录
+        # 不能以记录ID作水位：ID不是AUTOINCREMENT，删除最大ID后重新插入的记录会复用旧ID
+        self._item_ids = set()
+
+    def add(self, iteminfo, seasoninfo):
+        """
+        添加一个媒体项目，达到批量大小时写入
+        """
+        self._items.append((iteminfo, seasoninfo))
+        self._item_ids.add(str(iteminfo.get("id")))
+        self.count += 1
+        if len(self._items) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        写入缓存的媒体项目
+        """
+        if not self._items:
+            return
+        items, self._items = self._items, []
+        if not self._mediadb.bulk_upsert(server_type=self._server_type, items=items):
+            self._failed = True
+
+    def finish(self):
+        """
+        写入剩余项目并删除本次同步未出现的旧记录
+        """
+        self.flush()
+        if self._failed:
+            return
+        self._mediadb.delete_except(server_type=self._server_type, item_ids=self._item_ids)
+
+
 def remove_session():
     _Session.remove()
@@ -153,6 +153,9 @@ class DOWNLOADER(Base):
 
 class DOWNLOADHISTORY(Base):
     __tablename__ = 'DOWNLOAD_HISTORY'
+    __table_args__ = (
+        Index('INDX_DOWNLOAD_HISTORY_TITLE_DATE', 'TITLE', 'DATE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     TITLE = Column(Text, index=True)
@@ -564,6 +567,9 @@ class USERRSSTASKHISTORY(Base):
 
 class PLUGINHISTORY(Base):
     __tablename__ = 'PLUGIN_HISTORY'
+    __table_args__ = (
+        Index('INDX_PLUGIN_HISTORY_PID_DATE', 'PLUGIN_ID', 'DATE'),
+    )
 
     ID = Column(Integer, Sequence('ID'), primary_key=True)
     PLUGIN_ID = Column(Text, index=True)
@@ -1399,11 +1399,11 @@ class Downloader:
         except Exception as e:
             print(str(e))
 
-    def get_download_history(self, date=None, hid=None, num=30, page=1):
+    def get_download_history(self, date=None, hid=None, num=30, page=1, after=None):
         """
         获取下载历史记录
         """
-        return self.dbhelper.get_download_history(date=date, hid=hid, num=num, page=page)
+        return self.dbhelper.get_download_history(date=date, hid=hid, num=num, page=page, after=after)
 
     def get_download_history_by_title(self, title):
         """
@@ -1351,11 +1351,11 @@ class FileTransfer:
         """
         return self.dbhelper.get_transfer_info_by_id(logid=logid)
 
-    def get_transfer_history(self, search, page, rownum):
+    def get_transfer_history(self, search, page, rownum, after=None):
         """
         查询转移历史记录
         """
-        return self.dbhelper.get_transfer_history(search=search, page=page, rownum=rownum)
+        return self.dbhelper.get_transfer_history(search=search, page=page, rownum=rownum, after=after)
 
     def get_transfer_history_grouped(self, search, page, rownum):
         """
@@ -1435,11 +1435,11 @@ class FileTransfer:
         """
         return self.dbhelper.get_transfer_unknown_paths()
 
-    def get_transfer_unknown_paths_by_page(self, search, page, rownum):
+    def get_transfer_unknown_paths_by_page(self, search, page, rownum, after=None):
         """
         查询未知转移记录
         """
-        return self.dbhelper.get_transfer_unknown_paths_by_page(search=search, page=page, rownum=rownum)
+        return self.dbhelper.get_transfer_unknown_paths_by_page(search=search, page=page, rownum=rownum, after=after)
 
 
 if __name__ == "__main__":
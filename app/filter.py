@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 import log
 from app.conf import ModuleConf
@@ -9,12 +10,156 @@ from app.utils.commons import singleton
 from app.utils.types import MediaType
 
 
+@lru_cache(maxsize=512)
+def compile_filter_pattern(pattern):
+    """
+    编译并缓存过滤条件中的正则表达式（忽略大小写），编译失败时抛出异常
+    """
+    return re.compile(r"%s" % pattern, re.I)
+
+
+class RuleGroupMatcher(object):
+    """
+    预编译的过滤规则组，规则变化时由 Filter 重新生成
+    """
+    # 规则组信息
+    group = {}
+    # 预编译的规则
+    rules = []
+
+    def __init__(self, group, rules):
+        self.group = group or {}
+        self.rules = [self.__compile_rule(rule) for rule in rules]
+
+    @staticmethod
+    def __try(func, *args):
+        """
+        预处理规则，出错时保存异常，在匹配到该项时再抛出，与逐条处理时的行为一致
+        """
+        try:
+            return func(*args)
+        except Exception as err:
+            return err
+
+    @staticmethod
+    def __parse_size(sizes):
+        """
+        解析大小范围，单位GB
+        """
+        if sizes.find(',') != -1:
+            sizes = sizes.split(',')
+            if sizes[0].isdigit():
+                begin_size = int(sizes[0].strip())
+            else:
+                begin_size = 0
+            if sizes[1].isdigit():
+                end_size = int(sizes[1].strip())
+            else:
+                end_size = 0
+        else:
+            begin_size = 0
+            if sizes.isdigit():
+                end_size = int(sizes.strip())
+            else:
+                end_size = 0
+        return begin_size, end_size
+
+    @staticmethod
+    def __parse_free(free):
+        """
+        解析促销的上传、下载因子
+        """
+        ul_factor, dl_factor = free.split()
+        return float(ul_factor), float(dl_factor)
+
+    def __compile_rule(self, filter_info):
+        return {
+            "info": filter_info,
+            "order_seq": self.__try(lambda: 100 - int(filter_info.get('pri'))),
+            "include": [self.__try(compile_filter_pattern, include.strip())
+                        for include in filter_info.get('include') or [] if include],
+            "exclude": [self.__try(compile_filter_pattern, exclude.strip())
+                        for exclude in filter_info.get('exclude') or [] if exclude],
+            "size": self.__try(self.__parse_size, filter_info.get('size')) if filter_info.get('size') else None,
+            "free": self.__try(self.__parse_free, filter_info.get('free')) if filter_info.get('free') else None
+        }
+
+    @staticmethod
+    def __value(value):
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def match(self, meta_info, title):
+        """
+        检查种子是否匹配规则组
+        :param meta_info: 识别的信息
+        :param title: 过滤使用的文本
+        :return: 是否匹配，匹配的优先值，规则组名称
+        """
+        # 命中优先级
+        order_seq = 0
+        # 当前规则组是否命中
+        group_match = True
+        for rule in self.rules:
+            try:
+                # 当前规则是否命中
+                rule_match = True
+                # 命中规则的序号
+                order_seq = self.__value(rule.get("order_seq"))
+                # 必须包括的项
+                for include in rule.get("include"):
+                    if not self.__value(include).search(title):
+                        rule_match = False
+                        break
+                # 不能包含的项，全部命中时不匹配
+                excludes = rule.get("exclude")
+                if excludes and rule_match:
+                    exclude_flag = False
+                    for exclude in excludes:
+                        if not self.__value(exclude).search(title):
+                            exclude_flag = True
+                    if not exclude_flag:
+                        rule_match = False
+                # 大小
+                if rule.get("size") is not None and rule_match and meta_info.size:
+                    meta_info.size = StringUtils.num_filesize(meta_info.size)
+                    begin_size, end_size = self.__value(rule.get("size"))
+                    if meta_info.type == MediaType.MOVIE:
+                        if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                            rule_match = False
+                    else:
+                        if meta_info.total_episodes \
+                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
+                            rule_match = False
+                # 促销
+                if rule.get("free") is not None \
+                        and meta_info.upload_volume_factor is not None \
+                        and meta_info.download_volume_factor is not None:
+                    ul_factor, dl_factor = self.__value(rule.get("free"))
+                    if ul_factor > meta_info.upload_volume_factor \
+                            or dl_factor < meta_info.download_volume_factor:
+                        rule_match = False
+
+                if rule_match:
+                    return True, order_seq, self.group.get("name")
+                else:
+                    group_match = False
+            except Exception as err:
+                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{rule.get('info')}")
+        if not group_match:
+            return False, 0, self.group.get("name")
+        return True, order_seq, self.group.get("name")
+
+
 @singleton
 class Filter:
     rg_matcher = None
     dbhelper = None
     _groups = []
     _rules = []
+    # 规则组ID -> 预编译的规则组
+    _matchers = {}
 
     def __init__(self):
         self.init_config()
@@ -24,6 +169,7 @@ class Filter:
         self.rg_matcher = ReleaseGroupsMatcher()
         self._groups = self.get_filter_group()
         self._rules = self.get_filter_rule()
+        self._matchers = {}
 
     def get_rule_groups(self, groupid=None, default=False):
         """
@@ -110,94 +256,30 @@ class Filter:
         if meta_info.subtitle:
             title = f"{title} {meta_info.subtitle}"
         # 过滤规则组
+        matcher = self.get_rule_matcher(rulegroup)
+        if not matcher:
+            return True, 0, "未配置过滤规则"
+        return matcher.match(meta_info, title)
+
+    def get_rule_matcher(self, rulegroup=None):
+        """
+        获取预编译的过滤规则组，过滤规则变化时重新生成
+        :param rulegroup: 规则组ID，为空时使用默认规则组
+        :return: RuleGroupMatcher，未配置默认规则组时返回None
+        """
+        key = str(rulegroup) if rulegroup else None
+        matcher = self._matchers.get(key)
+        if matcher:
+            return matcher
         if not rulegroup:
-            rulegroup = self.get_rule_groups(default=True)
-            if not rulegroup:
-                return True, 0, "未配置过滤规则"
+            group = self.get_rule_groups(default=True)
+            if not group:
+                return None
         else:
-            rulegroup = self.get_rule_groups(groupid=rulegroup)
-        filters = self.get_rules(groupid=rulegroup.get("id"))
-        # 命中优先级
-        order_seq = 0
-        # 当前规则组是否命中
-        group_match = True
-        for filter_info in filters:
-            try:
-                # 当前规则是否命中
-                rule_match = True
-                # 命中规则的序号
-                order_seq = 100 - int(filter_info.get('pri'))
-                # 必须包括的项
-                includes = filter_info.get('include')
-                if includes and rule_match:
-                    include_flag = True
-                    for include in includes:
-                        if not include:
-                            continue
-                        if not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
-                            include_flag = False
-                            break
-                    if not include_flag:
-                        rule_match = False
-
-                # 不能包含的项
-                excludes = filter_info.get('exclude')
-                if excludes and rule_match:
-                    exclude_flag = False
-                    exclude_count = 0
-                    for exclude in excludes:
-                        if not exclude:
-                            continue
-                        exclude_count += 1
-                        if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
-                            exclude_flag = True
-                    if exclude_count > 0 and not exclude_flag:
-                        rule_match = False
-                # 大小
-                sizes = filter_info.get('size')
-                if sizes and rule_match and meta_info.size:
-                    meta_info.size = StringUtils.num_filesize(meta_info.size)
-                    if sizes.find(',') != -1:
-                        sizes = sizes.split(',')
-                        if sizes[0].isdigit():
-                            begin_size = int(sizes[0].strip())
-                        else:
-                            begin_size = 0
-                        if sizes[1].isdigit():
-                            end_size = int(sizes[1].strip())
-                        else:
-                            end_size = 0
-                    else:
-                        begin_size = 0
-                        if sizes.isdigit():
-                            end_size = int(sizes.strip())
-                        else:
-                            end_size = 0
-                    if meta_info.type == MediaType.MOVIE:
-                        if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
-                            rule_match = False
-                    else:
-                        if meta_info.total_episodes \
-                                and not begin_size * 1024 ** 3 <= int(meta_info.size) / int(meta_info.total_episodes) <= end_size * 1024 ** 3:
-                            rule_match = False
-
-                # 促销
-                free = filter_info.get("free")
-                if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
-                    ul_factor, dl_factor = free.split()
-                    if float(ul_factor) > meta_info.upload_volume_factor \
-                            or float(dl_factor) < meta_info.download_volume_factor:
-                        rule_match = False
-
-                if rule_match:
-                    return True, order_seq, rulegroup.get("name")
-                else:
-                    group_match = False
-            except Exception as err:
-                log.error(f"【Filter】过滤规则出现严重错误 {err}，请检查：{filter_info}")
-        if not group_match:
-            return False, 0, rulegroup.get("name")
-        return True, order_seq, rulegroup.get("name")
+            group = self.get_rule_groups(groupid=rulegroup)
+        matcher = RuleGroupMatcher(group=group, rules=self.get_rules(groupid=group.get("id")))
+        self._matchers[key] = matcher
+        return matcher
 
     def is_rule_free(self, rulegroup=None):
         """
@@ -264,14 +346,14 @@ class Filter:
             restype_re = ModuleConf.TORRENT_SEARCH_PARAMS["restype"].get(filter_args.get("restype"))
             if not meta_info.get_edtion_string():
                 return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
-            if restype_re and not re.search(r"%s" % restype_re, meta_info.get_edtion_string(), re.I):
+            if restype_re and not compile_filter_pattern(restype_re).search(meta_info.get_edtion_string()):
                 return False, 0, f"{meta_info.org_string} 不符合质量 {filter_args.get('restype')} 要求"
         # 过滤分辨率
         if filter_args.get("pix"):
             pix_re = ModuleConf.TORRENT_SEARCH_PARAMS["pix"].get(filter_args.get("pix"))
             if not meta_info.resource_pix:
                 return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
-            if pix_re and not re.search(r"%s" % pix_re, meta_info.resource_pix, re.I):
+            if pix_re and not compile_filter_pattern(pix_re).search(meta_info.resource_pix):
                 return False, 0, f"{meta_info.org_string} 不符合分辨率 {filter_args.get('pix')} 要求"
         # 过滤制作组/字幕组
         if filter_args.get("team"):
@@ -284,7 +366,7 @@ class Filter:
                     return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
                 else:
                     meta_info.resource_team = resource_team
-            elif not re.search(r"%s" % team, meta_info.resource_team, re.I):
+            elif not compile_filter_pattern(team).search(meta_info.resource_team):
                 return False, 0, f"{meta_info.org_string} 不符合制作组/字幕组 {team} 要求"
         # 过滤促销
         if filter_args.get("sp_state"):
@@ -296,17 +378,17 @@ class Filter:
         # 过滤包含
         if filter_args.get("include"):
             include = filter_args.get("include")
-            if not re.search(r"%s" % include, text, re.I):
+            if not compile_filter_pattern(include).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合包含 {include} 要求"
         # 过滤排除
         if filter_args.get("exclude"):
             exclude = filter_args.get("exclude")
-            if re.search(r"%s" % exclude, text, re.I):
+            if compile_filter_pattern(exclude).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合排除 {exclude} 要求"
         # 过滤关键字
         if filter_args.get("key"):
             key = filter_args.get("key")
-            if not re.search(r"%s" % key, text, re.I):
+            if not compile_filter_pattern(key).search(text):
                 return False, 0, f"{meta_info.org_string} 不符合 {key} 要求"
         # 过滤过滤规则，-1表示不使用过滤规则，空则使用默认过滤规则
         if filter_args.get("rule"):
@@ -3,6 +3,7 @@ from .meta_helper import MetaHelper
 from .progress_helper import ProgressHelper
 from .security_helper import SecurityHelper
 from .thread_helper import ThreadHelper
+from .async_helper import AsyncHelper
 from .db_helper import DbHelper
 from .dict_helper import DictHelper
 from .display_helper import DisplayHelper
@@ -12,5 +13,7 @@ from .words_helper import WordsHelper
 from .submodule_helper import SubmoduleHelper
 from .ffmpeg_helper import FfmpegHelper
 from .redis_helper import RedisHelper
-from .rss_helper import RssHelper
+from .rss_helper import RssHelper, RssFeedState
+from .http_cache_helper import HttpCacheHelper
+from .image_cache_helper import ImageCacheHelper
 from .plugin_helper import PluginHelper
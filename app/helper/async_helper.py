@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.commons import singleton
+from config import ASYNC_EXECUTOR_MAX_WORKERS
+
+
+@singleton
+class AsyncHelper:
+    """
+    进程内共享的事件循环，运行在独立的守护线程中
+    阻塞任务通过 run_in_executor 提交到共享线程池，避免每次调用都创建事件循环和线程池
+    """
+    _loop = None
+    _thread = None
+    executor = None
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=ASYNC_EXECUTOR_MAX_WORKERS,
+                                           thread_name_prefix="async-worker")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(target=self.__run_loop, name="async-loop", daemon=True)
+        self._thread.start()
+
+    def init_config(self):
+        pass
+
+    def __run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @property
+    def loop(self):
+        return self._loop
+
+    def submit(self, coro):
+        """
+        提交协程到共享事件循环
+        :return: concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout=None):
+        """
+        在共享事件循环中运行协程并等待结果，不能在事件循环线程中调用
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("AsyncHelper.run() 不能在事件循环线程中调用")
+        return self.submit(coro).result(timeout=timeout)
@@ -159,7 +159,8 @@ class ChromeHelper(object):
         
         with ChromeHelper._site_profile_locks_lock:
             if site_domain not in ChromeHelper._site_profile_locks:
-                ChromeHelper._site_profile_locks[site_domain] = FileLock(lock_path)
+                # 锁在线程池中获取、在事件循环中释放，不能使用线程本地的锁状态
+                ChromeHelper._site_profile_locks[site_domain] = FileLock(lock_path, thread_local=False)
             file_lock = ChromeHelper._site_profile_locks[site_domain]
         
         try:
@@ -1305,7 +1306,11 @@ class ChromeHelper(object):
         # 如果指定了站点域名，尝试获取站点Profile锁并使用站点专用Profile
         user_data_dir = None
         if site_domain:
-            if not self.acquire_site_profile_lock(site_domain, timeout=3):
+            # 文件锁为阻塞等待，放到线程池中获取，避免占用共享事件循环
+            if not await asyncio.get_running_loop().run_in_executor(None,
+                                                                    self.acquire_site_profile_lock,
+                                                                    site_domain,
+                                                                    3):
                 log.warn(f"无法获取站点 {site_domain} 的Profile锁，将使用临时Profile")
             else:
                 user_data_dir = ChromeHelper.get_site_profile_dir(site_domain)
@@ -3,7 +3,8 @@ import os.path
 import time
 import json
 from enum import Enum
-from sqlalchemy import cast, func, and_, case
+from sqlalchemy import cast, func, and_, case, text, column, tuple_
+from sqlalchemy.orm import aliased
 
 from app.db import MainDb, DbPersist
 from app.db.models import *
@@ -76,9 +77,12 @@ class DbHelper:
 
     def get_search_results(self):
         """
-        查询搜索结果的所有记录
+        查询搜索结果的所有记录，按资源优先级、站点优先级、做种数排序
         """
-        return self._db.query(SEARCHRESULTINFO).all()
+        return self._db.query(SEARCHRESULTINFO).order_by(cast(SEARCHRESULTINFO.RES_ORDER, Integer).desc(),
+                                                         cast(SEARCHRESULTINFO.SITE_ORDER, Integer).desc(),
+                                                         SEARCHRESULTINFO.SEEDERS.desc(),
+                                                         SEARCHRESULTINFO.ID).all()
 
     @DbPersist(_db)
     def delete_all_search_torrents(self):
@@ -160,36 +164,89 @@ class DbHelper:
             )
         )
 
-    def get_transfer_history(self, search, page, rownum):
+    def __fts_match(self, fts_table, search):
+        """
+        全文索引匹配到的记录ID子查询，不支持全文索引或关键字不足3个字符（trigram分词无法匹配）时返回None
+        """
+        if not MainDb.fts_enabled or len(search) < 3:
+            return None
+        match = '"%s"' % search.replace('"', '""')
+        return text(f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :match").bindparams(
+            match=match).columns(column("rowid"))
+
+    def __transfer_history_filter(self, search):
+        """
+        识别转移记录按源文件名或标题搜索的过滤条件
+        """
+        match = self.__fts_match("TRANSFER_HISTORY_FTS", search)
+        if match is not None:
+            return TRANSFERHISTORY.ID.in_(match)
+        search = f"%{search}%"
+        return (TRANSFERHISTORY.SOURCE_FILENAME.like(search)) | (TRANSFERHISTORY.TITLE.like(search))
+
+    def __transfer_unknown_filter(self, search):
+        """
+        未识别记录按路径搜索的过滤条件
+        """
+        match = self.__fts_match("TRANSFER_UNKNOWN_FTS", search)
+        if match is not None:
+            return TRANSFERUNKNOWN.ID.in_(match)
+        return TRANSFERUNKNOWN.PATH.like(f"%{search}%")
+
+    @staticmethod
+    def __count_and_page(query, order_by, begin_pos, rownum):
+        """
+        在一次查询中返回总条数及当页数据，总条数由窗口函数计算，超出末页时单独查询总条数
+        查询单个实体时返回实体列表，否则返回带 TOTAL 列的行
+        """
+        single = len(query.column_descriptions) == 1
+        rows = query.add_columns(func.count().over().label("TOTAL")).order_by(
+            *order_by).limit(int(rownum)).offset(begin_pos).all()
+        if rows:
+            return rows[0].TOTAL, [row[0] for row in rows] if single else rows
+        return (query.count() if begin_pos else 0), []
+
+    @staticmethod
+    def __after(date_column, id_column, after):
+        """
+        游标分页条件：按 (DATE, ID) 倒序排列时位于上一页最后一条记录之后的记录
+        使用行值比较，SQLite 可以用 DATE 上的索引（隐含 rowid）直接定位，而不是从头扫描
+        """
+        last_date, last_id = after
+        return tuple_(date_column, id_column) < tuple_(last_date, int(last_id))
+
+    def get_transfer_history(self, search, page, rownum, after=None):
         """
         查询识别转移记录
+        :param after: 上一页最后一条记录的 (DATE, ID)，传入时按游标（keyset）分页，忽略page
         """
         if int(page) == 1:
             begin_pos = 0
         else:
             begin_pos = (int(page) - 1) * int(rownum)
-
+        order_by = [TRANSFERHISTORY.DATE.desc(), TRANSFERHISTORY.ID.desc()]
+        query = self._db.query(TRANSFERHISTORY)
         if search:
-            search = f"%{search}%"
-            count = self._db.query(TRANSFERHISTORY).filter((TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                                                           | (TRANSFERHISTORY.TITLE.like(search))).count()
-            data = self._db.query(TRANSFERHISTORY).filter((TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                                                          | (TRANSFERHISTORY.TITLE.like(search))).order_by(
-                TRANSFERHISTORY.DATE.desc()).limit(int(rownum)).offset(begin_pos).all()
-            return count, data
-        else:
-            return self._db.query(TRANSFERHISTORY).count(), self._db.query(TRANSFERHISTORY).order_by(
-                TRANSFERHISTORY.DATE.desc()).limit(int(rownum)).offset(begin_pos).all()
+            query = query.filter(self.__transfer_history_filter(search))
+        if after:
+            data = query.filter(self.__after(TRANSFERHISTORY.DATE, TRANSFERHISTORY.ID, after)).order_by(
+                *order_by).limit(int(rownum)).all()
+            return query.count(), data
+        if search:
+            return self.__count_and_page(query, order_by, begin_pos, rownum)
+        return query.count(), query.order_by(*order_by).limit(int(rownum)).offset(begin_pos).all()
 
     def get_transfer_history_grouped(self, search, page, rownum):
         """
         查询分组的识别转移记录，按影视剧分组
+        分组在数据库中分页，当页所有分组的记录通过一次查询获取
         """
         if int(page) == 1:
             begin_pos = 0
         else:
             begin_pos = (int(page) - 1) * int(rownum)
 
+        search_filter = self.__transfer_history_filter(search) if search else None
         # 构建分组查询
         group_query = self._db.query(
             TRANSFERHISTORY.TYPE,
@@ -200,53 +257,38 @@ class DbHelper:
             func.count(TRANSFERHISTORY.ID).label('CNT'),
             func.max(TRANSFERHISTORY.DATE).label('LATEST_DATE')
         )
-
-        if search:
-            search = f"%{search}%"
-            group_query = group_query.filter(
-                (TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                | (TRANSFERHISTORY.TITLE.like(search))
-            )
-
+        if search_filter is not None:
+            group_query = group_query.filter(search_filter)
         group_query = group_query.group_by(
             TRANSFERHISTORY.TYPE,
             TRANSFERHISTORY.TITLE,
             TRANSFERHISTORY.YEAR,
             TRANSFERHISTORY.TMDBID
-        ).order_by(func.max(TRANSFERHISTORY.DATE).desc())
-
-        groups_all = group_query.all()
-        total_groups = len(groups_all)
-        paged_groups = groups_all[begin_pos:begin_pos + int(rownum)]
+        )
+        total_groups, paged_groups = self.__count_and_page(group_query,
+                                                           [func.max(TRANSFERHISTORY.DATE).desc()],
+                                                           begin_pos,
+                                                           rownum)
+        if not paged_groups:
+            return total_groups, []
+
+        # 一次查询当页所有分组的详细记录
+        records_query = self._db.query(TRANSFERHISTORY)
+        if search_filter is not None:
+            records_query = records_query.filter(search_filter)
+        if len(paged_groups) < total_groups:
+            titles = {group.TITLE for group in paged_groups}
+            title_filter = TRANSFERHISTORY.TITLE.in_([title for title in titles if title is not None])
+            if None in titles:
+                title_filter = title_filter | TRANSFERHISTORY.TITLE.is_(None)
+            records_query = records_query.filter(title_filter)
+        group_records = {}
+        for record in records_query.order_by(TRANSFERHISTORY.SEASON_EPISODE.asc(),
+                                             TRANSFERHISTORY.DATE.desc()).all():
+            group_records.setdefault((record.TYPE, record.TITLE, record.YEAR, record.TMDBID), []).append(record)
 
-        # 为每个分组获取详细记录
         result = []
         for group in paged_groups:
-            records_query = self._db.query(TRANSFERHISTORY).filter(
-                TRANSFERHISTORY.TYPE == group.TYPE,
-                TRANSFERHISTORY.TITLE == group.TITLE,
-                TRANSFERHISTORY.YEAR == group.YEAR
-            )
-            if group.TMDBID:
-                records_query = records_query.filter(
-                    TRANSFERHISTORY.TMDBID == int(group.TMDBID)
-                )
-            else:
-                records_query = records_query.filter(
-                    TRANSFERHISTORY.TMDBID.is_(None)
-                )
-
-            if search:
-                records_query = records_query.filter(
-                    (TRANSFERHISTORY.SOURCE_FILENAME.like(search))
-                    | (TRANSFERHISTORY.TITLE.like(search))
-                )
-
-            records = records_query.order_by(
-                TRANSFERHISTORY.SEASON_EPISODE.asc(),
-                TRANSFERHISTORY.DATE.desc()
-            ).all()
-
             result.append({
                 'TYPE': group.TYPE,
                 'TITLE': group.TITLE,
@@ -255,7 +297,7 @@ class DbHelper:
                 'CATEGORY': group.CATEGORY,
                 'CNT': group.CNT,
                 'LATEST_DATE': group.LATEST_DATE,
-                'RECORDS': records
+                'RECORDS': group_records.get((group.TYPE, group.TITLE, group.YEAR, group.TMDBID), [])
             })
 
         return total_groups, result
@@ -326,26 +368,25 @@ class DbHelper:
         """
         return self._db.query(TRANSFERUNKNOWN).filter(TRANSFERUNKNOWN.STATE == 'N').all()
 
-    def get_transfer_unknown_paths_by_page(self, search, page, rownum):
+    def get_transfer_unknown_paths_by_page(self, search, page, rownum, after=None):
         """
         按页查询未识别的记录列表
+        :param after: 上一页最后一条记录的 (ID,)，传入时按游标分页，忽略page
         """
         if int(page) == 1:
             begin_pos = 0
         else:
             begin_pos = (int(page) - 1) * int(rownum)
+        query = self._db.query(TRANSFERUNKNOWN).filter(TRANSFERUNKNOWN.STATE == 'N')
         if search:
-            search = f"%{search}%"
-            count = self._db.query(TRANSFERUNKNOWN).filter((TRANSFERUNKNOWN.STATE == 'N')
-                                                           & (TRANSFERUNKNOWN.PATH.like(search))).count()
-            data = self._db.query(TRANSFERUNKNOWN).filter((TRANSFERUNKNOWN.STATE == 'N')
-                                                          & (TRANSFERUNKNOWN.PATH.like(search))).order_by(
-                TRANSFERUNKNOWN.ID.desc()).limit(int(rownum)).offset(begin_pos).all()
-            return count, data
-        else:
-            return self._db.query(TRANSFERUNKNOWN).filter(TRANSFERUNKNOWN.STATE == 'N').count(), self._db.query(
-                TRANSFERUNKNOWN).filter(TRANSFERUNKNOWN.STATE == 'N').order_by(
-                TRANSFERUNKNOWN.ID.desc()).limit(int(rownum)).offset(begin_pos).all()
+            query = query.filter(self.__transfer_unknown_filter(search))
+        if after:
+            # STATE 索引隐含 rowid，(STATE, ID) 有序
+            return query.count(), query.filter(TRANSFERUNKNOWN.ID < int(after[0])).order_by(
+                TRANSFERUNKNOWN.ID.desc()).limit(int(rownum)).all()
+        if search:
+            return self.__count_and_page(query, [TRANSFERUNKNOWN.ID.desc()], begin_pos, rownum)
+        return query.count(), query.order_by(TRANSFERUNKNOWN.ID.desc()).limit(int(rownum)).offset(begin_pos).all()
 
     @DbPersist(_db)
     def update_transfer_unknown_state(self, path):
@@ -1686,28 +1727,40 @@ class DbHelper:
                 SE=media_info.get_season_episode_string()
             ))
 
-    def get_download_history(self, date=None, hid=None, num=30, page=1):
+    def get_download_history(self, date=None, hid=None, num=30, page=1, after=None):
         """
         查询下载历史
+        :param after: 上一页最后一条记录的 (DATE, ID)，传入时按游标分页，忽略page
         """
         if hid:
             return self._db.query(DOWNLOADHISTORY).filter(DOWNLOADHISTORY.ID == int(hid)).all()
-        sub_query = self._db.query(DOWNLOADHISTORY,
-                                   func.max(DOWNLOADHISTORY.DATE)
-                                   ).group_by(DOWNLOADHISTORY.TITLE).subquery()
         if date:
+            sub_query = self._db.query(DOWNLOADHISTORY,
+                                       func.max(DOWNLOADHISTORY.DATE)
+                                       ).group_by(DOWNLOADHISTORY.TITLE).subquery()
             return self._db.query(DOWNLOADHISTORY).filter(
                 DOWNLOADHISTORY.DATE > date).join(
                 sub_query,
                 and_(sub_query.c.ID == DOWNLOADHISTORY.ID)
             ).order_by(DOWNLOADHISTORY.DATE.desc()).all()
         else:
-            offset = (int(page) - 1) * int(num)
-            return self._db.query(DOWNLOADHISTORY).join(
-                sub_query,
-                and_(sub_query.c.ID == DOWNLOADHISTORY.ID)
-            ).order_by(
-                DOWNLOADHISTORY.DATE.desc()
+            # 每个标题只取最新的一条：不存在同标题更新的记录，逐条用 (TITLE, DATE) 索引判断，
+            # 配合 DATE 索引按 (DATE, ID) 倒序扫描，无需每页对全表分组
+            newer = aliased(DOWNLOADHISTORY)
+            query = self._db.query(DOWNLOADHISTORY).filter(
+                ~self._db.query(newer.ID).filter(
+                    newer.TITLE == DOWNLOADHISTORY.TITLE,
+                    tuple_(newer.DATE, newer.ID) > tuple_(DOWNLOADHISTORY.DATE, DOWNLOADHISTORY.ID)
+                ).exists()
+            )
+            if after:
+                query = query.filter(self.__after(DOWNLOADHISTORY.DATE, DOWNLOADHISTORY.ID, after))
+                offset = 0
+            else:
+                offset = (int(page) - 1) * int(num)
+            return query.order_by(
+                DOWNLOADHISTORY.DATE.desc(),
+                DOWNLOADHISTORY.ID.desc()
             ).limit(num).offset(offset).all()
 
     def get_download_history_by_title(self, title):
@@ -2794,17 +2847,23 @@ class DbHelper:
             DATE=time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
         ))
 
-    def get_plugin_history(self, plugin_id, key):
+    def get_plugin_history(self, plugin_id, key, num=None, after=None):
         """
         查询插件运行记录
+        :param num: 传入时按时间倒序返回num条记录
+        :param after: 上一页最后一条记录的 (DATE, ID)，与num一起使用按游标分页
         """
         if not plugin_id:
             return None
         if key:
             return self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id,
                                                         PLUGINHISTORY.KEY == key).first()
-        else:
-            return self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id).all()
+        query = self._db.query(PLUGINHISTORY).filter(PLUGINHISTORY.PLUGIN_ID == plugin_id)
+        if not num:
+            return query.all()
+        if after:
+            query = query.filter(self.__after(PLUGINHISTORY.DATE, PLUGINHISTORY.ID, after))
+        return query.order_by(PLUGINHISTORY.DATE.desc(), PLUGINHISTORY.ID.desc()).limit(int(num)).all()
 
     @DbPersist(_db)
     def update_plugin_history(self, plugin_id, key, value):
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import re
+import sqlite3
+import time
+import zlib
+from threading import RLock
+from urllib.parse import urlparse
+
+import requests
+
+import log
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+from config import Config, HTTP_CACHE_TTL, HTTP_CACHE_MAX_SIZE
+
+lock = RLock()
+
+# 访问时间推后超过该值时才回写数据库
+ACCESS_REFRESH_THRESHOLD = 24 * 3600
+# 超出容量时淘汰到最大容量的比例
+EVICT_TARGET_RATIO = 0.9
+
+# 详情接口必须带ID：TMDB及豆瓣为数字ID，find 为外部ID（如IMDB ID），避免榜单等列表接口使用详情的过期时间
+_DETAILS_RE = re.compile(r"(/(movie|tv|person|collection|subject)/\d+|/find/[^/]+)"
+                         r"(/(credits|external_ids|translations|alternative_titles|keywords|release_dates"
+                         r"|content_ratings|episode_groups|celebrities|rating))?/?$")
+
+
+@singleton
+class HttpCacheHelper(object):
+    """
+    TMDB、豆瓣、Fanart等接口的HTTP响应磁盘缓存
+    缓存持久化在 http_cache.db（SQLite）中，响应体使用zlib压缩，key为请求地址的摘要，不落盘明文的API Key
+    按接口类别设置过期时间，超出容量时按最近访问时间淘汰
+    """
+    _db = None
+    _cache_path = None
+    _enabled = False
+    _total_size = 0
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        laboratory = Config().get_config('laboratory') or {}
+        self._enabled = True if laboratory.get("http_disk_cache") else False
+        with lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+            if not self._enabled:
+                return
+            self._cache_path = os.path.join(Config().get_config_path(), 'http_cache.db')
+            try:
+                self._db = self.__init_db(self._cache_path)
+                self._total_size = self._db.execute("SELECT IFNULL(SUM(SIZE), 0) FROM HTTP_CACHE").fetchone()[0]
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self._db = None
+
+    @staticmethod
+    def __init_db(path):
+        """
+        打开缓存数据库并建表
+        """
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("CREATE TABLE IF NOT EXISTS HTTP_CACHE ("
+                     "KEY TEXT PRIMARY KEY, "
+                     "CATEGORY TEXT, "
+                     "EXPIRE INTEGER, "
+                     "ACCESS INTEGER, "
+                     "SIZE INTEGER, "
+                     "CONTENT_TYPE TEXT, "
+                     "DATA BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_HTTP_CACHE_EXPIRE ON HTTP_CACHE (EXPIRE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_HTTP_CACHE_ACCESS ON HTTP_CACHE (ACCESS)")
+        conn.commit()
+        return conn
+
+    @property
+    def enabled(self):
+        return self._enabled and self._db is not None
+
+    @staticmethod
+    def get_url_category(url):
+        """
+        根据请求地址判断接口类别，用于确定过期时间
+        """
+        parsed = urlparse(url)
+        path = parsed.path.lower()
+        if "/search" in path:
+            return "search"
+        if "/season/" in path or "/episode/" in path:
+            return "seasons"
+        if path.endswith("/images") or path.endswith("/photos") or "fanart.tv" in (parsed.hostname or ""):
+            return "images"
+        if _DETAILS_RE.search(path):
+            return "details"
+        return "default"
+
+    @staticmethod
+    def __make_key(key):
+        return hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+
+    def get_response(self, key):
+        """
+        读取缓存的响应
+        :param key: 缓存key，一般为请求地址
+        :return: requests.Response，未命中或已过期时返回None
+        """
+        if not self.enabled:
+            return None
+        cache_key = self.__make_key(key)
+        now = int(time.time())
+        try:
+            with lock:
+                row = self._db.execute("SELECT EXPIRE, ACCESS, CONTENT_TYPE, DATA FROM HTTP_CACHE WHERE KEY = ?",
+                                       (cache_key,)).fetchone()
+                if not row:
+                    return None
+                expire, access, content_type, data = row
+                if expire < now:
+                    self.__delete(cache_key)
+                    return None
+                if now - (access or 0) >= ACCESS_REFRESH_THRESHOLD:
+                    self._db.execute("UPDATE HTTP_CACHE SET ACCESS = ? WHERE KEY = ?", (now, cache_key))
+                    self._db.commit()
+            res = requests.Response()
+            res.status_code = 200
+            res.url = key
+            res._content = zlib.decompress(data)
+            res.encoding = "utf-8"
+            if content_type:
+                res.headers["Content-Type"] = content_type
+            return res
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return None
+
+    def set_response(self, key, res, category=None):
+        """
+        缓存响应，只缓存状态码为200的响应
+        :param key: 缓存key，一般为请求地址
+        :param res: requests.Response
+        :param category: 接口类别，为空时根据key判断
+        """
+        if not self.enabled or res is None or res.status_code != 200:
+            return
+        category = category or self.get_url_category(key)
+        ttl = HTTP_CACHE_TTL.get(category) or HTTP_CACHE_TTL.get("default")
+        cache_key = self.__make_key(key)
+        now = int(time.time())
+        try:
+            data = zlib.compress(res.content)
+            with lock:
+                old = self._db.execute("SELECT SIZE FROM HTTP_CACHE WHERE KEY = ?", (cache_key,)).fetchone()
+                self._db.execute("INSERT OR REPLACE INTO HTTP_CACHE "
+                                 "(KEY, CATEGORY, EXPIRE, ACCESS, SIZE, CONTENT_TYPE, DATA) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (cache_key, category, now + ttl, now, len(data),
+                                  res.headers.get("Content-Type"), data))
+                self._total_size += len(data) - (old[0] if old else 0)
+                if self._total_size > HTTP_CACHE_MAX_SIZE:
+                    self.__evict(now)
+                self._db.commit()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self._db.rollback()
+
+    def __delete(self, cache_key):
+        row = self._db.execute("SELECT SIZE FROM HTTP_CACHE WHERE KEY = ?", (cache_key,)).fetchone()
+        if row:
+            self._db.execute("DELETE FROM HTTP_CACHE WHERE KEY = ?", (cache_key,))
+            self._db.commit()
+            self._total_size -= row[0]
+
+    def __evict(self, now):
+        """
+        先删除过期的缓存，仍超出容量时按最近访问时间淘汰
+        """
+        self._db.execute("DELETE FROM HTTP_CACHE WHERE EXPIRE < ?", (now,))
+        self._total_size = self._db.execute("SELECT IFNULL(SUM(SIZE), 0) FROM HTTP_CACHE").fetchone()[0]
+        target = int(HTTP_CACHE_MAX_SIZE * EVICT_TARGET_RATIO)
+        if self._total_size <= target:
+            return
+        evict_keys = []
+        evict_size = self._total_size - target
+        for cache_key, size in self._db.execute("SELECT KEY, SIZE FROM HTTP_CACHE ORDER BY ACCESS"):
+            if evict_size <= 0:
+                break
+            evict_keys.append((cache_key,))
+            evict_size -= size
+        self._db.executemany("DELETE FROM HTTP_CACHE WHERE KEY = ?", evict_keys)
+        self._total_size = self._db.execute("SELECT IFNULL(SUM(SIZE), 0) FROM HTTP_CACHE").fetchone()[0]
+        log.debug("【HttpCache】缓存超出容量，已淘汰 %s 条" % len(evict_keys))
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        if not self.enabled:
+            return
+        with lock:
+            self._db.execute("DELETE FROM HTTP_CACHE")
+            self._db.commit()
+            self._total_size = 0
+
+    def get_cache_info(self):
+        """
+        缓存条目数及占用空间
+        """
+        if not self.enabled:
+            return 0, 0
+        with lock:
+            count = self._db.execute("SELECT COUNT(1) FROM HTTP_CACHE").fetchone()[0]
+        return count, self._total_size
@@ -0,0 +1,281 @@
+import hashlib
+import io
+import os
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import RLock
+
+from PIL import Image
+
+import log
+from app.utils import ExceptionUtils
+from app.utils.commons import singleton
+from config import Config, IMAGE_CACHE_MAX_SIZE, IMAGE_CACHE_MEMORY_SIZE, IMAGE_CACHE_THUMB_WIDTHS
+
+lock = RLock()
+
+# 等待其它线程下载同一图片的超时时间（秒）
+PENDING_TIMEOUT = 60
+
+
+@singleton
+class ImageCacheHelper(object):
+    """
+    图片中转服务的服务端缓存
+    图片按地址摘要保存在临时目录中，内存中保留最近访问的部分图片，磁盘及内存均按总字节数LRU淘汰
+    同一图片的并发请求只下载一次，支持按宽度生成缩略图
+    """
+    _cache_path = None
+    # 磁盘缓存索引：文件名 -> 大小，按最近访问时间排序
+    _disk_index = OrderedDict()
+    _disk_size = 0
+    # 内存缓存：文件名 -> 图片数据，按最近访问时间排序
+    _memory = OrderedDict()
+    _memory_size = 0
+    # 正在下载的图片：文件名 -> Future
+    _pending = {}
+
+    def __init__(self):
+        self.init_config()
+
+    def init_config(self):
+        self._cache_path = os.path.join(Config().get_temp_path(), "imgcache")
+        with lock:
+            self._disk_index = OrderedDict()
+            self._disk_size = 0
+            self._memory = OrderedDict()
+            self._memory_size = 0
+            self._pending = {}
+            try:
+                os.makedirs(self._cache_path, exist_ok=True)
+                files = []
+                for entry in os.scandir(self._cache_path):
+                    if not entry.is_file():
+                        continue
+                    if entry.name.endswith(".tmp"):
+                        os.remove(entry.path)
+                        continue
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+                # 以修改时间近似重启前的访问顺序
+                for _, name, size in sorted(files):
+                    self._disk_index[name] = size
+                    self._disk_size += size
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+            evict_files = self.__evict_disk()
+        self.__remove_files(evict_files)
+
+    @staticmethod
+    def get_thumb_width(width):
+        """
+        将请求的宽度向上取整到可选的缩略图宽度，超出最大宽度时使用原图
+        """
+        if not width or not str(width).isdigit():
+            return None
+        width = int(width)
+        for thumb_width in IMAGE_CACHE_THUMB_WIDTHS:
+            if width <= thumb_width:
+                return thumb_width
+        return None
+
+    @staticmethod
+    def __get_name(url, width=None):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        if width:
+            name = "%s_w%s" % (name, width)
+        return name
+
+    def get_image(self, url, fetcher, width=None):
+        """
+        获取图片，优先使用缓存
+        :param url: 图片地址
+        :param fetcher: 下载原图的函数，返回图片数据，下载失败时抛出异常
+        :param width: 缩略图宽度，为空时返回原图
+        :return: 图片数据
+        """
+        width = self.get_thumb_width(width)
+        name = self.__get_name(url, width)
+        content = self.__get(name)
+        if content is not None:
+            return content
+        return self.__single_flight(name, lambda: self.__load(name, url, fetcher, width))
+
+    def __load(self, name, url, fetcher, width):
+        """
+        下载原图或由原图生成缩略图，并写入缓存
+        """
+        if width:
+            content = self.__thumbnail(self.get_image(url, fetcher), width)
+        else:
+            content = fetcher()
+        # 站点常以200返回登录页或错误页，不是图片的内容不缓存，下次请求时重试
+        if content and self.__is_image(content):
+            self.__put(name, content)
+        return content
+
+    @staticmethod
+    def __is_image(content):
+        """
+        判断内容是否为可以解析的图片
+        """
+        try:
+            Image.open(io.BytesIO(content)).verify()
+            return True
+        except Exception:
+            return False
+
+    def __single_flight(self, name, func):
+        """
+        同一图片同时只有一个线程下载，其它线程等待结果
+        """
+        with lock:
+            future = self._pending.get(name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[name] = future
+        if not owner:
+            return future.result(timeout=PENDING_TIMEOUT)
+        try:
+            content = func()
+            future.set_result(content)
+            return content
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with lock:
+                self._pending.pop(name, None)
+
+    def __get(self, name):
+        """
+        依次查找内存和磁盘缓存
+        """
+        with lock:
+            content = self._memory.get(name)
+            if content is not None:
+                self._memory.move_to_end(name)
+                return content
+            if name not in self._disk_index:
+                return None
+            self._disk_index.move_to_end(name)
+        file_path = os.path.join(self._cache_path, name)
+        try:
+            with open(file_path, "rb") as f:
+                content = f.read()
+            os.utime(file_path)
+        except OSError:
+            with lock:
+                size = self._disk_index.pop(name, None)
+                if size is not None:
+                    self._disk_size -= size
+            return None
+        with lock:
+            self.__put_memory(name, content)
+        return content
+
+    def __put(self, name, content):
+        """
+        写入磁盘及内存缓存
+        """
+        file_path = os.path.join(self._cache_path, name)
+        tmp_path = "%s.%s.tmp" % (file_path, id(content))
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, file_path)
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with lock:
+            self._disk_size += len(content) - self._disk_index.pop(name, 0)
+            self._disk_index[name] = len(content)
+            self.__put_memory(name, content)
+            evict_files = self.__evict_disk()
+        self.__remove_files(evict_files)
+
+    def __put_memory(self, name, content):
+        """
+        写入内存缓存，需在锁内调用
+        """
+        # 超大图片不进入内存缓存
+        if len(content) > IMAGE_CACHE_MEMORY_SIZE // 8:
+            return
+        old = self._memory.pop(name, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[name] = content
+        self._memory_size += len(content)
+        while self._memory_size > IMAGE_CACHE_MEMORY_SIZE and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def __evict_disk(self):
+        """
+        超出磁盘容量时淘汰最久未访问的图片，需在锁内调用，返回待删除的文件名
+        """
+        evict_files = []
+        while self._disk_size > IMAGE_CACHE_MAX_SIZE and self._disk_index:
+            name, size = self._disk_index.popitem(last=False)
+            self._disk_size -= size
+            evicted = self._memory.pop(name, None)
+            if evicted is not None:
+                self._memory_size -= len(evicted)
+            evict_files.append(name)
+        return evict_files
+
+    def __remove_files(self, names):
+        if not names:
+            return
+        for name in names:
+            try:
+                os.remove(os.path.join(self._cache_path, name))
+            except OSError:
+                pass
+        log.debug("【ImageCache】缓存超出容量，已淘汰 %s 张图片" % len(names))
+
+    @staticmethod
+    def __thumbnail(content, width):
+        """
+        按宽度等比缩小图片，原图更小或无法处理时返回原图
+        """
+        try:
+            img = Image.open(io.BytesIO(content))
+            if img.width <= width or getattr(img, "is_animated", False):
+                return content
+            img_format = img.format or "JPEG"
+            img.thumbnail((width, img.height * width // img.width + 1), Image.LANCZOS)
+            if img_format == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            output = io.BytesIO()
+            img.save(output, format=img_format, quality=85)
+            return output.getvalue()
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return content
+
+    def clear(self):
+        """
+        清空缓存
+        """
+        with lock:
+            names = list(self._disk_index.keys())
+            self._disk_index = OrderedDict()
+            self._disk_size = 0
+            self._memory = OrderedDict()
+            self._memory_size = 0
+        for name in names:
+            try:
+                os.remove(os.path.join(self._cache_path, name))
+            except OSError:
+                pass
+
+    def get_cache_info(self):
+        """
+        磁盘缓存图片数量及占用空间，内存缓存图片数量及占用空间
+        """
+        with lock:
+            return len(self._disk_index), self._disk_size, len(self._memory), self._memory_size
@@ -1,18 +1,24 @@
 import os
 import pickle
-import random
+import sqlite3
 import time
+from collections import OrderedDict
 from enum import Enum
-from threading import RLock
+from threading import Lock, RLock
 
+import log
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
-from config import Config
+from config import Config, META_CACHE_MEMORY_SIZE
 
 lock = RLock()
+# 仅保护 _touched_keys 的读写，内存命中的读取路径不必等待 lock
+touched_lock = Lock()
 
 CACHE_EXPIRE_TIMESTAMP_STR = "cache_expire_timestamp"
 EXPIRE_TIMESTAMP = 7 * 24 * 3600
+# 过期时间推后超过该值时才回写数据库
+EXPIRE_REFRESH_THRESHOLD = 24 * 3600
 
 
 @singleton
@@ -24,10 +30,23 @@ class MetaHelper(object):
         "year": '',
         "type": MediaType
     }
+    缓存持久化在 tmdb.db（SQLite）中，按需加载到内存，仅回写发生变化的条目
+    内存中最多保留 META_CACHE_MEMORY_SIZE 条，按最近使用顺序淘汰
     """
-    _meta_data = {}
+    # 已加载到内存的缓存条目，按最近使用排序
+    _meta_data = OrderedDict()
+    # 待回写的缓存key
+    _dirty_keys = set()
+    # 内存中 TMDBID -> 缓存key 的索引
+    _tmdbid_index = {}
+    # 内存中未识别（id为0）条目的索引，这类条目不落盘
+    _unknown_keys = set()
+    # 读取命中后待批量刷新过期时间的缓存key
+    _touched_keys = set()
 
     _meta_path = None
+    _legacy_path = None
+    _db = None
     _tmdb_cache_expire = False
 
     def __init__(self):
@@ -37,15 +56,152 @@ class MetaHelper(object):
         laboratory = Config().get_config('laboratory')
         if laboratory:
             self._tmdb_cache_expire = laboratory.get("tmdb_cache_expire")
-        self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
-        self._meta_data = self.__load_meta_data(self._meta_path)
+        with lock:
+            if self._db:
+                self.save_meta_data(force=True)
+                self._db.close()
+            self._meta_path = os.path.join(Config().get_config_path(), 'tmdb.db')
+            self._legacy_path = os.path.join(Config().get_config_path(), 'tmdb.dat')
+            self._meta_data = OrderedDict()
+            self._dirty_keys = set()
+            self._tmdbid_index = {}
+            self._unknown_keys = set()
+            self._touched_keys = set()
+            self._db = self.__init_db(self._meta_path)
+            self.__import_legacy_data(self._legacy_path)
+
+    @staticmethod
+    def __init_db(path):
+        """
+        打开缓存数据库并建表
+        """
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("CREATE TABLE IF NOT EXISTS META_CACHE ("
+                     "KEY TEXT PRIMARY KEY, "
+                     "TMDBID TEXT, "
+                     "EXPIRE INTEGER, "
+                     "DATA BLOB)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_CACHE_TMDBID ON META_CACHE (TMDBID)")
+        conn.execute("CREATE INDEX IF NOT EXISTS INDX_META_CACHE_EXPIRE ON META_CACHE (EXPIRE)")
+        conn.commit()
+        return conn
+
+    def __import_legacy_data(self, path):
+        """
+        将旧版 tmdb.dat 中的缓存一次性导入数据库，导入后重命名为 tmdb.dat.bak
+        """
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f) or {}
+            rows = [self.__make_row(k, v) for k, v in data.items() if v and str(v.get("id")) != '0']
+            self._db.executemany("INSERT OR IGNORE INTO META_CACHE (KEY, TMDBID, EXPIRE, DATA) VALUES (?, ?, ?, ?)",
+                                 rows)
+            self._db.commit()
+            os.replace(path, "%s.bak" % path)
+            log.info("【Meta】已将 %s 条TMDB缓存从 tmdb.dat 迁移到 tmdb.db" % len(rows))
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            self._db.rollback()
+
+    @staticmethod
+    def __make_row(key, info):
+        """
+        生成数据库行
+        """
+        return (key,
+                str(info.get("id")),
+                info.get(CACHE_EXPIRE_TIMESTAMP_STR),
+                pickle.dumps(info, pickle.HIGHEST_PROTOCOL))
+
+    def __load_meta_data(self, key):
+        """
+        从数据库中加载单条缓存到内存
+        """
+        row = self._db.execute("SELECT DATA FROM META_CACHE WHERE KEY = ?", (key,)).fetchone()
+        if not row:
+            return None
+        try:
+            info = pickle.loads(row[0])
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            return None
+        self.__put(key, info)
+        return info
+
+    def __put(self, key, info):
+        """
+        放入内存并维护索引，超出容量时淘汰最久未使用的条目
+        """
+        self._meta_data[key] = info
+        self._meta_data.move_to_end(key)
+        tmdbid = str(info.get("id"))
+        if tmdbid == '0':
+            self._unknown_keys.add(key)
+        else:
+            self._tmdbid_index.setdefault(tmdbid, set()).add(key)
+        self.__evict()
+
+    def __evict(self):
+        """
+        淘汰最久未使用的条目，待回写的条目在落盘前不淘汰
+        """
+        over = len(self._meta_data) - META_CACHE_MEMORY_SIZE
+        if over <= 0:
+            return
+        evict_keys = []
+        for key in self._meta_data:
+            if key in self._dirty_keys:
+                continue
+            evict_keys.append(key)
+            if len(evict_keys) >= over:
+                break
+        for key in evict_keys:
+            self.__pop(key)
+
+    def __pop(self, key):
+        """
+        从内存中移除并维护索引
+        """
+        info = self._meta_data.pop(key, None)
+        self._dirty_keys.discard(key)
+        if info is None:
+            return None
+        tmdbid = str(info.get("id"))
+        if tmdbid == '0':
+            self._unknown_keys.discard(key)
+        else:
+            keys = self._tmdbid_index.get(tmdbid)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    self._tmdbid_index.pop(tmdbid, None)
+        return info
+
+    def __get(self, key):
+        """
+        先查内存，再查数据库
+        """
+        info = self._meta_data.get(key)
+        if info is None:
+            info = self.__load_meta_data(key)
+        return info
 
     def clear_meta_data(self):
         """
         清空所有TMDB缓存
         """
         with lock:
-            self._meta_data = {}
+            self._meta_data = OrderedDict()
+            self._dirty_keys = set()
+            self._tmdbid_index = {}
+            self._unknown_keys = set()
+            self._touched_keys = set()
+            self._db.execute("DELETE FROM META_CACHE")
+            self._db.commit()
 
     def get_meta_data_path(self):
         """
@@ -56,17 +212,39 @@ class MetaHelper(object):
     def get_meta_data_by_key(self, key):
         """
         根据KEY值获取缓存值
+        内存命中时不加锁，过期时间的刷新由 refresh_expire_time 定时批量处理
+        """
+        if not key:
+            return {}
+        info: dict = self._meta_data.get(key)
+        if info is None:
+            with lock:
+                info = self.__get(key)
+        if info:
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+            if not expire or int(time.time()) < expire:
+                with touched_lock:
+                    self._touched_keys.add(key)
+            elif self._tmdb_cache_expire:
+                self.delete_meta_data(key)
+        return info or {}
+
+    def refresh_expire_time(self):
         """
+        批量刷新最近被读取过的缓存条目的过期时间及最近使用顺序
+        """
+        with touched_lock:
+            touched_keys, self._touched_keys = self._touched_keys, set()
         with lock:
-            info: dict = self._meta_data.get(key)
-            if info:
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire or int(time.time()) < expire:
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self.update_meta_data({key: info})
-                elif expire and self._tmdb_cache_expire:
-                    self.delete_meta_data(key)
-            return info or {}
+            expire = int(time.time()) + EXPIRE_TIMESTAMP
+            for key in touched_keys:
+                info = self._meta_data.get(key)
+                if not info:
+                    continue
+                self._meta_data.move_to_end(key)
+                if expire - (info.get(CACHE_EXPIRE_TIMESTAMP_STR) or 0) >= EXPIRE_REFRESH_THRESHOLD:
+                    info[CACHE_EXPIRE_TIMESTAMP_STR] = expire
+                    self._dirty_keys.add(key)
 
     def dump_meta_data(self, search, page, num):
         """
@@ -80,18 +258,28 @@ class MetaHelper(object):
             begin_pos = 0
         else:
             begin_pos = (page - 1) * num
+        search = (search or "").replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        condition = "KEY LIKE ? ESCAPE '\\' AND TMDBID != '0'"
+        params = ("%%%s%%" % search,)
 
         with lock:
-            search_metas = [(k, {
+            # 先将内存中的变化落盘，保证查询结果完整
+            self.save_meta_data()
+            total = self._db.execute("SELECT COUNT(1) FROM META_CACHE WHERE %s" % condition, params).fetchone()[0]
+            rows = self._db.execute("SELECT KEY, DATA FROM META_CACHE WHERE %s ORDER BY ROWID LIMIT ? OFFSET ?"
+                                    % condition, params + (num, begin_pos)).fetchall()
+        search_metas = []
+        for k, data in rows:
+            v = self._meta_data.get(k) or pickle.loads(data)
+            search_metas.append((k, {
                 "id": v.get("id"),
                 "title": v.get("title"),
                 "year": v.get("year"),
                 "media_type": v.get("type").value if isinstance(v.get("type"), Enum) else v.get("type"),
                 "poster_path": v.get("poster_path"),
                 "backdrop_path": v.get("backdrop_path")
-            },  str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", ""))
-                for k, v in self._meta_data.items() if search.lower() in k.lower() and v.get("id") != 0]
-            return len(search_metas), search_metas[begin_pos: begin_pos + num]
+            }, str(k).replace("[电影]", "").replace("[电视剧]", "").replace("[未知]", "").replace("-None", "")))
+        return total, search_metas
 
     def delete_meta_data(self, key):
         """
@@ -100,25 +288,29 @@ class MetaHelper(object):
         @return: 被删除的缓存内容
         """
         with lock:
-            return self._meta_data.pop(key, None)
+            info = self.__get(key)
+            self.__pop(key)
+            self._db.execute("DELETE FROM META_CACHE WHERE KEY = ?", (key,))
+            self._db.commit()
+            return info
 
     def delete_meta_data_by_tmdbid(self, tmdbid):
         """
         清空对应TMDBID的所有缓存记录，以强制更新TMDB中最新的数据
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == str(tmdbid):
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            for key in list(self._tmdbid_index.get(str(tmdbid)) or []):
+                self.__pop(key)
+            self._db.execute("DELETE FROM META_CACHE WHERE TMDBID = ?", (str(tmdbid),))
+            self._db.commit()
 
     def delete_unknown_meta(self):
         """
         清除未识别的缓存记录，以便重新搜索TMDB
         """
-        for key in list(self._meta_data):
-            if str(self._meta_data.get(key, {}).get("id")) == '0':
-                with lock:
-                    self._meta_data.pop(key)
+        with lock:
+            for key in list(self._unknown_keys):
+                self.__pop(key)
 
     def modify_meta_data(self, key, title):
         """
@@ -128,25 +320,12 @@ class MetaHelper(object):
         @return: 被修改后缓存内容
         """
         with lock:
-            if self._meta_data.get(key):
-                self._meta_data[key]['title'] = title
-                self._meta_data[key][CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-            return self._meta_data.get(key)
-
-    @staticmethod
-    def __load_meta_data(path):
-        """
-        从文件中加载缓存
-        """
-        try:
-            if os.path.exists(path):
-                with open(path, 'rb') as f:
-                    data = pickle.load(f)
-                return data
-            return {}
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            return {}
+            info = self.__get(key)
+            if info:
+                info['title'] = title
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                self._dirty_keys.add(key)
+            return info
 
     def update_meta_data(self, meta_data):
         """
@@ -156,65 +335,47 @@ class MetaHelper(object):
             return
         with lock:
             for key, item in meta_data.items():
-                if not self._meta_data.get(key):
+                if not self.__get(key):
                     item[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                    self._meta_data[key] = item
+                    self.__pop(key)
+                    # 先标记为待回写，避免放入时被淘汰
+                    self._dirty_keys.add(key)
+                    self.__put(key, item)
 
     def save_meta_data(self, force=False):
         """
-        保存缓存数据到文件
+        保存缓存数据到文件，仅回写发生变化的条目
+        @param force: 是否同时清理数据库中已过期的条目
         """
-        meta_data = self.__load_meta_data(self._meta_path)
-        new_meta_data = {k: v for k, v in self._meta_data.items() if str(v.get("id")) != '0'}
-
-        if not force \
-                and not self._random_sample(new_meta_data) \
-                and meta_data.keys() == new_meta_data.keys():
-            return
-
-        with open(self._meta_path, 'wb') as f:
-            pickle.dump(new_meta_data, f, pickle.HIGHEST_PROTOCOL)
-
-    def _random_sample(self, new_meta_data):
-        """
-        采样分析是否需要保存
-        """
-        ret = False
-        if len(new_meta_data) < 25:
-            keys = list(new_meta_data.keys())
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-        else:
-            count = 0
-            keys = random.sample(list(new_meta_data.keys()), 25)
-            for k in keys:
-                info = new_meta_data.get(k)
-                expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
-                if not expire:
-                    ret = True
-                    info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
-                elif int(time.time()) >= expire:
-                    ret = True
-                    if self._tmdb_cache_expire:
-                        new_meta_data.pop(k)
-                        count += 1
-            if count >= 5:
-                ret |= self._random_sample(new_meta_data)
-        return ret
+        with lock:
+            try:
+                self.refresh_expire_time()
+                rows = []
+                for key in self._dirty_keys:
+                    info = self._meta_data.get(key)
+                    if info and str(info.get("id")) != '0':
+                        rows.append(self.__make_row(key, info))
+                self._dirty_keys = set()
+                if rows:
+                    self._db.executemany("INSERT INTO META_CACHE (KEY, TMDBID, EXPIRE, DATA) VALUES (?, ?, ?, ?) "
+                                         "ON CONFLICT(KEY) DO UPDATE SET "
+                                         "TMDBID = excluded.TMDBID, EXPIRE = excluded.EXPIRE, DATA = excluded.DATA",
+                                         rows)
+                if self._tmdb_cache_expire and (rows or force):
+                    self._db.execute("DELETE FROM META_CACHE WHERE EXPIRE < ?", (int(time.time()),))
+                self._db.commit()
+                # 落盘后的条目可以淘汰
+                self.__evict()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                self._db.rollback()
 
     def get_cache_title(self, key):
         """
         获取缓存的标题
         """
-        cache_media_info = self._meta_data.get(key)
+        with lock:
+            cache_media_info = self.__get(key)
         if not cache_media_info or not cache_media_info.get("id"):
             return None
         return cache_media_info.get("title")
@@ -223,7 +384,9 @@ class MetaHelper(object):
         """
         重新设置缓存标题
         """
-        cache_media_info = self._meta_data.get(key)
-        if not cache_media_info:
-            return
-        self._meta_data[key]['title'] = cn_title
+        with lock:
+            cache_media_info = self.__get(key)
+            if not cache_media_info:
+                return
+            cache_media_info['title'] = cn_title
+            self._dirty_keys.add(key)
@@ -1,106 +1,363 @@
-import xml.dom.minidom
+import codecs
+import datetime
+import hashlib
+import json
+from contextlib import closing
+from threading import Lock
+
+from lxml import etree
+from requests.compat import chardet
 
 from app.db import MainDb, DbPersist
 from app.db.models import RSSTORRENTS
-from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils, DomUtils
+from app.helper.dict_helper import DictHelper
+from app.utils import RssTitleUtils, StringUtils, RequestUtils, ExceptionUtils
 from config import Config
 
+# RSS下载时每次读取的数据块大小
+RSS_CHUNK_SIZE = 64 * 1024
+# RSS拉取状态在系统字典中的类型
+RSS_FEED_STATE_DICT = "RssFeedState"
+# 批量查询已处理下载链接时每批的数量
+RSSD_QUERY_BATCH = 500
+
+rssd_lock = Lock()
+
+
+class RssFeedState(object):
+    """
+    RSS拉取状态，按站点/任务保存在系统字典中：
+    ETag/Last-Modified 用于条件请求，内容指纹用于识别未变化的RSS，
+    水位线（最新发布时间）及上次已处理条目用于只处理新增条目
+    """
+    # 状态Key
+    key = None
+    # RSS地址
+    url = None
+    # 影响处理结果的上下文指纹，如订阅、过滤规则
+    context = None
+    # 本次请求后是否判定为内容未变化
+    not_modified = False
+
+    def __init__(self, key, url, context=None):
+        self.key = key
+        self.url = url
+        self.context = context
+        self.not_modified = False
+        self._dicthelper = DictHelper()
+        self._state = {}
+        self._new_state = {}
+        self._articles = []
+        try:
+            state = json.loads(self._dicthelper.get(RSS_FEED_STATE_DICT, key) or "{}")
+        except Exception as e:
+            ExceptionUtils.exception_traceback(e)
+            state = {}
+        # RSS地址或上下文变化后，之前的状态作废
+        if state.get("url") == url and state.get("context") == context:
+            self._state = state
+
+    @staticmethod
+    def make_context(*args):
+        """
+        生成上下文指纹
+        """
+        return hashlib.md5(json.dumps(args, sort_keys=True, default=str).encode()).hexdigest()
+
+    @staticmethod
+    def get_article_key(article):
+        """
+        条目的唯一标识
+        """
+        return hashlib.md5(str(article.get("enclosure") or article.get("title") or "").encode()).hexdigest()[:16]
+
+    @staticmethod
+    def get_article_timestamp(article):
+        """
+        条目的发布时间戳
+        """
+        pubdate = article.get("pubdate")
+        if not isinstance(pubdate, datetime.datetime):
+            return None
+        return pubdate.timestamp()
+
+    def get_request_headers(self):
+        """
+        条件请求头，上次有未处理成功的条目时不使用
+        """
+        headers = {}
+        if not self._state.get("complete"):
+            return headers
+        if self._state.get("etag"):
+            headers["If-None-Match"] = self._state.get("etag")
+        if self._state.get("last_modified"):
+            headers["If-Modified-Since"] = self._state.get("last_modified")
+        return headers
+
+    def check_response(self, res, digest=None):
+        """
+        记录本次响应的ETag/Last-Modified及内容指纹，并判断内容是否未变化
+        :param res: 请求响应
+        :param digest: 响应内容的指纹，304响应时为空
+        :return: 内容未变化时返回True
+        """
+        if res is not None and res.status_code == 304:
+            self.not_modified = True
+            return True
+        self._new_state = {
+            "etag": res.headers.get("ETag") if res is not None else None,
+            "last_modified": res.headers.get("Last-Modified") if res is not None else None,
+            "digest": digest
+        }
+        self.not_modified = bool(digest
+                                 and self._state.get("complete")
+                                 and digest == self._state.get("digest"))
+        return self.not_modified
+
+    def filter_articles(self, articles):
+        """
+        过滤出水位线之后或上次未处理过的条目
+        :param articles: 本次获取到的全部条目
+        """
+        self._articles = articles
+        seen = set(self._state.get("seen") or [])
+        watermark = self._state.get("watermark")
+        new_articles = []
+        for article in articles:
+            if self.get_article_key(article) in seen:
+                timestamp = self.get_article_timestamp(article)
+                if not timestamp or not watermark or timestamp <= watermark:
+                    continue
+            new_articles.append(article)
+        return new_articles
+
+    def save(self, failed_articles=None):
+        """
+        处理完成后保存状态，处理失败的条目下次重新处理
+        :param failed_articles: 处理失败需要重试的条目
+        """
+        articles = self._articles
+        if self.not_modified:
+            return
+        failed = set(self.get_article_key(article) for article in failed_articles or [] if article)
+        seen = [key for key in dict.fromkeys(self.get_article_key(article) for article in articles)
+                if key not in failed]
+        timestamps = [self.get_article_timestamp(article) for article in articles]
+        timestamps = [timestamp for timestamp in timestamps if timestamp]
+        state = dict(self._new_state)
+        state.update({
+            "url": self.url,
+            "context": self.context,
+            "watermark": max(timestamps) if timestamps else self._state.get("watermark"),
+            "seen": seen,
+            "complete": not failed
+        })
+        self._dicthelper.set(RSS_FEED_STATE_DICT, self.key, json.dumps(state))
+        self._state = state
+
 
 class RssHelper:
     _db = MainDb()
+    # 已处理过的下载链接
+    _rssd_enclosures = None
 
     @staticmethod
-    def parse_rssxml(url, proxy=False):
+    def parse_rssxml(url, proxy=False, feed_state=None, timeout=None):
         """
         解析RSS订阅URL，获取RSS中的种子信息
         :param url: RSS地址
         :param proxy: 是否使用代理
+        :param feed_state: 上次拉取的状态（RssFeedState），传入时使用条件请求，内容未变化时 feed_state.not_modified 为True
+        :param timeout: 请求超时时间
         :return: 种子信息列表，如为None代表Rss过期
         """
-        _special_title_sites = {
-            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
-        }
-
         _rss_expired_msg = [
             "RSS 链接已过期, 您需要获得一个新的!",
             "RSS Link has expired, You need to get a new one!"
         ]
 
         # 开始处理
-        ret_array = []
         if not url:
             return []
         site_domain = StringUtils.get_url_domain(url)
+        headers = feed_state.get_request_headers() if feed_state else None
+        if headers:
+            headers.update({"User-Agent": Config().get_ua()})
         try:
-            ret = RequestUtils(proxies=Config().get_proxies() if proxy else None).get_res(url)
+            ret = RequestUtils(headers=headers,
+                               proxies=Config().get_proxies() if proxy else None,
+                               timeout=timeout).get_res(url, stream=True)
+            if feed_state and ret is not None and ret.status_code == 304:
+                feed_state.check_response(ret)
+                return []
             if not ret:
                 return []
-            ret.encoding = ret.apparent_encoding
         except Exception as e2:
             ExceptionUtils.exception_traceback(e2)
             return []
-        if ret:
-            ret_xml = ret.text
+        # 边下载边解析，同时保留原始数据，以便编码声明有误或RSS过期时回退处理
+        chunks = []
+        digest = hashlib.md5()
+
+        def _iter_chunks():
+            for chunk in ret.iter_content(chunk_size=RSS_CHUNK_SIZE):
+                chunks.append(chunk)
+                digest.update(chunk)
+                yield chunk
+
+        try:
+            with closing(ret):
+                stream = _iter_chunks()
+                try:
+                    ret_array = list(RssHelper.iter_rssxml_items(stream, site_domain))
+                except Exception as e2:
+                    # 读完剩余数据
+                    for _ in stream:
+                        pass
+                    ret_array = None
+                    parse_err = e2
+        except Exception as e2:
+            ExceptionUtils.exception_traceback(e2)
+            return []
+        if ret_array is None:
             try:
-                # 解析XML
-                dom_tree = xml.dom.minidom.parseString(ret_xml)
-                rootNode = dom_tree.documentElement
-                items = rootNode.getElementsByTagName("item")
-                for item in items:
-                    try:
-                        # 标题
-                        title = DomUtils.tag_value(item, "title", default="")
-                        if not title:
-                            continue
-                        # 标题特殊处理
-                        if site_domain and site_domain in _special_title_sites:
-                            title = _special_title_sites.get(site_domain)(title)
-                        # 描述
-                        description = DomUtils.tag_value(item, "description", default="")
-                        # 种子页面
-                        link = DomUtils.tag_value(item, "link", default="")
-                        # 种子链接
-                        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
-                        if not enclosure and not link:
-                            continue
-                        # 部分RSS只有link没有enclosure
-                        if not enclosure and link:
-                            enclosure = link
-                            link = None
-                        # 大小
-                        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
-                        if size and str(size).isdigit():
-                            size = int(size)
-                        else:
-                            size = 0
-                        # 发布日期
-                        pubdate = DomUtils.tag_value(item, "pubDate", default="")
-                        if pubdate:
-                            # 转换为时间
-                            pubdate = StringUtils.get_time_stamp(pubdate)
-                        # 返回对象
-                        tmp_dict = {'title': title,
-                                    'enclosure': enclosure,
-                                    'size': size,
-                                    'description': description,
-                                    'link': link,
-                                    'pubdate': pubdate}
-                        ret_array.append(tmp_dict)
-                    except Exception as e1:
-                        ExceptionUtils.exception_traceback(e1)
-                        continue
-            except Exception as e2:
+                content = b"".join(chunks)
+                encoding = codecs.lookup(chardet.detect(content).get("encoding") or "utf-8").name
                 # RSS过期 观众RSS 链接已过期，您需要获得一个新的！  pthome RSS Link has expired, You need to get a new one!
-                if ret_xml in _rss_expired_msg:
+                if content.decode(encoding, errors="replace") in _rss_expired_msg:
                     return None
-                ExceptionUtils.exception_traceback(e2)
+                # 按探测到的编码重新解析
+                ret_array = list(RssHelper.iter_rssxml_items([content], site_domain, encoding=encoding))
+            except Exception as e3:
+                ExceptionUtils.exception_traceback(parse_err)
+                ExceptionUtils.exception_traceback(e3)
+                return []
+        if feed_state and feed_state.check_response(ret, digest.hexdigest()):
+            return []
         return ret_array
 
-    @DbPersist(_db)
+    @staticmethod
+    def iter_rssxml_items(chunks, site_domain=None, encoding=None):
+        """
+        增量解析RSS XML，每读完一个item即返回对应的种子信息
+        :param chunks: RSS原始数据块的可迭代对象
+        :param site_domain: 站点域名，用于标题特殊处理
+        :param encoding: 强制使用的编码，为空时按XML声明解析
+        :return: 种子信息的生成器，XML格式错误时抛出异常
+        """
+        _special_title_sites = {
+            'pt.keepfrds.com': RssTitleUtils.keepfriends_title
+        }
+
+        # RSS来自远程站点，保留libxml2的大小及深度限制，不展开实体、不访问网络，防止实体膨胀攻击
+        parser = etree.XMLPullParser(events=("end",), tag="{*}item", encoding=encoding,
+                                     resolve_entities=False, no_network=True)
+        for chunk in chunks:
+            parser.feed(chunk)
+            for _, item in parser.read_events():
+                if item.prefix:
+                    continue
+                try:
+                    # 标题
+                    title = RssHelper.__tag_value(item, "title", default="")
+                    if not title:
+                        continue
+                    # 标题特殊处理
+                    if site_domain and site_domain in _special_title_sites:
+                        title = _special_title_sites.get(site_domain)(title)
+                    # 描述
+                    description = RssHelper.__tag_value(item, "description", default="")
+                    # 种子页面
+                    link = RssHelper.__tag_value(item, "link", default="")
+                    # 种子链接
+                    enclosure = RssHelper.__tag_value(item, "enclosure", "url", default="")
+                    if not enclosure and not link:
+                        continue
+                    # 部分RSS只有link没有enclosure
+                    if not enclosure and link:
+                        enclosure = link
+                        link = None
+                    # 大小
+                    size = RssHelper.__tag_value(item, "enclosure", "length", default=0)
+                    if size and str(size).isdigit():
+                        size = int(size)
+                    else:
+                        size = 0
+                    # 发布日期
+                    pubdate = RssHelper.__tag_value(item, "pubDate", default="")
+                    if pubdate:
+                        # 转换为时间
+                        pubdate = StringUtils.get_time_stamp(pubdate)
+                    # 返回对象
+                    yield {'title': title,
+                           'enclosure': enclosure,
+                           'size': size,
+                           'description': description,
+                           'link': link,
+                           'pubdate': pubdate}
+                except Exception as e1:
+                    ExceptionUtils.exception_traceback(e1)
+                    continue
+                finally:
+                    # 释放已处理的节点
+                    item.clear()
+                    while item.getprevious() is not None:
+                        del item.getparent()[0]
+        parser.close()
+
+    @staticmethod
+    def __tag_value(item, tag_name, attname="", default=None):
+        """
+        解析item下的XML标签值，与 DomUtils.tag_value 一致，只匹配不带前缀的标签
+        """
+        for tag in item.iter("{*}%s" % tag_name):
+            if tag.prefix:
+                continue
+            if attname:
+                attvalue = tag.get(attname)
+                if attvalue:
+                    return attvalue
+            elif tag.text:
+                return tag.text
+            elif len(tag) and isinstance(tag[0].tag, str):
+                # 首个子节点为标签时无法取值，与 minidom 一样视为该item无效
+                raise ValueError("标签 %s 的内容不是文本" % tag_name)
+            break
+        return default
+
+    @classmethod
+    def __get_rssd_cache(cls):
+        """
+        已处理过的下载链接，首次使用时从数据库加载，之后随增删同步更新
+        """
+        if cls._rssd_enclosures is None:
+            with rssd_lock:
+                if cls._rssd_enclosures is None:
+                    cls._rssd_enclosures = set(
+                        enclosure for enclosure, in cls._db.query(RSSTORRENTS.ENCLOSURE).filter(
+                            RSSTORRENTS.ENCLOSURE.isnot(None)).all())
+        return cls._rssd_enclosures
+
+    def __add_rssd_cache(self, enclosure):
+        if enclosure and self._rssd_enclosures is not None:
+            self._rssd_enclosures.add(enclosure)
+
+    def __remove_rssd_cache(self, enclosures):
+        if self._rssd_enclosures is not None:
+            for enclosure in enclosures:
+                self._rssd_enclosures.discard(enclosure)
+
     def insert_rss_torrents(self, media_info):
         """
         将RSS的记录插入数据库
         """
+        ret = self.__insert_rss_torrents(media_info)
+        if ret:
+            self.__add_rssd_cache(media_info.enclosure)
+        return ret
+
+    @DbPersist(_db)
+    def __insert_rss_torrents(self, media_info):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=media_info.org_string,
@@ -112,16 +369,44 @@ class RssHelper:
                 EPISODE=media_info.get_episode_string()
             ))
 
+    def get_rssd_enclosures(self, enclosures):
+        """
+        批量查询已处理过的下载链接，内存中没有的一次性查询数据库
+        :param enclosures: 下载链接列表
+        :return: 其中已处理过的下载链接集合
+        """
+        enclosures = set(enclosure for enclosure in enclosures if enclosure)
+        cache = self.__get_rssd_cache()
+        rssd = enclosures & cache
+        unknown = list(enclosures - rssd)
+        for i in range(0, len(unknown), RSSD_QUERY_BATCH):
+            for enclosure, in self._db.query(RSSTORRENTS.ENCLOSURE).filter(
+                    RSSTORRENTS.ENCLOSURE.in_(unknown[i:i + RSSD_QUERY_BATCH])).distinct().all():
+                rssd.add(enclosure)
+                cache.add(enclosure)
+        return rssd
+
+    def get_rssd_torrent_names(self, torrent_names):
+        """
+        批量查询已处理过的种子名称
+        :param torrent_names: 种子名称列表
+        :return: 其中已处理过的种子名称集合
+        """
+        torrent_names = list(set(name for name in torrent_names if name))
+        rssd = set()
+        for i in range(0, len(torrent_names), RSSD_QUERY_BATCH):
+            for name, in self._db.query(RSSTORRENTS.TORRENT_NAME).filter(
+                    RSSTORRENTS.TORRENT_NAME.in_(torrent_names[i:i + RSSD_QUERY_BATCH])).distinct().all():
+                rssd.add(name)
+        return rssd
+
     def is_rssd_by_enclosure(self, enclosure):
         """
         查询RSS是否处理过，根据下载链接
         """
         if not enclosure:
             return True
-        if self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count() > 0:
-            return True
-        else:
-            return False
+        return enclosure in self.get_rssd_enclosures([enclosure])
 
     def is_rssd_by_simple(self, torrent_name, enclosure):
         """
@@ -130,36 +415,56 @@ class RssHelper:
         if not torrent_name and not enclosure:
             return True
         if enclosure:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.ENCLOSURE == enclosure).count()
+            return enclosure in self.get_rssd_enclosures([enclosure])
         else:
-            ret = self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == torrent_name).count()
-        return True if ret > 0 else False
+            return torrent_name in self.get_rssd_torrent_names([torrent_name])
 
-    @DbPersist(_db)
     def simple_insert_rss_torrents(self, title, enclosure):
         """
         将RSS的记录插入数据库
         """
+        ret = self.__simple_insert_rss_torrents(title, enclosure)
+        if ret:
+            self.__add_rssd_cache(enclosure)
+        return ret
+
+    @DbPersist(_db)
+    def __simple_insert_rss_torrents(self, title, enclosure):
         self._db.insert(
             RSSTORRENTS(
                 TORRENT_NAME=title,
                 ENCLOSURE=enclosure
             ))
 
-    @DbPersist(_db)
     def simple_delete_rss_torrents(self, title, enclosure=None):
         """
         删除RSS的记录
         """
+        if enclosure:
+            enclosures = [enclosure]
+        else:
+            enclosures = [enclosure for enclosure, in self._db.query(RSSTORRENTS.ENCLOSURE).filter(
+                RSSTORRENTS.TORRENT_NAME == title).all()]
+        ret = self.__simple_delete_rss_torrents(title, enclosure)
+        self.__remove_rssd_cache(enclosures)
+        return ret
+
+    @DbPersist(_db)
+    def __simple_delete_rss_torrents(self, title, enclosure=None):
         if enclosure:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title,
                                                RSSTORRENTS.ENCLOSURE == enclosure).delete()
         else:
             self._db.query(RSSTORRENTS).filter(RSSTORRENTS.TORRENT_NAME == title).delete()
 
-    @DbPersist(_db)
     def truncate_rss_history(self):
         """
         清空RSS历史记录
         """
+        ret = self.__truncate_rss_history()
+        RssHelper._rssd_enclosures = None
+        return ret
+
+    @DbPersist(_db)
+    def __truncate_rss_history(self):
         self._db.query(RSSTORRENTS).delete()
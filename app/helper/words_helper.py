@@ -11,6 +11,10 @@ class WordsHelper:
     dbhelper = None
     # 识别词
     words_info = []
+    # 预编译的识别词
+    _compiled_words = []
+    # 识别词版本，识别词变化时递增，用于使名称识别缓存失效
+    generation = 0
 
     def __init__(self):
         self.init_config()
@@ -18,6 +22,64 @@ class WordsHelper:
     def init_config(self):
         self.dbhelper = DbHelper()
         self.words_info = self.dbhelper.get_custom_words(enabled=1)
+        self._compiled_words = self.__compile_words(self.words_info)
+        self.generation += 1
+
+    @staticmethod
+    def __compile_pattern(pattern):
+        """
+        编译正则表达式，编译失败时返回异常，在使用时再报告
+        """
+        try:
+            return re.compile(r'%s' % pattern)
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return err
+
+    def __compile_words(self, words_info):
+        """
+        预编译识别词：正则识别词编译为Pattern对象，
+        连续的非正则屏蔽词、替换词合并为一个交替匹配，标题中不包含其中任何一个时整组跳过
+        :return: [(交替匹配Pattern或None, [(识别词, 预编译的正则)])]
+        """
+        compiled_words = []
+        literal_words = []
+
+        def __flush_literal_words():
+            if not literal_words:
+                return
+            prefilter = re.compile("|".join(re.escape(word_info.REPLACED) for word_info in literal_words))
+            compiled_words.append((prefilter, [(word_info, None) for word_info in literal_words]))
+            literal_words.clear()
+
+        for word_info in words_info:
+            match word_info.TYPE:
+                case 1 | 2 if not word_info.REGEX and isinstance(word_info.REPLACED, str):
+                    literal_words.append(word_info)
+                    continue
+                case 1 | 2:
+                    patterns = {"replaced": self.__compile_pattern(word_info.REPLACED)}
+                case 3:
+                    patterns = {"replaced": self.__compile_pattern(word_info.REPLACED),
+                                **self.__compile_offset(word_info.FRONT, word_info.BACK)}
+                case 4:
+                    patterns = self.__compile_offset(word_info.FRONT, word_info.BACK)
+                case _:
+                    patterns = {}
+            __flush_literal_words()
+            compiled_words.append((None, [(word_info, patterns)]))
+        __flush_literal_words()
+        return compiled_words
+
+    def __compile_offset(self, front, back):
+        """
+        预编译集数偏移用到的正则
+        """
+        return {
+            "front": self.__compile_pattern(front) if front else None,
+            "back": self.__compile_pattern(back) if back else None,
+            "offset": self.__compile_pattern(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+        }
 
     def process(self, title):
         # 错误信息
@@ -29,67 +91,108 @@ class WordsHelper:
         # 应用集偏移
         used_offset_words = []
         # 应用识别词
-        for word_info in self.words_info:
-            match word_info.TYPE:
-                case 1:
-                    # 屏蔽
-                    ignored = word_info.REPLACED
-                    ignored_word = ignored
-                    title, ignore_msg, ignore_flag = self.replace_regex(title, ignored, "") \
-                        if word_info.REGEX else self.replace_noregex(title, ignored, "")
-                    if ignore_flag:
-                        used_ignored_words.append(ignored_word)
-                    elif ignore_msg:
-                        msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
-                case 2:
-                    # 替换
-                    replaced, replace = word_info.REPLACED, word_info.REPLACE
-                    replaced_word = f"{replaced} ⇒ {replace}"
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace) \
-                        if word_info.REGEX else self.replace_noregex(title, replaced, replace)
-                    if replace_flag:
-                        used_replaced_words.append(replaced_word)
-                    elif replace_msg:
-                        msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
+        for prefilter, words in self._compiled_words:
+            # 整组非正则识别词都不在标题中
+            if prefilter and isinstance(title, str) and not prefilter.search(title):
+                continue
+            for word_info, patterns in words:
+                match word_info.TYPE:
+                    case 1:
+                        # 屏蔽
+                        ignored = word_info.REPLACED
+                        ignored_word = ignored
+                        title, ignore_msg, ignore_flag = self.__replace_compiled(title, patterns.get("replaced"), "") \
+                            if word_info.REGEX else self.replace_noregex(title, ignored, "")
+                        if ignore_flag:
+                            used_ignored_words.append(ignored_word)
+                        elif ignore_msg:
+                            msg.append(f"自定义屏蔽词 {ignored_word} 设置有误：{ignore_msg}")
+                    case 2:
+                        # 替换
+                        replaced, replace = word_info.REPLACED, word_info.REPLACE
+                        replaced_word = f"{replaced} ⇒ {replace}"
+                        title, replace_msg, replace_flag = \
+                            self.__replace_compiled(title, patterns.get("replaced"), replace) \
+                            if word_info.REGEX else self.replace_noregex(title, replaced, replace)
+                        if replace_flag:
+                            used_replaced_words.append(replaced_word)
+                        elif replace_msg:
+                            msg.append(f"自定义替换词 {replaced_word} 格式有误：{replace_msg}")
 
-                case 3:
-                    # 替换+集偏移
-                    replaced, replace, front, back, offset = \
-                        word_info.REPLACED, word_info.REPLACE, word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    replaced_word = f"{replaced} ⇒ {replace}"
-                    offset_word = f"{front} + {back} >> {offset}"
-                    replaced_offset_word = f"{replaced_word} @@@ {offset_word}"
-                    # 记录替换前title
-                    title_cache = title
-                    # 替换
-                    title, replace_msg, replace_flag = self.replace_regex(title, replaced, replace)
-                    # 替换应用成功进行集数偏移
-                    if replace_flag:
-                        title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
-                        # 集数偏移应用成功
+                    case 3:
+                        # 替换+集偏移
+                        replaced, replace, front, back, offset = \
+                            word_info.REPLACED, word_info.REPLACE, word_info.FRONT, word_info.BACK, word_info.OFFSET
+                        replaced_word = f"{replaced} ⇒ {replace}"
+                        offset_word = f"{front} + {back} >> {offset}"
+                        replaced_offset_word = f"{replaced_word} @@@ {offset_word}"
+                        # 记录替换前title
+                        title_cache = title
+                        # 替换
+                        title, replace_msg, replace_flag = self.__replace_compiled(title, patterns.get("replaced"),
+                                                                                   replace)
+                        # 替换应用成功进行集数偏移
+                        if replace_flag:
+                            title, offset_msg, offset_flag = self.__episode_offset_compiled(title, front, back,
+                                                                                            offset, patterns)
+                            # 集数偏移应用成功
+                            if offset_flag:
+                                used_replaced_words.append(replaced_word)
+                                used_offset_words.append(offset_word)
+                            elif offset_msg:
+                                # 还原title
+                                title = title_cache
+                                msg.append(
+                                    f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
+                        elif replace_msg:
+                            msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
+                    case 4:
+                        # 集数偏移
+                        front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
+                        offset_word = f"{front} + {back} >> {offset}"
+                        title, offset_msg, offset_flag = self.__episode_offset_compiled(title, front, back,
+                                                                                        offset, patterns)
                         if offset_flag:
-                            used_replaced_words.append(replaced_word)
                             used_offset_words.append(offset_word)
                         elif offset_msg:
-                            # 还原title
-                            title = title_cache
-                            msg.append(
-                                f"自定义替换+集偏移词 {replaced_offset_word} 集偏移部分格式有误：{offset_msg}")
-                    elif replace_msg:
-                        msg.append(f"自定义替换+集偏移词 {replaced_offset_word} 替换部分格式有误：{replace_msg}")
-                case 4:
-                    # 集数偏移
-                    front, back, offset = word_info.FRONT, word_info.BACK, word_info.OFFSET
-                    offset_word = f"{front} + {back} >> {offset}"
-                    title, offset_msg, offset_flag = self.episode_offset(title, front, back, offset)
-                    if offset_flag:
-                        used_offset_words.append(offset_word)
-                    elif offset_msg:
-                        msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
-                case _:
-                    pass
+                            msg.append(f"自定义集偏移词 {offset_word} 格式有误：{offset_msg}")
+                    case _:
+                        pass
         return title, msg, {"ignored": used_ignored_words, "replaced": used_replaced_words, "offset": used_offset_words}
 
+    @staticmethod
+    def __replace_compiled(title, pattern, replace) -> Tuple[str, str, bool]:
+        """
+        使用预编译的正则替换，与 replace_regex 结果一致
+        """
+        if isinstance(pattern, Exception):
+            return title, str(pattern), False
+        try:
+            if not pattern.search(title):
+                return title, "", False
+            else:
+                return pattern.sub(r'%s' % replace, title), "", True
+        except Exception as err:
+            ExceptionUtils.exception_traceback(err)
+            return title, str(err), False
+
+    def __episode_offset_compiled(self, title, front, back, offset, patterns) -> Tuple[str, str, bool]:
+        """
+        使用预编译的正则判断是否需要集数偏移，与 episode_offset 结果一致
+        """
+        for pattern in (patterns.get("back"), patterns.get("front")):
+            if isinstance(pattern, Exception):
+                return title, str(pattern), False
+            try:
+                if pattern and not pattern.search(title):
+                    return title, "", False
+            except Exception as err:
+                ExceptionUtils.exception_traceback(err)
+                return title, str(err), False
+        if isinstance(patterns.get("offset"), Exception):
+            return title, str(patterns.get("offset")), False
+        return self.episode_offset(title, front, back, offset, offset_word_info_re=patterns.get("offset"))
+
     @staticmethod
     def replace_regex(title, replaced, replace) -> Tuple[str, str, bool]:
         try:
@@ -113,13 +216,14 @@ class WordsHelper:
             return title, str(err), False
 
     @staticmethod
-    def episode_offset(title, front, back, offset) -> Tuple[str, str, bool]:
+    def episode_offset(title, front, back, offset, offset_word_info_re=None) -> Tuple[str, str, bool]:
         try:
-            if back and not re.findall(r'%s' % back, title):
-                return title, "", False
-            if front and not re.findall(r'%s' % front, title):
-                return title, "", False
-            offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
+            if offset_word_info_re is None:
+                if back and not re.findall(r'%s' % back, title):
+                    return title, "", False
+                if front and not re.findall(r'%s' % front, title):
+                    return title, "", False
+                offset_word_info_re = re.compile(r'(?<=%s.*?)[0-9一二三四五六七八九十]+(?=.*?%s)' % (front, back))
             episode_nums_str = re.findall(offset_word_info_re, title)
             if not episode_nums_str:
                 return title, "", False
@@ -1,3 +1,4 @@
+import copy
 import datetime
 from abc import ABCMeta, abstractmethod
 
@@ -65,7 +66,8 @@ class _IIndexClient(metaclass=ABCMeta):
                key_word,
                filter_args: dict,
                match_media,
-               in_from: SearchType):
+               in_from: SearchType,
+               context=None):
         """
         根据关键字多线程搜索
         """
@@ -78,6 +80,15 @@ class _IIndexClient(metaclass=ABCMeta):
             return True
         return False
 
+    @staticmethod
+    def memoize(context, key, func):
+        """
+        有搜索上下文时，各站点共享同一次搜索中的识别结果
+        """
+        if not context:
+            return func()
+        return context.memoize(key, func)
+
     def is_indebug(self):
         loglevel = Config().get_config('app').get('loglevel') or "info"
         if loglevel == "debug":
@@ -145,7 +156,8 @@ class _IIndexClient(metaclass=ABCMeta):
                               indexer,
                               filter_args: dict,
                               match_media,
-                              start_time):
+                              start_time,
+                              context=None):
         """
         从搜索结果中匹配符合资源条件的记录
         """
@@ -226,9 +238,11 @@ class _IIndexClient(metaclass=ABCMeta):
                                 if not cached_tmdb_infos:
                                     log.info(f"search tmdb for filter")
                                     en_title = self.media.get_tmdb_us_title(match_media.tmdb_info)
-                                    cached_tmdb_infos = self.media.get_tmdb_infos(title=en_title,
-                                                                                  mtype=match_media.type,
-                                                                                  page=1)
+                                    cached_tmdb_infos = self.memoize(
+                                        context, ("tmdb_infos", en_title, match_media.type),
+                                        lambda: self.media.get_tmdb_infos(title=en_title,
+                                                                          mtype=match_media.type,
+                                                                          page=1))
                                     if not cached_tmdb_infos:
                                         log.info(
                                             f"【{self.client_name}】{torrent_name} 未在 tmdb 中发现匹配 {en_title} 信息")
@@ -427,7 +441,8 @@ class _IIndexClient(metaclass=ABCMeta):
                               indexer,
                               filter_args: dict,
                               match_media,
-                              start_time):
+                              start_time,
+                              context=None):
         """
         从搜索结果中匹配符合资源条件的记录
         """
@@ -507,9 +522,11 @@ class _IIndexClient(metaclass=ABCMeta):
                         if not cached_tmdb_infos:
                             log.info(f"search tmdb for filter")
                             en_title = self.media.get_tmdb_us_title(match_media.tmdb_info)
-                            cached_tmdb_infos = self.media.get_tmdb_infos(title=en_title,
-                                                                          mtype=match_media.type,
-                                                                          page=1)
+                            cached_tmdb_infos = self.memoize(
+                                context, ("tmdb_infos", en_title, match_media.type),
+                                lambda: self.media.get_tmdb_infos(title=en_title,
+                                                                  mtype=match_media.type,
+                                                                  page=1))
                             if not cached_tmdb_infos:
                                 log.info(
                                     f"【{self.client_name}】{torrent_name} 未在 tmdb 中发现匹配 {en_title} 信息")
@@ -690,6 +707,16 @@ class _IIndexClient(metaclass=ABCMeta):
             self.print_ret_array(matched_torrent)
         return ret_array
 
+    def __recognize(self, meta_info, match_media, torrent_name, description):
+        """
+        识别种子的媒体信息，优先查询识别缓存
+        :return: 是否与识别缓存匹配，未匹配时重新识别的媒体信息
+        """
+        cache_info = self.media.get_cache_info(meta_info)
+        if str(cache_info.get("id")) == str(match_media.tmdb_id):
+            return True, None
+        return False, self.media.get_media_info(title=torrent_name, subtitle=description, chinese=False)
+
     def print_result_array(self, result_array):
         for result in result_array:
             log.info(f"item[title:{result.get('title', None)}, year:{result.get('year', None)}, season:{result.get('season', None)}, episode:{result.get('episode', None)}] ")
@@ -703,7 +730,8 @@ class _IIndexClient(metaclass=ABCMeta):
                               indexer,
                               filter_args: dict,
                               match_media,
-                              start_time):
+                              start_time,
+                              context=None):
         """
         从搜索结果中匹配符合资源条件的记录
         """
@@ -765,9 +793,11 @@ class _IIndexClient(metaclass=ABCMeta):
                                          en_name=match_media.original_title,
                                          tmdb_id=match_media.tmdb_id,
                                          imdb_id=match_media.imdb_id)
-                    meta_info.set_tmdb_info(self.media.get_tmdb_info(mtype=match_media.media_type,
-                                                             tmdbid=match_media.tmdb_id,
-                                                             append_to_response="all"))
+                    meta_info.set_tmdb_info(self.memoize(
+                        context, ("tmdb_info", match_media.media_type, match_media.tmdb_id),
+                        lambda: self.media.get_tmdb_info(mtype=match_media.media_type,
+                                                         tmdbid=match_media.tmdb_id,
+                                                         append_to_response="all")))
                 else:
                     meta_info = MetaInfo(title=torrent_name, subtitle=f"{labels} {description}")
 
@@ -814,15 +844,14 @@ class _IIndexClient(metaclass=ABCMeta):
                         # IMDBID匹配，合并媒体数据
                         media_info = self.media.merge_media_info(meta_info, match_media)
                     else:
-                        # 查询缓存
-                        cache_info = self.media.get_cache_info(meta_info)
-                        if match_media \
-                                and str(cache_info.get("id")) == str(match_media.tmdb_id):
+                        # 查询缓存或重新识别，不同站点的同一种子只识别一次
+                        cache_matched, media_info = self.memoize(
+                            context, ("media_info", torrent_name, labels, description),
+                            lambda: self.__recognize(meta_info, match_media, torrent_name, description))
+                        if cache_matched:
                             # 缓存匹配，合并媒体数据
                             media_info = self.media.merge_media_info(meta_info, match_media)
                         else:
-                            # 重新识别
-                            media_info = self.media.get_media_info(title=torrent_name, subtitle=description, chinese=False)
                             if not media_info:
                                 log.warn(f"【{self.client_name}】{torrent_name} 识别媒体信息出错！")
                                 index_error += 1
@@ -840,8 +869,8 @@ class _IIndexClient(metaclass=ABCMeta):
                                     f"与 {match_media.type.value}/{match_media.get_title_string()}/{match_media.tmdb_id} 不匹配")
                                 index_match_fail += 1
                                 continue
-                            # 合并媒体数据
-                            media_info = self.media.merge_media_info(media_info, match_media)
+                            # 合并媒体数据，识别结果由各站点共享，复制后再修改
+                            media_info = self.media.merge_media_info(copy.copy(media_info), match_media)
                     # 过滤类型
                     if filter_args.get("type"):
                         if (filter_args.get("type") == MediaType.TV and media_info.type == MediaType.MOVIE) \
@@ -1,9 +1,9 @@
 from pyquery import PyQuery
 from app.utils.exception_utils import ExceptionUtils
-import copy
 import log
 from jinja2 import Template
 
+from app.indexer.client._selector import SelectorNodes
 from app.indexer.client._spider import TorrentSpider
 
 
@@ -22,19 +22,16 @@ class HaiDanSpider(TorrentSpider):
                 self.is_complete = True
                 return
             # 解析站点文本对象
-            html_doc = PyQuery(html_text)
+            html_doc = SelectorNodes(PyQuery(html_text), self.selectors)
             # 种子筛选器
             torrents_selector = self.list.get('selector', '')
             # 遍历种子html列表
-            for torn in html_doc(torrents_selector):
-                group = PyQuery(torn)
-                for torrent in group('div.torrent_wrap'):
-                    # log.debug(f"[haidan] {torrent}")
-                    torrent_query = PyQuery(torrent)
+            for group in html_doc(torrents_selector).items():
+                for torrent_query in group('div.torrent_wrap').items():
                     torrent_info = self.Getinfo(torrent_query)
                     # use group name + torrent name override
                     self.Gettitle_with_group(group, torrent_query)
-                    self.torrents_info_array.append(copy.deepcopy(torrent_info))
+                    self.torrents_info_array.append(torrent_info)
                     if len(self.torrents_info_array) >= int(self.result_num):
                         break
 
@@ -1,11 +1,11 @@
 # coding: utf-8
-import copy
 import time
 from urllib.parse import quote
 
 from pyquery import PyQuery
 
 from app.helper import ChromeHelper
+from app.indexer.client._selector import SelectorNodes
 from app.indexer.client._spider import TorrentSpider
 from app.utils import ExceptionUtils
 from config import Config
@@ -121,12 +121,21 @@ class RenderSpider(object):
             torrents_selector = self._indexer.torrents.get('list', {}).get('selector', '')
             if not torrents_selector:
                 return False, []
-            # 解析HTML文本
-            html_doc = PyQuery(html_text)
-            for torn in html_doc(torrents_selector):
-                self.torrents_info_array.append(copy.deepcopy(self.torrentspider.Getinfo(PyQuery(torn))))
-                if len(self.torrents_info_array) >= int(self.result_num):
-                    break
+            # 解析HTML文本为阻塞操作，放到线程池中执行，避免占用共享事件循环
+            await asyncio.get_running_loop().run_in_executor(None,
+                                                             self.__parse_torrents,
+                                                             html_text,
+                                                             torrents_selector)
             return False, self.torrents_info_array
         finally:
             await chrome.quit()
+
+    def __parse_torrents(self, html_text, torrents_selector):
+        """
+        解析HTML文本中的种子信息
+        """
+        html_doc = SelectorNodes(PyQuery(html_text), self.torrentspider.selectors)
+        for torrent in html_doc(torrents_selector).items():
+            self.torrents_info_array.append(self.torrentspider.Getinfo(torrent))
+            if len(self.torrents_info_array) >= int(self.result_num):
+                break
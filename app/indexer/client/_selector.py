@@ -0,0 +1,103 @@
+import copy
+
+from jinja2 import Template
+from lxml import etree
+from pyquery import PyQuery
+from pyquery.cssselectpatch import JQueryTranslator
+from pyquery.text import extract_text
+
+
+class SelectorCache(object):
+    """
+    索引器种子列表选择器的编译缓存，站点配置中的CSS选择器只转换并编译一次为lxml XPath，字段模板只编译一次
+    转换规则与 PyQuery 相同，支持 :has、:contains 等 jQuery 扩展
+    """
+    _translator = JQueryTranslator(xhtml=False)
+    # 索引器ID -> SelectorCache
+    _caches = {}
+
+    def __init__(self):
+        # CSS选择器 -> XPath
+        self._xpaths = {}
+        # 模板文本 -> Template
+        self._templates = {}
+
+    @classmethod
+    def get(cls, indexerid):
+        """
+        获取索引器的选择器缓存
+        """
+        cache = cls._caches.get(indexerid)
+        if cache is None:
+            cache = cls._caches.setdefault(indexerid, cls())
+        return cache
+
+    def xpath(self, selector):
+        """
+        获取CSS选择器编译后的XPath
+        """
+        xpath = self._xpaths.get(selector)
+        if xpath is None:
+            expr = self._translator.css_to_xpath(selector.replace('[@', '['), 'descendant-or-self::')
+            xpath = etree.XPath(expr)
+            self._xpaths[selector] = xpath
+        return xpath
+
+    def template(self, text):
+        """
+        获取编译后的字段模板
+        """
+        template = self._templates.get(text)
+        if template is None:
+            template = Template(text)
+            self._templates[text] = template
+        return template
+
+
+class SelectorNodes(list):
+    """
+    选择器匹配到的节点，实现种子字段解析用到的 PyQuery 接口：选择、clone、remove、items、text、attr
+    不再为每次选择构造 PyQuery 对象，clone 延迟到 remove 时才复制节点
+    """
+    _attr_mapping = {'class_': 'class', 'for_': 'for'}
+
+    def __init__(self, elements, cache, copied=True):
+        super().__init__(elements)
+        self._cache = cache
+        # 节点是否可以直接修改，clone 后在 remove 前复制
+        self._copied = copied
+
+    def __call__(self, selector):
+        if not selector:
+            return SelectorNodes([], self._cache)
+        if selector.startswith('<'):
+            return PyQuery(selector)
+        xpath = self._cache.xpath(selector)
+        results = []
+        for tag in self:
+            results.extend(xpath(tag))
+        return SelectorNodes(results, self._cache)
+
+    def clone(self):
+        return SelectorNodes(self, self._cache, copied=False)
+
+    def remove(self, selector):
+        if not self._copied:
+            self[:] = [copy.deepcopy(tag) for tag in self]
+            self._copied = True
+        PyQuery(list(self(selector))).remove()
+        return self
+
+    def items(self):
+        for tag in self:
+            yield SelectorNodes([tag], self._cache, self._copied)
+
+    def text(self):
+        if not self:
+            return ''
+        return ' '.join(PyQuery(tag).html() if tag.tag == 'textarea' else extract_text(tag) for tag in self)
+
+    def attr(self, name):
+        if not self:
+            return None
+        return self[0].get(self._attr_mapping.get(name, name))
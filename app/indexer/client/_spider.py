@@ -1,21 +1,25 @@
-import copy
 import datetime
 import re
+import threading
 from urllib.parse import quote
 
-from jinja2 import Template
 from pyquery import PyQuery
 
 import feapder
 import log
 from app.helper import RedisHelper
+from app.indexer.client._selector import SelectorCache, SelectorNodes
 from app.utils import StringUtils, SystemUtils, RequestUtils
 from app.utils.exception_utils import ExceptionUtils
 from app.utils.types import MediaType
-from config import Config
+from config import Config, SEARCH_SITE_CONCURRENCY
 from feapder.utils.tools import urlencode
 from typing import Optional, Union, List
 
+# 全站免费提示横幅
+ALL_SITES_FREE_PATTERN = re.compile(r'<h1.*?>.*?全站\s+\[Free\]\s+生效中.*?</h1>', re.IGNORECASE)
+
+
 class TorrentSpider(feapder.AirSpider):
     _webdriver_path = SystemUtils.get_webdriver_path()
     _redis_valid = RedisHelper.is_valid()
@@ -44,14 +48,21 @@ class TorrentSpider(feapder.AirSpider):
             custom_argument=["--ignore-certificate-errors"],
         )
     )
-    # 是否搜索完成标志
-    is_complete = False
     # 是否出现错误
     is_error = False
+    # 搜索完成事件
+    _complete_event = None
+    # 爬虫线程已退出，可以再次启动
+    _finished_event = None
+    # 空闲的爬虫：(爬虫类, 索引器ID) -> 爬虫列表
+    _idle_spiders = {}
+    _pool_lock = threading.Lock()
     # 索引器ID
     indexerid = None
     # 索引器名称
     indexername = None
+    # 索引器选择器及字段模板的编译缓存
+    selectors = None
     # 站点域名
     domain = None
     # 站点Cookie
@@ -108,6 +119,7 @@ class TorrentSpider(feapder.AirSpider):
         self.mtype = mtype
         self.indexerid = indexer.id
         self.indexername = indexer.name
+        self.selectors = SelectorCache.get(indexer.id)
         self.search_config = indexer.search_config
         self.batch = indexer.batch
         self.browse = indexer.browse
@@ -131,6 +143,81 @@ class TorrentSpider(feapder.AirSpider):
             self.referer = referer
         self.result_num = Config().get_config('pt').get('site_search_result_num') or 100
         self.torrents_info_array = []
+        self.is_error = False
+        self.is_complete = False
+
+    @classmethod
+    def acquire(cls, indexer):
+        """
+        获取索引器的空闲爬虫，没有时新建，使用完后调用 release 归还
+        """
+        with cls._pool_lock:
+            spiders = cls._idle_spiders.get((cls, indexer.id)) or []
+            for spider in spiders:
+                # 上次启动的爬虫线程未退出时不能再次启动
+                if spider._finished_event.is_set():
+                    spiders.remove(spider)
+                    return spider
+        return cls()
+
+    def release(self):
+        """
+        归还爬虫，每个索引器最多保留 SEARCH_SITE_CONCURRENCY 个空闲爬虫
+        """
+        if not self.is_complete:
+            return
+        self.torrents_info_array = []
+        with self._pool_lock:
+            spiders = self._idle_spiders.setdefault((self.__class__, self.indexerid), [])
+            if len(spiders) < SEARCH_SITE_CONCURRENCY:
+                spiders.append(self)
+
+    @property
+    def is_complete(self):
+        """
+        是否搜索完成
+        """
+        return self._complete_event is not None and self._complete_event.is_set()
+
+    @is_complete.setter
+    def is_complete(self, value):
+        if self._complete_event is None:
+            self._complete_event = threading.Event()
+        if value:
+            self._complete_event.set()
+        else:
+            self._complete_event.clear()
+
+    def wait_complete(self, timeout=None):
+        """
+        等待搜索完成，无需等待爬虫线程退出
+        :return: 是否在超时前完成
+        """
+        if self._complete_event is None:
+            self._complete_event = threading.Event()
+        return self._complete_event.wait(timeout)
+
+    def start(self):
+        self._finished_event = threading.Event()
+        super().start()
+
+    def run(self):
+        try:
+            super().run()
+        finally:
+            self._finished_event.set()
+
+    def start_callback(self):
+        # 复用的爬虫清理上次运行已停止的解析线程
+        self._parser_controls.clear()
+
+    def failed_request(self, request, response, e):
+        """
+        请求失败时立即结束搜索，不再等待超时
+        """
+        log.warn(f"【Spider】{self.indexername} 请求失败：{str(e)}")
+        self.is_error = True
+        self.is_complete = True
 
     def start_requests(self):
         """
@@ -282,7 +369,7 @@ class TorrentSpider(feapder.AirSpider):
                 items = self.__attribute_or_text(title_optional_item, title_optional_selector)
                 title_optional = self.__index(items, title_optional_selector)
                 render_dict.update({'title_optional': title_optional})
-            self.torrents_info['title'] = Template(selector.get('text')).render(fields=render_dict)
+            self.torrents_info['title'] = self.selectors.template(selector.get('text')).render(fields=render_dict)
         self.torrents_info['title'] = self.__filter_text(self.torrents_info.get('title'),
                                                          selector.get('filters'))
 
@@ -312,7 +399,7 @@ class TorrentSpider(feapder.AirSpider):
                 items = self.__attribute_or_text(title_optional_item, title_optional_selector)
                 title_optional = self.__index(items, title_optional_selector)
                 render_dict.update({'title_optional': title_optional})
-            self.torrents_info['title'] = Template(selector.get('text')).render(fields=render_dict)
+            self.torrents_info['title'] = self.selectors.template(selector.get('text')).render(fields=render_dict)
         self.torrents_info['title'] = self.__filter_text(self.torrents_info.get('title'),
                                                          selector.get('filters'))
 
@@ -358,7 +445,7 @@ class TorrentSpider(feapder.AirSpider):
                 items = self.__attribute_or_text(description_normal_item, description_normal_selector)
                 description_normal = self.__index(items, description_normal_selector)
                 render_dict.update({"description_normal": description_normal})
-            self.torrents_info['description'] = Template(selector.get('text')).render(fields=render_dict)
+            self.torrents_info['description'] = self.selectors.template(selector.get('text')).render(fields=render_dict)
         self.torrents_info['description'] = self.__filter_text(self.torrents_info.get('description'),
                                                                selector.get('filters'))
 
@@ -722,14 +809,12 @@ class TorrentSpider(feapder.AirSpider):
             items = items[0]
         return items
 
-    def clean_all_sites_free(self, html):
-        # 匹配字符串 "全站 [Free] 生效中"，不区分大小写
-        pattern = re.compile(r'<h1.*?>.*?全站\s+\[Free\]\s+生效中.*?</h1>', re.IGNORECASE)
-
-        # 使用 re.sub 进行替换
-        cleaned_html = re.sub(pattern, '', html)
-
-        return cleaned_html
+    @staticmethod
+    def clean_all_sites_free(html):
+        # 匹配字符串 "全站 [Free] 生效中"，不区分大小写，页面中没有时不再对整个页面做正则替换
+        if not html or "全站" not in html:
+            return html
+        return ALL_SITES_FREE_PATTERN.sub('', html)
 
     def parse(self, request, response):
         """
@@ -743,13 +828,13 @@ class TorrentSpider(feapder.AirSpider):
                 self.is_error = True
                 self.is_complete = True
                 return
-            # 解析站点文本对象
-            html_doc = PyQuery(html_text)
+            # 解析站点文本对象，选择器使用索引器的编译缓存
+            html_doc = SelectorNodes(PyQuery(html_text), self.selectors)
             # 种子筛选器
             torrents_selector = self.list.get('selector', '')
-            # 遍历种子html列表
-            for torn in html_doc(torrents_selector):
-                self.torrents_info_array.append(copy.deepcopy(self.Getinfo(PyQuery(torn))))
+            # 遍历种子html列表，Getinfo 每次返回新的字典，无需复制
+            for torrent in html_doc(torrents_selector).items():
+                self.torrents_info_array.append(self.Getinfo(torrent))
                 if len(self.torrents_info_array) >= int(self.result_num):
                     break
 
@@ -1,10 +1,10 @@
-import copy
+import asyncio
 import datetime
-import time
+from functools import partial
 
 import log
 from app.conf import SystemConfig
-from app.helper import ProgressHelper, ChromeHelper, DbHelper
+from app.helper import ProgressHelper, ChromeHelper, DbHelper, AsyncHelper
 from app.indexer.client._base import _IIndexClient
 from app.indexer.client._haidan import HaiDanSpider
 from app.indexer.client._render_spider import RenderSpider
@@ -14,14 +14,13 @@ from app.indexer.client._tnode import TNodeSpider
 from app.indexer.client._torrentleech import TorrentLeech
 from app.indexer.client._plugins import PluginsSpider
 from app.indexer.client._mteam import MTeamSpider
+from app.indexer.search_context import SearchContext
 from app.sites import Sites
 from app.utils import StringUtils
 from app.utils.types import SearchType, IndexerType, ProgressKey, SystemConfigKey, MediaType
-from config import Config
+from config import Config, SEARCH_SITE_TIMEOUT, SEARCH_SITE_CONCURRENCY
 from web.backend.pro_user import ProUser
 
-import asyncio
-
 class BuiltinIndexer(_IIndexClient):
     # 索引器ID
     client_id = "builtin"
@@ -39,6 +38,8 @@ class BuiltinIndexer(_IIndexClient):
     user = None
     chromehelper = None
     systemconfig = None
+    # 各站点的请求并发控制，仅在共享事件循环中使用
+    _site_semaphores = {}
 
     def __init__(self, config=None):
         super().__init__()
@@ -157,9 +158,29 @@ class BuiltinIndexer(_IIndexClient):
                key_word,
                filter_args: dict,
                match_media,
-               in_from: SearchType):
+               in_from: SearchType,
+               context: SearchContext = None):
+        """
+        根据关键字搜索单个站点
+        """
+        return AsyncHelper().run(self.async_search(order_seq=order_seq,
+                                                   indexer=indexer,
+                                                   key_word=key_word,
+                                                   filter_args=filter_args,
+                                                   match_media=match_media,
+                                                   in_from=in_from,
+                                                   context=context))
+
+    async def async_search(self, order_seq,
+                           indexer,
+                           key_word,
+                           filter_args: dict,
+                           match_media,
+                           in_from: SearchType,
+                           context: SearchContext = None):
         """
-        根据关键字多线程搜索
+        根据关键字搜索单个站点，在共享事件循环中运行，阻塞的站点请求及结果过滤提交到共享线程池执行
+        :param context: 搜索上下文，多个站点一起搜索时由调用方创建并共享，为空时仅用于本站点
         """
         if not indexer or not key_word:
             return None
@@ -167,17 +188,13 @@ class BuiltinIndexer(_IIndexClient):
         if self.sites.check_ratelimit(indexer.siteid):
             self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 触发站点流控，跳过 ...")
             return []
-        # fix 共用同一个dict时会导致某个站点的更新全局全效
-        if filter_args is None:
-            _filter_args = {}
-        else:
-            _filter_args = copy.deepcopy(filter_args)
+        if context is None:
+            context = SearchContext(filter_args=filter_args)
         # 不在设定搜索范围的站点过滤掉
-        if _filter_args.get("site") and indexer.name not in _filter_args.get("site"):
+        if not context.is_site_included(indexer):
             return []
         # 搜索条件没有过滤规则时，使用站点的过滤规则
-        if not _filter_args.get("rule") and indexer.rule:
-            _filter_args.update({"rule": indexer.rule})
+        _filter_args = context.get_filter_args(indexer)
         # 计算耗时
         start_time = datetime.datetime.now()
 
@@ -190,38 +207,80 @@ class BuiltinIndexer(_IIndexClient):
         if indexer.language == "en" and StringUtils.is_chinese(search_word):
             log.warn(f"【{self.client_name}】{indexer.name} 无法使用中文名搜索")
             return []
-        # 开始索引
-        result_array = []
-        try:
-            if indexer.parser == "TNodeSpider":
-                error_flag, result_array = TNodeSpider(indexer).search(keyword=search_word)
-            elif indexer.parser == "RenderSpider":
-                error_flag, result_array = asyncio.run(RenderSpider(indexer).search(
-                    keyword=search_word,
-                    mtype=match_media.type if match_media and match_media.tmdb_info else None))
-            elif indexer.parser == "TorrentLeech":
-                error_flag, result_array = TorrentLeech(indexer).search(keyword=search_word)
-            elif indexer.parser == "MTeamSpider":
-                error_flag, result_array = MTeamSpider(indexer=indexer).search(keyword=search_word)
-            elif indexer.parser == "HaiDanSpider":
-                error_flag, result_array = self.__spider_search(
-                    spider=HaiDanSpider(),
-                    keyword=search_word,
-                    indexer=indexer,
-                    mtype=match_media.type if match_media and match_media.tmdb_info else None)
+        mtype = match_media.type if match_media and match_media.tmdb_info else None
+        loop = asyncio.get_running_loop()
+        # 开始索引，同一站点同时进行的请求数不超过 SEARCH_SITE_CONCURRENCY，单次请求耗时不超过 SEARCH_SITE_TIMEOUT
+        semaphore = self._site_semaphores.get(indexer.id)
+        if not semaphore:
+            semaphore = self._site_semaphores.setdefault(indexer.id, asyncio.Semaphore(SEARCH_SITE_CONCURRENCY))
+        await semaphore.acquire()
+        if indexer.parser == "RenderSpider":
+            fetch = asyncio.ensure_future(RenderSpider(indexer).search(keyword=search_word, mtype=mtype))
+        else:
+            fetch = loop.run_in_executor(None, self.__search_indexer, indexer, search_word, mtype)
+        # 请求真正结束后才归还并发名额，超时后仍在线程池中运行的请求继续占用名额
+        fetch.add_done_callback(lambda _: semaphore.release())
+        done, _ = await asyncio.wait({fetch}, timeout=SEARCH_SITE_TIMEOUT)
+        if not done:
+            # 浏览器仿真可以取消；线程池中的请求无法中断，不能取消其包装，否则名额会提前归还，结束时取走其异常避免告警
+            if indexer.parser == "RenderSpider":
+                fetch.cancel()
             else:
-                if PluginsSpider().status(indexer=indexer):
-                    error_flag, result_array = PluginsSpider().search(keyword=search_word, indexer=indexer)
-                else:
-                    error_flag, result_array = self.__spider_search(
-                        spider=TorrentSpider(),
-                        keyword=search_word,
-                        indexer=indexer,
-                        mtype=match_media.type if match_media and match_media.tmdb_info else None)
+                fetch.add_done_callback(lambda f: f.exception())
+            log.warn(f"【{self.client_name}】{indexer.name} 搜索超过 {SEARCH_SITE_TIMEOUT} 秒，不再等待")
+            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 搜索超时")
+            await loop.run_in_executor(None, partial(self.dbhelper.insert_indexer_statistics,
+                                                     indexer=indexer.name,
+                                                     itype=self.client_id,
+                                                     seconds=SEARCH_SITE_TIMEOUT,
+                                                     result='N'))
+            return []
+        try:
+            error_flag, result_array = fetch.result()
         except Exception as err:
-            error_flag = True
+            error_flag, result_array = True, []
             print(str(err))
+        # 统计及过滤
+        return await loop.run_in_executor(None, partial(self.__filter_results,
+                                                        result_array=result_array,
+                                                        error_flag=error_flag,
+                                                        order_seq=order_seq,
+                                                        indexer=indexer,
+                                                        filter_args=_filter_args,
+                                                        match_media=match_media,
+                                                        in_from=in_from,
+                                                        start_time=start_time,
+                                                        context=context))
+
+    def __search_indexer(self, indexer, search_word, mtype):
+        """
+        使用站点对应的爬虫搜索，RenderSpider以外的爬虫均为阻塞调用
+        :return: 是否发生错误, 种子列表
+        """
+        if indexer.parser == "TNodeSpider":
+            return TNodeSpider(indexer).search(keyword=search_word)
+        elif indexer.parser == "TorrentLeech":
+            return TorrentLeech(indexer).search(keyword=search_word)
+        elif indexer.parser == "MTeamSpider":
+            return MTeamSpider(indexer=indexer).search(keyword=search_word)
+        elif indexer.parser == "HaiDanSpider":
+            return self.__spider_search(spider_class=HaiDanSpider,
+                                        keyword=search_word,
+                                        indexer=indexer,
+                                        mtype=mtype)
+        elif PluginsSpider().status(indexer=indexer):
+            return PluginsSpider().search(keyword=search_word, indexer=indexer)
+        else:
+            return self.__spider_search(spider_class=TorrentSpider,
+                                        keyword=search_word,
+                                        indexer=indexer,
+                                        mtype=mtype)
 
+    def __filter_results(self, result_array, error_flag, order_seq, indexer, filter_args, match_media, in_from,
+                         start_time, context=None):
+        """
+        记录索引统计并过滤单个站点的搜索结果
+        """
         # 索引花费的时间
         seconds = round((datetime.datetime.now() - start_time).seconds, 1)
         # 索引统计
@@ -235,49 +294,35 @@ class BuiltinIndexer(_IIndexClient):
             # 更新进度
             self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 未搜索到数据")
             return []
-        else:
-            log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
-            # 更新进度
-            self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
-            # 过滤
-            if self.quick_search and in_from == SearchType.WEB:
-                log.debug(f"quick search start")
-                if match_media:
-                    if match_media.type == MediaType.MOVIE:
-                        result = self.filter_search_results_local(
-                        result_array=result_array,
-                        order_seq=order_seq,
-                        indexer=indexer,
-                        filter_args=_filter_args,
-                        match_media=match_media,
-                        start_time=start_time
-                    )
-                    else:
-                        result = self.filter_search_results_local_for_tv(
-                            result_array=result_array,
-                            order_seq=order_seq,
-                            indexer=indexer,
-                            filter_args=_filter_args,
-                            match_media=match_media,
-                            start_time=start_time
-                        )
-                    # debug mode, compare with online search
-                    # if self.is_indebug():
-                    #     self.filter_search_results(result_array=result_array,
-                    #                                order_seq=order_seq,
-                    #                                indexer=indexer,
-                    #                                filter_args=_filter_args,
-                    #                                match_media=match_media,
-                    #                                start_time=start_time)
-
-                    return result
-
-            return self.filter_search_results(result_array=result_array,
-                                       order_seq=order_seq,
-                                       indexer=indexer,
-                                       filter_args=_filter_args,
-                                       match_media=match_media,
-                                       start_time=start_time)
+        log.warn(f"【{self.client_name}】{indexer.name} 返回数据：{len(result_array)}")
+        # 更新进度
+        self.progress.update(ptype=ProgressKey.Search, text=f"{indexer.name} 返回 {len(result_array)} 条数据")
+        # 过滤
+        if self.quick_search and in_from == SearchType.WEB:
+            log.debug(f"quick search start")
+            if match_media:
+                if match_media.type == MediaType.MOVIE:
+                    return self.filter_search_results_local(result_array=result_array,
+                                                            order_seq=order_seq,
+                                                            indexer=indexer,
+                                                            filter_args=filter_args,
+                                                            match_media=match_media,
+                                                            start_time=start_time,
+                                                            context=context)
+                return self.filter_search_results_local_for_tv(result_array=result_array,
+                                                               order_seq=order_seq,
+                                                               indexer=indexer,
+                                                               filter_args=filter_args,
+                                                               match_media=match_media,
+                                                               start_time=start_time,
+                                                               context=context)
+        return self.filter_search_results(result_array=result_array,
+                                          order_seq=order_seq,
+                                          indexer=indexer,
+                                          filter_args=filter_args,
+                                          match_media=match_media,
+                                          start_time=start_time,
+                                          context=context)
 
     def list(self, url, page=0, keyword=None):
         """
@@ -293,8 +338,8 @@ class BuiltinIndexer(_IIndexClient):
         start_time = datetime.datetime.now()
 
         if indexer.parser == "RenderSpider":
-            error_flag, result_array = asyncio.run(RenderSpider(indexer).search(keyword=keyword,
-                                                                    page=page))
+            error_flag, result_array = AsyncHelper().run(RenderSpider(indexer).search(keyword=keyword,
+                                                                                      page=page))
         elif indexer.parser == "TNodeSpider":
             error_flag, result_array = TNodeSpider(indexer).search(keyword=keyword,
                                                                    page=page)
@@ -304,7 +349,7 @@ class BuiltinIndexer(_IIndexClient):
         elif indexer.parser == "MTeamSpider":
             error_flag, result_array = MTeamSpider(indexer=indexer).search(keyword=keyword, page=page)
         elif indexer.parser == "HaiDanSpider":
-            error_flag, result_array = self.__spider_search(spider=HaiDanSpider(),
+            error_flag, result_array = self.__spider_search(spider_class=HaiDanSpider,
                                                             indexer=indexer,
                                                             page=page,
                                                             keyword=keyword)
@@ -315,7 +360,7 @@ class BuiltinIndexer(_IIndexClient):
                                                                   page=page)
 
             else:
-                error_flag, result_array = self.__spider_search(spider=TorrentSpider(),
+                error_flag, result_array = self.__spider_search(spider_class=TorrentSpider,
                                                                 indexer=indexer,
                                                                 page=page,
                                                                 keyword=keyword)
@@ -330,45 +375,34 @@ class BuiltinIndexer(_IIndexClient):
         return result_array
 
     @staticmethod
-    def __spider_search(spider, indexer, keyword=None, page=None, mtype=None, timeout=30):
+    def __spider_search(spider_class, indexer, keyword=None, page=None, mtype=None, timeout=15):
         """
         根据关键字搜索单个站点
-        :param spider: 爬虫实例，负责执行搜索操作并处理请求
+        :param spider_class: 爬虫类，同一站点的爬虫实例复用
         :param: indexer: 站点配置
         :param: keyword: 关键字
         :param: page: 页码
         :param: mtype: 媒体类型
-        :param: timeout: 超时时间
+        :param: timeout: 超时时间（秒）
         :return: 是否发生错误, 种子列表
         """
         log.debug(f"Spider search started for {indexer.name} with keyword: {keyword}, page: {page}, mtype: {mtype}")
 
+        spider = spider_class.acquire(indexer)
         spider.setparam(indexer=indexer,
                         keyword=keyword,
                         page=page,
                         mtype=mtype)
         spider.start()
-
-        # spider = DefaultSpider()
-        # spider.setparam(indexer=indexer,
-        #                 keyword=keyword,
-        #                 page=page,
-        #                 mtype=mtype)
-        # spider.start_requests()
-
-        # 循环判断是否获取到数据
-        sleep_count = 0
-        while not spider.is_complete:
-            sleep_count += 1
-            time.sleep(0.5)
-            if sleep_count > timeout:
-                break
+        # 解析完成后立即返回，不等待爬虫线程退出
+        if not spider.wait_complete(timeout=timeout):
+            log.warn(f"【Spider】{indexer.name} 搜索超过 {timeout} 秒，不再等待")
         # 是否发生错误
         result_flag = spider.is_error
         # 种子列表
         result_array = spider.torrents_info_array.copy()
-        # 重置状态
-        spider.torrents_info_array.clear()
+        # 归还爬虫，超时未完成的不再复用
+        spider.release()
 
         log.debug(f"Spider search completed for {indexer.name} with result flag: {result_flag}")
         return result_flag, result_array
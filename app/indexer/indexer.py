@@ -1,8 +1,9 @@
+import asyncio
 import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import log
-from app.helper import ProgressHelper, SubmoduleHelper, DbHelper
+from app.helper import ProgressHelper, SubmoduleHelper, DbHelper, AsyncHelper
+from app.indexer.search_context import SearchContext
 from app.utils import ExceptionUtils, StringUtils
 from app.utils.commons import singleton
 from app.utils.types import SearchType, IndexerType, ProgressKey
@@ -127,7 +128,8 @@ class Indexer(object):
                           key_word: Union[str, list],
                           filter_args: dict,
                           match_media=None,
-                          in_from: SearchType = None):
+                          in_from: SearchType = None,
+                          on_result=None):
         """
         根据关键字调用 Index API 搜索
         :param key_word: 搜索的关键字，不能为空
@@ -136,6 +138,7 @@ class Indexer(object):
                             sp_state: 为UL DL，* 代表不关心，
         :param match_media: 需要匹配的媒体信息
         :param in_from: 搜索渠道
+        :param on_result: 每个站点完成后的回调，参数为站点及该站点过滤后的结果
         :return: 命中的资源媒体信息列表
         """
         if not key_word:
@@ -165,28 +168,15 @@ class Indexer(object):
             log.info(f"【{self._client_type.value}】开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
             self.progress.update(ptype=ProgressKey.Search,
                                  text="开始并行搜索 %s，线程数：%s ..." % (key_word, len(indexers)))
-        # 多线程
-        executor = ThreadPoolExecutor(max_workers=len(indexers))
-        all_task = []
-        for index in indexers:
-            order_seq = 100 - int(index.pri)
-            task = executor.submit(self._client.search,
-                                   order_seq,
-                                   index,
-                                   key_word,
-                                   filter_args,
-                                   match_media,
-                                   in_from)
-            all_task.append(task)
-        ret_array = []
-        finish_count = 0
-        for future in as_completed(all_task):
-            result = future.result()
-            finish_count += 1
-            self.progress.update(ptype=ProgressKey.Search,
-                                 value=round(100 * (finish_count / len(all_task))))
-            if result:
-                ret_array = ret_array + result
+        # 各站点共享过滤条件及名称识别结果
+        context = SearchContext(filter_args=filter_args)
+        # 在共享事件循环中并发搜索，每个站点完成后立即汇总结果
+        ret_array = AsyncHelper().run(self.__async_search(indexers=indexers,
+                                                          key_word=key_word,
+                                                          context=context,
+                                                          match_media=match_media,
+                                                          in_from=in_from,
+                                                          on_result=on_result))
         # 计算耗时
         end_time = datetime.datetime.now()
         log.info(f"【{self._client_type.value}】所有站点搜索完成，有效资源数：%s，总耗时 %s 秒"
@@ -197,6 +187,46 @@ class Indexer(object):
                              value=100)
         return ret_array
 
+    async def __async_search(self, indexers, key_word, context, match_media, in_from, on_result=None):
+        """
+        并发搜索多个站点，同一站点的并发数及单个站点的请求耗时由索引器控制
+        """
+        loop = asyncio.get_running_loop()
+
+        async def search_site(index):
+            try:
+                return await self._client.async_search(100 - int(index.pri),
+                                                       index,
+                                                       key_word,
+                                                       context.filter_args,
+                                                       match_media,
+                                                       in_from,
+                                                       context=context)
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+            return []
+
+        async def search_and_notify(index):
+            result = await search_site(index)
+            if on_result:
+                try:
+                    await loop.run_in_executor(None, on_result, index, result or [])
+                except Exception as e:
+                    ExceptionUtils.exception_traceback(e)
+            return result
+
+        ret_array = []
+        finish_count = 0
+        tasks = [search_and_notify(index) for index in indexers]
+        for task in asyncio.as_completed(tasks):
+            result = await task
+            finish_count += 1
+            self.progress.update(ptype=ProgressKey.Search,
+                                 value=round(100 * (finish_count / len(tasks))))
+            if result:
+                ret_array = ret_array + result
+        return ret_array
+
     def get_indexer_statistics(self):
         """
         获取索引器统计信息
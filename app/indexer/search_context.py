@@ -0,0 +1,71 @@
+import copy
+from concurrent.futures import Future
+from threading import Lock
+
+# 等待其它站点识别同一名称的超时时间（秒）
+PENDING_TIMEOUT = 60
+
+
+class SearchContext(object):
+    """
+    单次搜索的上下文，在 search_by_keyword 中创建，由所有站点共享
+    保存过滤条件的快照及名称识别结果，不同站点返回的同一种子在一次搜索中只识别一次
+    """
+    # 搜索条件快照
+    filter_args = {}
+    # 过滤规则 -> 站点使用的过滤条件
+    _site_filter_args = {}
+    # 识别结果：键 -> Future
+    _memo = {}
+
+    def __init__(self, filter_args=None):
+        self.filter_args = copy.deepcopy(filter_args) if filter_args else {}
+        self._site_filter_args = {}
+        self._memo = {}
+        self._lock = Lock()
+
+    def get_filter_args(self, indexer):
+        """
+        站点使用的过滤条件，搜索条件没有过滤规则时使用站点的过滤规则
+        同一过滤规则的站点共用同一个字典，使用方不能修改
+        """
+        rule = self.filter_args.get("rule") or indexer.rule or None
+        with self._lock:
+            filter_args = self._site_filter_args.get(rule)
+            if filter_args is None:
+                filter_args = dict(self.filter_args)
+                if rule:
+                    filter_args["rule"] = rule
+                self._site_filter_args[rule] = filter_args
+        return filter_args
+
+    def is_site_included(self, indexer):
+        """
+        站点是否在设定的搜索范围内
+        """
+        sites = self.filter_args.get("site")
+        return not sites or indexer.name in sites
+
+    def memoize(self, key, func):
+        """
+        返回本次搜索中 key 的识别结果，没有时调用 func 识别
+        多个站点同时识别同一名称时只有一个线程执行，其它线程等待结果，返回的对象由各站点共享，使用方不能修改
+        """
+        with self._lock:
+            future = self._memo.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._memo[key] = future
+        if not owner:
+            return future.result(timeout=PENDING_TIMEOUT)
+        try:
+            result = func()
+        except Exception as e:
+            # 识别出错时不缓存，其它站点重新识别
+            with self._lock:
+                self._memo.pop(key, None)
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        return result
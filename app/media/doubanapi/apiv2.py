@@ -11,6 +11,7 @@ import re
 
 import requests
 
+from app.helper.http_cache_helper import HttpCacheHelper
 from app.utils import RequestUtils, StringUtils
 from app.utils.commons import singleton
 from app.utils.commons import ttl_lru
@@ -162,9 +163,14 @@ class DoubanApi(object):
                                 ).decode()
 
     @classmethod
-    @lru_cache(maxsize=256)
-    def __invoke(cls, url, **kwargs):
-        req_url = cls._base_url + url
+    def __request(cls, req_url, **kwargs):
+        """
+        请求豆瓣接口，优先使用磁盘缓存，签名参数不参与缓存key
+        """
+        cache_key = "%s?%s" % (req_url, parse.urlencode(sorted((k, v) for k, v in kwargs.items() if k != '_ts')))
+        resp = HttpCacheHelper().get_response(cache_key)
+        if resp is not None:
+            return resp
 
         params = {'apiKey': cls._api_key}
         if kwargs:
@@ -176,6 +182,14 @@ class DoubanApi(object):
         headers = {'User-Agent': 'MicroMessenger/',
                    'Referer': 'https://servicewechat.com/wx2f9b06c1de1ccfca/91/page-frame.html'}
         resp = RequestUtils(headers=headers, session=cls._session).get_res(url=req_url, params=params)
+        HttpCacheHelper().set_response(cache_key, resp)
+        return resp
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def __invoke(cls, url, **kwargs):
+        req_url = cls._base_url + url
+        resp = cls.__request(req_url, **kwargs)
 
         if resp:
             resp_json = resp.json() 
@@ -200,17 +214,7 @@ class DoubanApi(object):
     @ttl_lru(seconds=60 * 60 * 3, maxsize=256)
     def __invoke_ttl(cls, url, **kwargs):
         req_url = cls._base_url + url
-
-        params = {'apiKey': cls._api_key}
-        if kwargs:
-            params.update(kwargs)
-
-        ts = params.pop('_ts', int(datetime.strftime(datetime.now(), '%Y%m%d')))
-        params.update({'os_rom': 'android', 'apiKey': cls._api_key, '_ts': ts, '_sig': cls.__sign(url=req_url, ts=ts)})
-
-        headers = {'User-Agent': 'MicroMessenger/',
-                   'Referer': 'https://servicewechat.com/wx2f9b06c1de1ccfca/91/page-frame.html'}
-        resp = RequestUtils(headers=headers, session=cls._session).get_res(url=req_url, params=params)
+        resp = cls.__request(req_url, **kwargs)
         
         if resp:
             resp_json = resp.json() 
@@ -1,5 +1,6 @@
 from functools import lru_cache
 
+from app.helper import HttpCacheHelper
 from app.utils import RequestUtils, ExceptionUtils
 from app.utils.types import MediaType
 from config import Config, FANART_MOVIE_API_URL, FANART_TV_API_URL
@@ -73,8 +74,13 @@ class Fanart:
             image_url = FANART_MOVIE_API_URL % queryid
         else:
             image_url = FANART_TV_API_URL % queryid
+        res = HttpCacheHelper().get_response(image_url)
+        if res is not None:
+            return res
         try:
-            return RequestUtils(proxies=cls._proxies, timeout=5).get_res(image_url)
+            res = RequestUtils(proxies=cls._proxies, timeout=5).get_res(image_url)
+            HttpCacheHelper().set_response(image_url, res, category="images")
+            return res
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
         return None
@@ -3,6 +3,7 @@ import os
 import random
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
 import zhconv
@@ -16,7 +17,7 @@ from app.media.tmdbv3api import TMDb, Search, Movie, TV, Person, Find, TMDbExcep
 from app.utils import PathUtils, EpisodeFormat, RequestUtils, NumberUtils, StringUtils, cacheman
 from app.utils.types import MediaType, MatchMode
 from config import Config, KEYWORD_BLACKLIST, KEYWORD_SEARCH_WEIGHT_3, KEYWORD_SEARCH_WEIGHT_2, KEYWORD_SEARCH_WEIGHT_1, \
-    KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD
+    KEYWORD_STR_SIMILARITY_THRESHOLD, KEYWORD_DIFF_SCORE_THRESHOLD, TMDB_RECOGNIZE_MAX_WORKERS
 
 
 class Media:
@@ -827,6 +828,79 @@ class Media:
         meta_info.set_tmdb_info(file_media_info)
         return meta_info
 
+    def get_media_infos(self, titles,
+                        mtype=None,
+                        strict=None,
+                        cache=True,
+                        language=None,
+                        chinese=True,
+                        append_to_response=None,
+                        max_workers=TMDB_RECOGNIZE_MAX_WORKERS):
+        """
+        批量识别种子名称，缓存key相同的名称只查询一次TMDB，未缓存的名称并发查询
+        :param titles: 种子名称列表，元素为种子名称或(种子名称, 副标题)
+        :param mtype: 类型：电影、电视剧、动漫
+        :param strict: 是否严格模式
+        :param cache: 是否使用缓存，默认TRUE
+        :param language: 语言
+        :param chinese: 原标题为英文时是否从别名中搜索中文名称
+        :param append_to_response: 额外查询的信息
+        :param max_workers: 查询TMDB的最大并发数
+        :return: 与输入顺序一致的MetaInfo对象列表，无法识别的为None
+        """
+        if not titles:
+            return []
+        if not self.tmdb:
+            log.error("【Meta】TMDB API Key 未设置！")
+            return [None] * len(titles)
+        items = [(title, None) if not isinstance(title, (list, tuple)) else (title[0], title[1])
+                 for title in titles]
+        # 按缓存key分组，每组取第一个名称作为代表
+        leaders = {}
+        for index, (title, subtitle) in enumerate(items):
+            if not title:
+                continue
+            meta_info = MetaInfo(title, subtitle=subtitle)
+            if not meta_info.get_name() or not meta_info.type:
+                continue
+            if mtype:
+                meta_info.type = mtype
+            media_key = self.__make_cache_key(meta_info)
+            if media_key in leaders:
+                continue
+            if cache and self.meta.get_meta_data_by_key(media_key):
+                continue
+            leaders[media_key] = index
+
+        def __recognize(i, use_cache=cache):
+            title, subtitle = items[i]
+            try:
+                return self.get_media_info(title=title,
+                                           subtitle=subtitle,
+                                           mtype=mtype,
+                                           strict=strict,
+                                           cache=use_cache,
+                                           language=language,
+                                           chinese=chinese,
+                                           append_to_response=append_to_response)
+            except Exception as err:
+                log.error("【Meta】%s 识别出错：%s" % (title, str(err)))
+                return None
+
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            # 先并发查询各组代表名称，结果写入缓存
+            leader_indexes = list(leaders.values())
+            for index, media_info in zip(leader_indexes, executor.map(__recognize, leader_indexes)):
+                results[index] = media_info
+            # 其余名称从缓存中取得
+            leader_indexes = set(leader_indexes)
+            other_indexes = [i for i in range(len(items)) if i not in leader_indexes]
+            for index, media_info in zip(other_indexes,
+                                         executor.map(lambda i: __recognize(i, use_cache=True), other_indexes)):
+                results[index] = media_info
+        return results
+
     def __insert_media_cache(self, media_key, file_media_info):
         """
         将TMDB信息插入缓存
@@ -854,6 +928,84 @@ class Media:
         else:
             self.meta.update_meta_data({media_key: {'id': 0}})
 
+    @staticmethod
+    def __get_file_meta_info(file_path):
+        """
+        识别文件名称，识别不到名称或年份时使用上级目录的名称补全
+        """
+        file_name = os.path.basename(file_path)
+        parent_name = os.path.basename(os.path.dirname(file_path))
+        parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
+        meta_info = MetaInfo(title=file_name, filePath=file_path)
+        # 识别不到则使用上级的名称
+        if not meta_info.get_name() or not meta_info.year:
+            parent_info = MetaInfo(parent_name)
+            if not parent_info.get_name() or not parent_info.year:
+                parent_parent_info = MetaInfo(parent_parent_name)
+                parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
+                parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
+                parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
+                parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
+                parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                               parent_parent_info.begin_season)
+            if not meta_info.get_name():
+                meta_info.cn_name = parent_info.cn_name
+                meta_info.en_name = parent_info.en_name
+            if not meta_info.year:
+                meta_info.year = parent_info.year
+            if parent_info.type and parent_info.type == MediaType.TV \
+                    and meta_info.type != MediaType.TV:
+                meta_info.type = parent_info.type
+            if meta_info.type == MediaType.TV:
+                meta_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
+                                                             meta_info.begin_season)
+        return meta_info
+
+    def __search_file_media_info(self, meta_info, file_path, chinese=True, append_to_response=None):
+        """
+        按文件识别出的名称搜索TMDB信息，不使用缓存
+        """
+        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                             first_media_year=meta_info.year,
+                                             search_type=meta_info.type,
+                                             media_year=meta_info.year,
+                                             season_number=meta_info.begin_season)
+        if not file_media_info:
+            if self._rmt_match_mode == MatchMode.NORMAL:
+                # 去掉年份再查一次，有可能是年份错误
+                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
+                                                     search_type=meta_info.type)
+        if not file_media_info and self._chatgpt_enable:
+            # 从ChatGPT查询
+            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path,
+                                                                             mtype=meta_info.type)
+            # 修正类型和集数
+            meta_info.type = mtype
+            if not meta_info.get_season_string():
+                meta_info.set_season(seaons)
+            if not meta_info.get_episode_string():
+                meta_info.set_episode(episodes)
+        if not file_media_info and self._search_keyword:
+            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
+            is_movie = False
+            if not cache_name:
+                cache_name, is_movie = self.__search_engine(meta_info.get_name())
+                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
+            if cache_name:
+                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
+                if is_movie:
+                    file_media_info = self.__search_tmdb(file_media_name=cache_name,
+                                                         search_type=MediaType.MOVIE)
+                else:
+                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
+        # 补全TMDB信息
+        if file_media_info and not file_media_info.get("genres"):
+            file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
+                                                 tmdbid=file_media_info.get("id"),
+                                                 chinese=chinese,
+                                                 append_to_response=append_to_response)
+        return file_media_info
+
     def get_media_info_on_files(self,
                                 file_list,
                                 tmdb_info=None,
@@ -886,7 +1038,11 @@ class Media:
         # 不是list的转为list
         if not isinstance(file_list, list):
             file_list = [file_list]
-        # 遍历每个文件，看得出来的名称是不是不一样，不一样的先搜索媒体信息
+        # 待识别的文件：(文件路径, MetaInfo, 缓存key)
+        file_metas = []
+        # 按缓存key分组，没有缓存的每组取第一个文件作为代表查询TMDB
+        leaders = {}
+        # 遍历每个文件，先解析出名称，缓存key相同的文件只查询一次TMDB
         for file_path in file_list:
             try:
                 if not os.path.exists(file_path):
@@ -895,8 +1051,6 @@ class Media:
                 # 解析媒体名称
                 # 先用自己的名称
                 file_name = os.path.basename(file_path)
-                parent_name = os.path.basename(os.path.dirname(file_path))
-                parent_parent_name = os.path.basename(PathUtils.get_parent_paths(file_path, 2))
                 # 过滤掉蓝光原盘目录下的子文件
                 if not os.path.isdir(file_path) \
                         and PathUtils.get_bluray_dir(file_path):
@@ -905,92 +1059,15 @@ class Media:
                 # 没有自带TMDB信息
                 if not tmdb_info:
                     # 识别名称
-                    meta_info = MetaInfo(title=file_name, filePath=file_path)
-                    # 识别不到则使用上级的名称
-                    if not meta_info.get_name() or not meta_info.year:
-                        parent_info = MetaInfo(parent_name)
-                        if not parent_info.get_name() or not parent_info.year:
-                            parent_parent_info = MetaInfo(parent_parent_name)
-                            parent_info.type = parent_parent_info.type if parent_parent_info.type and parent_info.type != MediaType.TV else parent_info.type
-                            parent_info.cn_name = parent_parent_info.cn_name if parent_parent_info.cn_name else parent_info.cn_name
-                            parent_info.en_name = parent_parent_info.en_name if parent_parent_info.en_name else parent_info.en_name
-                            parent_info.year = parent_parent_info.year if parent_parent_info.year else parent_info.year
-                            parent_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                           parent_parent_info.begin_season)
-                        if not meta_info.get_name():
-                            meta_info.cn_name = parent_info.cn_name
-                            meta_info.en_name = parent_info.en_name
-                        if not meta_info.year:
-                            meta_info.year = parent_info.year
-                        if parent_info.type and parent_info.type == MediaType.TV \
-                                and meta_info.type != MediaType.TV:
-                            meta_info.type = parent_info.type
-                        if meta_info.type == MediaType.TV:
-                            meta_info.begin_season = NumberUtils.max_ele(parent_info.begin_season,
-                                                                         meta_info.begin_season)
+                    meta_info = self.__get_file_meta_info(file_path)
                     if not meta_info.get_name() or not meta_info.type:
                         log.warn("【Rmt】%s 未识别出有效信息！" % meta_info.org_string)
                         continue
                     # 区配缓存及TMDB
                     media_key = self.__make_cache_key(meta_info)
-                    if not self.meta.get_meta_data_by_key(media_key):
-                        # 没有缓存数据
-                        file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                             first_media_year=meta_info.year,
-                                                             search_type=meta_info.type,
-                                                             media_year=meta_info.year,
-                                                             season_number=meta_info.begin_season)
-                        if not file_media_info:
-                            if self._rmt_match_mode == MatchMode.NORMAL:
-                                # 去掉年份再查一次，有可能是年份错误
-                                file_media_info = self.__search_tmdb(file_media_name=meta_info.get_name(),
-                                                                     search_type=meta_info.type)
-                        if not file_media_info and self._chatgpt_enable:
-                            # 从ChatGPT查询
-                            mtype, seaons, episodes, file_media_info = self.__search_chatgpt(file_name=file_path,
-                                                                                             mtype=meta_info.type)
-                            # 修正类型和集数
-                            meta_info.type = mtype
-                            if not meta_info.get_season_string():
-                                meta_info.set_season(seaons)
-                            if not meta_info.get_episode_string():
-                                meta_info.set_episode(episodes)
-                        if not file_media_info and self._search_keyword:
-                            cache_name = cacheman["tmdb_supply"].get(meta_info.get_name())
-                            is_movie = False
-                            if not cache_name:
-                                cache_name, is_movie = self.__search_engine(meta_info.get_name())
-                                cacheman["tmdb_supply"].set(meta_info.get_name(), cache_name)
-                            if cache_name:
-                                log.info("【Meta】开始辅助查询：%s ..." % cache_name)
-                                if is_movie:
-                                    file_media_info = self.__search_tmdb(file_media_name=cache_name,
-                                                                         search_type=MediaType.MOVIE)
-                                else:
-                                    file_media_info = self.__search_multi_tmdb(file_media_name=cache_name)
-                        # 补全TMDB信息
-                        if file_media_info and not file_media_info.get("genres"):
-                            file_media_info = self.get_tmdb_info(mtype=file_media_info.get("media_type"),
-                                                                 tmdbid=file_media_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        # 保存到缓存
-                        if file_media_info is not None:
-                            self.__insert_media_cache(media_key=media_key,
-                                                      file_media_info=file_media_info)
-                    else:
-                        # 使用缓存信息
-                        cache_info = self.meta.get_meta_data_by_key(media_key)
-                        if cache_info.get("id"):
-                            file_media_info = self.get_tmdb_info(mtype=cache_info.get("type"),
-                                                                 tmdbid=cache_info.get("id"),
-                                                                 chinese=chinese,
-                                                                 append_to_response=append_to_response)
-                        else:
-                            # 缓存为未识别
-                            file_media_info = None
-                    # 赋值TMDB信息
-                    meta_info.set_tmdb_info(file_media_info)
+                    if media_key not in leaders and not self.meta.get_meta_data_by_key(media_key):
+                        leaders[media_key] = len(file_metas)
+                    file_metas.append((file_path, meta_info, media_key))
                 # 自带TMDB信息
                 else:
                     meta_info = MetaInfo(title=file_name, mtype=media_type, filePath=file_path)
@@ -1006,11 +1083,61 @@ class Media:
                             meta_info.end_episode = end_ep
                     # 加入缓存
                     self.save_rename_cache(file_name, tmdb_info)
-                # 按文件路程存储
-                return_media_infos[file_path] = meta_info
+                    # 按文件路程存储
+                    return_media_infos[file_path] = meta_info
             except Exception as err:
                 print(str(err))
                 log.error("【Rmt】发生错误：%s - %s" % (str(err), traceback.format_exc()))
+        if not file_metas:
+            return return_media_infos
+
+        def __recognize(i):
+            file_path, meta_info, media_key = file_metas[i]
+            try:
+                if leaders.get(media_key) == i:
+                    # 没有缓存数据
+                    file_media_info = self.__search_file_media_info(meta_info=meta_info,
+                                                                    file_path=file_path,
+                                                                    chinese=chinese,
+                                                                    append_to_response=append_to_response)
+                    # 保存到缓存
+                    if file_media_info is not None:
+                        self.__insert_media_cache(media_key=media_key,
+                                                  file_media_info=file_media_info)
+                else:
+                    # 使用缓存信息
+                    cache_info = self.meta.get_meta_data_by_key(media_key)
+                    if cache_info.get("id"):
+                        file_media_info = self.get_tmdb_info(mtype=cache_info.get("type"),
+                                                             tmdbid=cache_info.get("id"),
+                                                             chinese=chinese,
+                                                             append_to_response=append_to_response)
+                    else:
+                        # 缓存为未识别
+                        file_media_info = None
+                # 赋值TMDB信息
+                meta_info.set_tmdb_info(file_media_info)
+                return meta_info
+            except Exception as e:
+                print(str(e))
+                log.error("【Rmt】发生错误：%s - %s" % (str(e), traceback.format_exc()))
+                return None
+
+        results = [None] * len(file_metas)
+        with ThreadPoolExecutor(max_workers=max(1, TMDB_RECOGNIZE_MAX_WORKERS)) as executor:
+            # 先并发查询各组代表文件，结果写入缓存
+            leader_indexes = list(leaders.values())
+            for index, media_info in zip(leader_indexes, executor.map(__recognize, leader_indexes)):
+                results[index] = media_info
+            # 其余文件从缓存中取得
+            leader_indexes = set(leader_indexes)
+            other_indexes = [i for i in range(len(file_metas)) if i not in leader_indexes]
+            for index, media_info in zip(other_indexes, executor.map(__recognize, other_indexes)):
+                results[index] = media_info
+        # 按文件路程存储
+        for (file_path, _, _), media_info in zip(file_metas, results):
+            if media_info:
+                return_media_infos[file_path] = media_info
         # 循环结束
         return return_media_infos
 
@@ -1,4 +1,5 @@
 import regex as re
+from app.utils.cache_manager import MetaInfoCache
 from app.utils.commons import singleton
 
 
@@ -42,3 +43,5 @@ class CustomizationMatcher(object):
         """
         self.customization = customization
         self.custom_separator = separator
+        # 识别结果可能变化，清空名称识别缓存
+        MetaInfoCache.clear()
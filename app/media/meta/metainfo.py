@@ -1,3 +1,4 @@
+import copy
 import os.path
 import regex as re
 
@@ -7,7 +8,7 @@ from app.media.meta.metaanime import MetaAnime
 from app.media.meta.metavideo import MetaVideo
 from app.media.meta.metavideov2 import MetaVideoV2
 from app.utils.types import MediaType
-from app.utils import StringUtils
+from app.utils import StringUtils, MetaInfoCache
 from config import Config, RMT_MEDIAEXT
 from app.helper import FfmpegHelper
 
@@ -22,6 +23,7 @@ def MetaInfo(title,
              imdb_id=None):
     """
     媒体整理入口，根据名称和副标题，判断是哪种类型的识别，返回对应对象
+    相同参数的识别结果会被缓存，识别词变化后缓存自动失效
     :param title: 标题、种子名、文件名
     :param subtitle: 副标题、描述
     :param mtype: 指定识别类型，为空则自动识别类型
@@ -33,6 +35,55 @@ def MetaInfo(title,
     ffmpeg_video_meta_enable = False
     if media:
         ffmpeg_video_meta_enable = media.get('ffmpeg_video_meta', False) or False
+    # 识别增强
+    laboratory = Config().get_config('laboratory')
+    recognize_enhance_enable = False
+    if laboratory:
+        recognize_enhance_enable = laboratory.get('recognize_enhance_enable', False) or False
+    # 需要读取文件元数据的不缓存
+    if ffmpeg_video_meta_enable and filePath:
+        return __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id,
+                                 ffmpeg_video_meta_enable, recognize_enhance_enable)
+    cache_key = (title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id,
+                 recognize_enhance_enable, WordsHelper().generation)
+    meta_info = MetaInfoCache.get(cache_key)
+    if meta_info is None:
+        meta_info = __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id,
+                                      imdb_id, ffmpeg_video_meta_enable, recognize_enhance_enable)
+        MetaInfoCache.set(cache_key, meta_info)
+    return __copy_meta_info(meta_info)
+
+
+def get_metainfo_cache_stats():
+    """
+    获取名称识别缓存的统计信息
+    :return: 命中次数、未命中次数、命中率、缓存条目数
+    """
+    stats = MetaInfoCache.stats.info()
+    return {
+        "hits": stats.hit_count,
+        "misses": stats.miss_count,
+        "hit_rate": round(stats.hit_rate * 100, 1),
+        "size": MetaInfoCache.size()
+    }
+
+
+def __copy_meta_info(meta_info):
+    """
+    复制缓存中的识别结果，可变属性单独复制，避免调用方修改影响缓存
+    """
+    new_meta_info = copy.copy(meta_info)
+    for key, value in vars(new_meta_info).items():
+        if isinstance(value, (list, dict, set)):
+            setattr(new_meta_info, key, copy.copy(value))
+    return new_meta_info
+
+
+def __parse_meta_info(title, subtitle, mtype, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id,
+                      ffmpeg_video_meta_enable, recognize_enhance_enable):
+    """
+    识别名称，返回对应的识别对象
+    """
     # 记录原始名称
     org_title = title
     # 应用自定义识别词，获取识别词处理后名称
@@ -52,11 +103,6 @@ def MetaInfo(title,
     else:
         fileflag = False
 
-    laboratory = Config().get_config('laboratory')
-    recognize_enhance_enable = False
-    if laboratory:
-        recognize_enhance_enable = laboratory.get('recognize_enhance_enable', False) or False
-
     if recognize_enhance_enable:
          meta_info = MetaVideoV2(rev_title, subtitle, fileflag, filePath, media_type, cn_name, en_name, tmdb_id, imdb_id)
     else:
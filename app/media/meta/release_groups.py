@@ -1,4 +1,5 @@
 import regex as re
+from app.utils.cache_manager import MetaInfoCache
 from app.utils.commons import singleton
 
 
@@ -109,3 +110,5 @@ class ReleaseGroupsMatcher(object):
         """
         self.custom_release_groups = release_groups
         self.custom_separator = separator
+        # 识别结果可能变化，清空名称识别缓存
+        MetaInfoCache.clear()
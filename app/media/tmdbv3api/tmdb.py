@@ -10,6 +10,7 @@ import requests.exceptions
 
 from .as_obj import AsObj
 from .exceptions import TMDbException
+from app.helper.http_cache_helper import HttpCacheHelper
 from app.utils.commons import ttl_lru
 
 logger = logging.getLogger(__name__)
@@ -150,7 +151,15 @@ class TMDb(object):
     @staticmethod
     @ttl_lru(seconds=60 * 60 * 6, maxsize=REQUEST_CACHE_MAXSIZE)
     def ttl_cached_request(method, url, data, proxies):
-        return requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
+        # 内存缓存未命中时先查磁盘缓存
+        cache_key = "%s %s %s" % (method, url, data or "")
+        http_cache = HttpCacheHelper()
+        res = http_cache.get_response(cache_key)
+        if res is not None:
+            return res
+        res = requests.request(method, url, data=data, proxies=eval(proxies), verify=False, timeout=10)
+        http_cache.set_response(cache_key, res, category=http_cache.get_url_category(url))
+        return res
 
     def cache_clear(self):
         return self.cached_request.cache_clear()
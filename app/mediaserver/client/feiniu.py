@@ -11,7 +11,7 @@ import log
 from app.mediaserver.client._base import _IMediaClient
 from app.utils import RequestUtils
 from app.utils.types import MediaServerType, MediaType
-from config import Config
+from config import Config, MEDIA_SYNC_PAGE_SIZE
 
 
 @dataclass
@@ -738,31 +738,33 @@ class FeiNiu(_IMediaClient):
         )
 
     def get_items(self, parent):
-        """获取媒体库中的所有媒体"""
+        """分页获取媒体库中的所有媒体，逐页返回"""
         if not self.is_authenticated():
             # 尝试连接
             if not self.get_status():
-                return []
-
-        items = []
-        data = self.__request_api("/item/list", data={
-            "ancestor_guid": parent,
-            "tags": {"type": [FeiNiuType.MOVIE.value, FeiNiuType.TV.value, FeiNiuType.DIRECTORY.value]},
-            "sort_type": "DESC",
-            "sort_column": "create_time",
-            "page": 1,
-            "page_size": -1,  # 获取所有数据
-            "exclude_grouped_video": 1
-        })
-
-        if data and data.get("list"):
-            for info in data["list"]:
+                return
+
+        page = 1
+        while True:
+            data = self.__request_api("/item/list", data={
+                "ancestor_guid": parent,
+                "tags": {"type": [FeiNiuType.MOVIE.value, FeiNiuType.TV.value, FeiNiuType.DIRECTORY.value]},
+                "sort_type": "DESC",
+                "sort_column": "create_time",
+                "page": page,
+                "page_size": MEDIA_SYNC_PAGE_SIZE,
+                "exclude_grouped_video": 1
+            })
+            infos = data.get("list") if data else None
+            if not infos:
+                return
+            for info in infos:
                 item = self.__build_item(info)
                 if item.type == FeiNiuType.DIRECTORY:
                     # 递归获取目录下的项目
-                    items.extend(self.get_items(item.guid))
+                    yield from self.get_items(item.guid)
                 elif item.type in [FeiNiuType.MOVIE, FeiNiuType.TV]:
-                    items.append({
+                    yield {
                         "id": item.guid,
                         "title": item.title,
                         "year": item.release_date[:4] if item.release_date else (
@@ -773,8 +775,10 @@ class FeiNiu(_IMediaClient):
                         "tmdbid": item.tmdb_id,
                         "imdbid": item.imdb_id,
                         "poster": f"{self._host}{item.poster}" if item.poster else None
-                    })
-        return items
+                    }
+            if len(infos) < MEDIA_SYNC_PAGE_SIZE:
+                return
+            page += 1
 
     def get_play_url(self, item_id):
         """获取媒体播放链接"""
@@ -5,7 +5,7 @@ import log
 from app.mediaserver.client._base import _IMediaClient
 from app.utils import RequestUtils, SystemUtils, ExceptionUtils, IpUtils
 from app.utils.types import MediaServerType, MediaType
-from config import Config
+from config import Config, MEDIA_SYNC_PAGE_SIZE
 
 
 class Jellyfin(_IMediaClient):
@@ -23,6 +23,8 @@ class Jellyfin(_IMediaClient):
     _host = None
     _play_host = None
     _user = None
+    # 同步媒体库时分页查询返回的字段
+    _item_fields = "ProviderIds,OriginalTitle,ProductionYear,Path,ParentId"
 
     def __init__(self, config=None):
         if config:
@@ -516,39 +518,45 @@ class Jellyfin(_IMediaClient):
 
     def get_items(self, parent):
         """
-        获取媒体服务器所有媒体库列表
+        分页获取媒体库中的所有电影和电视剧，只请求同步需要的字段，不再逐个查询项目详情
         """
         if not parent:
-            yield {}
+            return
         if not self._host or not self._apikey:
-            yield {}
-        req_url = "%sUsers/%s/Items?parentId=%s&api_key=%s" % (self._host, self._user, parent, self._apikey)
-        try:
-            res = RequestUtils().get_res(req_url)
-            if res and res.status_code == 200:
-                results = res.json().get("Items") or []
-                for result in results:
-                    if not result:
-                        continue
-                    if result.get("Type") in ["Movie", "Series"]:
-                        item_info = self.get_iteminfo(result.get("Id"))
-                        yield {"id": result.get("Id"),
-                               "library": item_info.get("ParentId"),
-                               "type": item_info.get("Type"),
-                               "title": item_info.get("Name"),
-                               "originalTitle": item_info.get("OriginalTitle"),
-                               "year": item_info.get("ProductionYear"),
-                               "tmdbid": item_info.get("ProviderIds", {}).get("Tmdb"),
-                               "imdbid": item_info.get("ProviderIds", {}).get("Imdb"),
-                               "path": item_info.get("Path"),
-                               "json": str(item_info)}
-                    elif "Folder" in result.get("Type"):
-                        for item in self.get_items(result.get("Id")):
-                            yield item
-        except Exception as e:
-            ExceptionUtils.exception_traceback(e)
-            log.error(f"【{self.client_name}】连接Users/Items出错：" + str(e))
-        yield {}
+            return
+        start_index = 0
+        while True:
+            req_url = "%sUsers/%s/Items?parentId=%s&Recursive=true&IncludeItemTypes=Movie,Series" \
+                      "&Fields=%s&EnableImages=false&EnableUserData=false&StartIndex=%s&Limit=%s&api_key=%s" % (
+                          self._host, self._user, parent, self._item_fields,
+                          start_index, MEDIA_SYNC_PAGE_SIZE, self._apikey)
+            try:
+                res = RequestUtils().get_res(req_url)
+                if not res or res.status_code != 200:
+                    return
+                res_json = res.json()
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error(f"【{self.client_name}】连接Users/Items出错：" + str(e))
+                return
+            results = res_json.get("Items") or []
+            for result in results:
+                if not result or result.get("Type") not in ["Movie", "Series"]:
+                    continue
+                yield {"id": result.get("Id"),
+                       "library": result.get("ParentId"),
+                       "type": result.get("Type"),
+                       "title": result.get("Name"),
+                       "originalTitle": result.get("OriginalTitle"),
+                       "year": result.get("ProductionYear"),
+                       "tmdbid": result.get("ProviderIds", {}).get("Tmdb"),
+                       "imdbid": result.get("ProviderIds", {}).get("Imdb"),
+                       "path": result.get("Path"),
+                       "json": str(result)}
+            start_index += len(results)
+            if len(results) < MEDIA_SYNC_PAGE_SIZE \
+                    or start_index >= (res_json.get("TotalRecordCount") or 0):
+                return
 
     def get_play_url(self, item_id):
         """
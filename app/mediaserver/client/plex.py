@@ -6,7 +6,7 @@ import log
 from app.mediaserver.client._base import _IMediaClient
 from app.utils import ExceptionUtils
 from app.utils.types import MediaServerType, MediaType
-from config import Config
+from config import Config, MEDIA_SYNC_PAGE_SIZE
 from plexapi import media
 from plexapi.myplex import MyPlexAccount
 from plexapi.server import PlexServer
@@ -435,16 +435,22 @@ class Plex(_IMediaClient):
 
     def get_items(self, parent):
         """
-        获取媒体服务器所有媒体库列表
+        分页获取媒体库中的所有媒体，每次只取一页，不一次加载整个媒体库
         """
         if not parent:
-            yield {}
+            return
         if not self._plex:
-            yield {}
+            return
         try:
             section = self._plex.library.sectionByID(parent)
-            if section:
-                for item in section.all():
+            if not section:
+                return
+            container_start = 0
+            while True:
+                items = section.search(container_start=container_start,
+                                       container_size=MEDIA_SYNC_PAGE_SIZE,
+                                       maxresults=MEDIA_SYNC_PAGE_SIZE)
+                for item in items:
                     if not item:
                         continue
                     ids = self.__get_ids(item.guids)
@@ -461,9 +467,11 @@ class Plex(_IMediaClient):
                            "imdbid": ids['imdb_id'],
                            "tvdbid": ids['tvdb_id'],
                            "path": path}
+                container_start += len(items)
+                if len(items) < MEDIA_SYNC_PAGE_SIZE:
+                    return
         except Exception as err:
             ExceptionUtils.exception_traceback(err)
-        yield {}
 
     @staticmethod
     def __get_ids(guids):
@@ -1,16 +1,18 @@
 import json
 import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import log
 from app.conf import SystemConfig
-from app.db import MediaDb
+from app.db import MediaDb, MediaSyncWriter
 from app.helper import ProgressHelper, SubmoduleHelper
 from app.media import Media
 from app.message import Message
 from app.utils import ExceptionUtils
 from app.utils.commons import singleton
 from app.utils.types import MediaServerType, MovieTypes, SystemConfigKey, ProgressKey
-from config import Config
+from config import Config, MEDIA_SYNC_MAX_WORKERS
 from typing import Union
 
 lock = threading.Lock()
@@ -234,34 +236,39 @@ class MediaServer:
             total_count = 0
             movie_count = 0
             tv_count = 0
-            # 清空登记薄
-            self.mediadb.empty(server_type=self._server_type)
-            for library in self.get_libraries():
-                if str(library.get("id")) not in librarys:
-                    continue
-                # 获取媒体库所有项目
-                self.progress.update(ptype=ProgressKey.MediaSync,
-                                     text="正在获取 %s 数据..." % (library.get("name")))
-                for item in self.get_items(library.get("id")):
-                    if not item:
+            # 按批写入登记薄，完成后删除未更新的旧记录
+            writer = MediaSyncWriter(server_type=self._server_type)
+            # 电视剧的剧集信息在线程池中并发查询，按获取顺序写入
+            with ThreadPoolExecutor(max_workers=MEDIA_SYNC_MAX_WORKERS,
+                                    thread_name_prefix="mediasync") as executor:
+                for library in self.get_libraries():
+                    if str(library.get("id")) not in librarys:
                         continue
-                    # 更新进度
-                    seasoninfo = []
-                    total_count += 1
-                    if item.get("type") in ['Movie', 'movie']:
-                        movie_count += 1
-                    elif item.get("type") in ['Series', 'show']:
-                        tv_count += 1
-                        # 查询剧集信息
-                        seasoninfo = self.get_tv_episodes(item.get("id"))
+                    # 获取媒体库所有项目
                     self.progress.update(ptype=ProgressKey.MediaSync,
-                                         text="正在同步 %s，已完成：%s / %s ..." % (
-                                             library.get("name"), total_count, total_media_count),
-                                         value=round(100 * total_count / total_media_count, 1))
-                    # 插入数据
-                    self.mediadb.insert(server_type=self._server_type,
-                                        iteminfo=item,
-                                        seasoninfo=seasoninfo)
+                                         text="正在获取 %s 数据..." % (library.get("name")))
+                    pending = deque()
+                    for item in self.get_items(library.get("id")):
+                        if not item:
+                            continue
+                        total_count += 1
+                        future = None
+                        if item.get("type") in ['Movie', 'movie']:
+                            movie_count += 1
+                        elif item.get("type") in ['Series', 'show']:
+                            tv_count += 1
+                            # 查询剧集信息
+                            future = executor.submit(self.get_tv_episodes, item.get("id"))
+                        pending.append((item, future))
+                        # 写入已完成的项目，等待中的查询数量不超过线程数的两倍
+                        while pending and (len(pending) > MEDIA_SYNC_MAX_WORKERS * 2
+                                           or not pending[0][1] or pending[0][1].done()):
+                            synced_count = self.__write_sync_item(writer, pending.popleft())
+                            self.__update_sync_progress(library, synced_count, total_media_count)
+                    while pending:
+                        synced_count = self.__write_sync_item(writer, pending.popleft())
+                        self.__update_sync_progress(library, synced_count, total_media_count)
+            writer.finish()
 
             # 更新总体同步情况
             self.mediadb.statistics(server_type=self._server_type,
@@ -275,6 +282,31 @@ class MediaServer:
             self.progress.end(ProgressKey.MediaSync)
             log.info("【MediaServer】媒体库数据同步完成，同步数量：%s" % total_count)
 
+    @staticmethod
+    def __write_sync_item(writer, pending_item):
+        """
+        等待剧集信息查询完成后写入媒体项目
+        :return: 已写入的项目数
+        """
+        item, future = pending_item
+        seasoninfo = []
+        if future:
+            try:
+                seasoninfo = future.result() or []
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+        writer.add(iteminfo=item, seasoninfo=seasoninfo)
+        return writer.count
+
+    def __update_sync_progress(self, library, synced_count, total_media_count):
+        """
+        更新同步进度
+        """
+        self.progress.update(ptype=ProgressKey.MediaSync,
+                             text="正在同步 %s，已完成：%s / %s ..." % (
+                                 library.get("name"), synced_count, total_media_count),
+                             value=round(100 * synced_count / total_media_count, 1) if total_media_count else 0)
+
     def check_item_exists(self,
                           mtype,
                           title=None,
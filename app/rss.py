@@ -1,10 +1,11 @@
 import re
+from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 
 import log
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import DbHelper, RssHelper
+from app.helper import DbHelper, RssHelper, RssFeedState
 from app.media import Media
 from app.media.meta import MetaInfo
 from app.message import Message
@@ -13,6 +14,7 @@ from app.subscribe import Subscribe
 from app.utils import ExceptionUtils, Torrent
 from app.utils.commons import singleton
 from app.utils.types import MediaType, SearchType
+from config import RSS_FETCH_MAX_WORKERS, RSS_FETCH_TIMEOUT
 
 lock = Lock()
 
@@ -96,11 +98,14 @@ class Rss:
             else:
                 check_sites = list(set(check_sites))
 
+            # 订阅及过滤规则变化后需要重新处理RSS中的全部条目
+            rss_context = RssFeedState.make_context(rss_movies, rss_tvs, self.filter.get_rule_infos())
             # 匹配到的资源列表
             rss_download_torrents = []
             # 缺失的资源详情
             rss_no_exists = {}
-            # 遍历站点资源
+            # 需要处理的站点及其RSS拉取状态
+            rss_sites = []
             for site_info in rss_sites_info:
                 if not site_info:
                     continue
@@ -114,6 +119,19 @@ class Rss:
                 if not rss_url:
                     log.info(f"【Rss】{site_name} 未配置rssurl，跳过...")
                     continue
+                rss_sites.append((site_info,
+                                  RssFeedState(key="Rss:%s" % site_info.get("id"),
+                                               url=rss_url,
+                                               context=RssFeedState.make_context(rss_context,
+                                                                                 site_info.get("rule")))))
+            # 并发下载RSS，下载完成后按站点顺序统一匹配
+            rss_results = self.__fetch_rss_articles(rss_sites)
+            # 遍历站点资源
+            for (site_info, feed_state), rss_acticles in zip(rss_sites, rss_results):
+                # 站点名称
+                site_name = site_info.get("name")
+                # 站点rss链接
+                rss_url = site_info.get("rssurl")
                 # 站点信息
                 site_id = site_info.get("id")
                 site_cookie = site_info.get("cookie")
@@ -126,13 +144,15 @@ class Rss:
                 site_proxy = site_info.get("proxy")
                 # 使用的规则
                 site_fliter_rule = site_info.get("rule")
-                # 开始下载RSS
+                # 开始处理RSS
                 log.info(f"【Rss】正在处理：{site_name}")
                 if site_info.get("pri"):
                     site_order = 100 - int(site_info.get("pri"))
                 else:
                     site_order = 0
-                rss_acticles = self.rsshelper.parse_rssxml(url=rss_url)
+                if feed_state.not_modified:
+                    log.info(f"【Rss】{site_name} 内容未变化，跳过")
+                    continue
                 if rss_acticles is None:
                     # RSS链接过期
                     log.error(f"【Rss】站点 {site_name} RSS链接已过期，请重新获取！")
@@ -146,9 +166,20 @@ class Rss:
                     continue
                 else:
                     log.info(f"【Rss】{site_name} 获取数据：{len(rss_acticles)}")
+                # 只处理水位线之后的新条目
+                new_articles = feed_state.filter_articles(rss_acticles)
+                if len(new_articles) < len(rss_acticles):
+                    log.info(f"【Rss】{site_name} 新增条目：{len(new_articles)}")
+                # 处理失败、下次需要重新处理的条目
+                failed_articles = []
+                # 识别RSS条目，缓存中没有的批量查询TMDB
+                rss_articles = self.__recognize_articles(new_articles)
                 # 处理RSS结果
                 res_num = 0
-                for article in rss_acticles:
+                for article, media_info in rss_articles:
+                    if not media_info:
+                        failed_articles.append(article)
+                        continue
                     try:
                         # 种子名
                         title = article.get('title')
@@ -158,45 +189,6 @@ class Rss:
                         page_url = article.get('link')
                         # 种子大小
                         size = article.get('size')
-                        # 开始处理
-                        log.info(f"【Rss】开始处理：{title}")
-                        # 检查这个种子是不是下过了
-                        if self.rsshelper.is_rssd_by_enclosure(enclosure):
-                            log.info(f"【Rss】{title} 已成功订阅过")
-                            continue
-                        # 识别种子名称，开始搜索TMDB
-                        description = article.get('description', '')
-                        media_info = MetaInfo(title=title, subtitle=description)
-                        parsed_season = media_info.begin_season
-                        parsed_episode = media_info.begin_episode
-                        parsed_end_episode = media_info.end_episode
-                        parsed_total_episodes = media_info.total_episodes
-                        cache_info = self.media.get_cache_info(media_info)
-                        if cache_info.get("id"):
-                            media_info.tmdb_id = cache_info.get("id")
-                            cached_type = cache_info.get("type")
-                            media_info.title = cache_info.get("title")
-                            media_info.year = cache_info.get("year")
-                            if parsed_season is not None or parsed_episode is not None:
-                                media_info.type = MediaType.TV
-                                if parsed_season is not None:
-                                    media_info.begin_season = parsed_season
-                                if parsed_episode is not None:
-                                    media_info.begin_episode = parsed_episode
-                                if parsed_end_episode is not None:
-                                    media_info.end_episode = parsed_end_episode
-                                if parsed_total_episodes is not None:
-                                    media_info.total_episodes = parsed_total_episodes
-                            else:
-                                media_info.type = cached_type
-                        else:
-                            # 重新查询TMDB
-                            media_info = self.media.get_media_info(title=title, subtitle=description)
-                            if not media_info:
-                                log.warn(f"【Rss】{title} 无法识别出媒体信息！")
-                                continue
-                            elif not media_info.tmdb_info:
-                                log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
                         # 大小及种子页面
                         media_info.set_torrent_info(size=size,
                                                     page_url=page_url,
@@ -312,6 +304,7 @@ class Rss:
 
                         # 站点流控
                         if self.sites.check_ratelimit(site_id):
+                            failed_articles.append(article)
                             continue
 
                         # 设置种子信息
@@ -333,13 +326,97 @@ class Rss:
                     except Exception as e:
                         ExceptionUtils.exception_traceback(e)
                         log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                        failed_articles.append(article)
                         continue
+                feed_state.save(failed_articles)
                 log.info("【Rss】%s 处理结束，匹配到 %s 个有效资源" % (site_name, res_num))
             log.info("【Rss】所有RSS处理结束，共 %s 个有效资源" % len(rss_download_torrents))
             # 开始择优下载
             self.download_rss_torrent(rss_download_torrents=rss_download_torrents,
                                       rss_no_exists=rss_no_exists)
 
+    def __fetch_rss_articles(self, rss_sites):
+        """
+        并发下载并解析各站点的RSS
+        :param rss_sites: [(站点信息, RSS拉取状态)]
+        :return: 与 rss_sites 顺序一致的种子信息列表
+        """
+        if not rss_sites:
+            return []
+        with ThreadPoolExecutor(max_workers=min(RSS_FETCH_MAX_WORKERS, len(rss_sites))) as executor:
+            return list(executor.map(lambda site: self.rsshelper.parse_rssxml(url=site[0].get("rssurl"),
+                                                                              feed_state=site[1],
+                                                                              timeout=RSS_FETCH_TIMEOUT),
+                                     rss_sites))
+
+    def __recognize_articles(self, rss_acticles):
+        """
+        识别RSS条目的媒体信息，缓存中没有的名称批量查询TMDB
+        :param rss_acticles: RSS条目列表
+        :return: [(条目, 媒体信息)]，已订阅过的条目不返回，识别出错的条目媒体信息为None
+        """
+        articles = []
+        uncached = []
+        # 批量查询已处理过的下载链接
+        rssd_enclosures = self.rsshelper.get_rssd_enclosures([article.get('enclosure') for article in rss_acticles])
+        for article in rss_acticles:
+            try:
+                # 种子名
+                title = article.get('title')
+                # 种子链接
+                enclosure = article.get('enclosure')
+                # 开始处理
+                log.info(f"【Rss】开始处理：{title}")
+                # 检查这个种子是不是下过了
+                if not enclosure or enclosure in rssd_enclosures:
+                    log.info(f"【Rss】{title} 已成功订阅过")
+                    continue
+                # 识别种子名称
+                description = article.get('description', '')
+                media_info = MetaInfo(title=title, subtitle=description)
+                parsed_season = media_info.begin_season
+                parsed_episode = media_info.begin_episode
+                parsed_end_episode = media_info.end_episode
+                parsed_total_episodes = media_info.total_episodes
+                cache_info = self.media.get_cache_info(media_info)
+                if cache_info.get("id"):
+                    media_info.tmdb_id = cache_info.get("id")
+                    cached_type = cache_info.get("type")
+                    media_info.title = cache_info.get("title")
+                    media_info.year = cache_info.get("year")
+                    if parsed_season is not None or parsed_episode is not None:
+                        media_info.type = MediaType.TV
+                        if parsed_season is not None:
+                            media_info.begin_season = parsed_season
+                        if parsed_episode is not None:
+                            media_info.begin_episode = parsed_episode
+                        if parsed_end_episode is not None:
+                            media_info.end_episode = parsed_end_episode
+                        if parsed_total_episodes is not None:
+                            media_info.total_episodes = parsed_total_episodes
+                    else:
+                        media_info.type = cached_type
+                    articles.append([article, media_info])
+                else:
+                    # 稍后重新查询TMDB
+                    uncached.append(len(articles))
+                    articles.append([article, None])
+            except Exception as e:
+                ExceptionUtils.exception_traceback(e)
+                log.error("【Rss】处理RSS发生错误：%s" % str(e))
+                articles.append([article, None])
+        # 批量查询TMDB
+        media_infos = self.media.get_media_infos(
+            titles=[(articles[i][0].get('title'), articles[i][0].get('description', '')) for i in uncached])
+        for i, media_info in zip(uncached, media_infos):
+            title = articles[i][0].get('title')
+            if not media_info:
+                log.warn(f"【Rss】{title} 无法识别出媒体信息！")
+            elif not media_info.tmdb_info:
+                log.info(f"【Rss】{title} 识别为 {media_info.get_name()} 未匹配到TMDB媒体信息")
+            articles[i][1] = media_info
+        return [(article, media_info) for article, media_info in articles]
+
     def check_torrent_rss(self,
                           media_info,
                           rss_movies,
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import time
 import traceback
@@ -11,7 +12,7 @@ from lxml import etree
 import log
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import DbHelper, RssHelper
+from app.helper import DbHelper, RssHelper, RssFeedState
 from app.media import Media
 from app.media.meta import MetaInfo
 from app.message import Message
@@ -193,16 +194,31 @@ class RssChecker(object):
         taskinfo = self.get_rsstask_info(taskid)
         if not taskinfo:
             return
-        rss_result = self.__parse_userrss_result(taskinfo)
+        # 各RSS地址的拉取状态
+        feed_states = []
+        # 处理失败、下次需要重新处理的条目
+        failed_articles = []
+        rss_result = self.__parse_userrss_result(taskinfo, feed_states=feed_states)
         if len(rss_result) == 0:
-            log.warn("【RssChecker】%s 未下载到数据" % taskinfo.get("name"))
+            if feed_states:
+                for feed_state in feed_states:
+                    feed_state.save()
+                log.info("【RssChecker】%s 没有新增数据" % taskinfo.get("name"))
+            else:
+                log.warn("【RssChecker】%s 未下载到数据" % taskinfo.get("name"))
             return
         else:
             log.info("【RssChecker】%s 获取数据：%s" % (taskinfo.get("name"), len(rss_result)))
+        # 下载项目对应的条目
+        download_articles = {}
+        # 批量检查是否已处理过
+        rss_processed = self.get_articles_processed(taskinfo.get("uses"), rss_result)
+        # 本次已处理的订阅名称
+        subscribe_names = set()
         # 处理RSS结果
         res_num = 0
         no_exists = {}
-        for res in rss_result:
+        for res, processed in zip(rss_result, rss_processed):
             try:
                 # 种子名
                 title = res.get('title')
@@ -229,7 +245,7 @@ class RssChecker(object):
                 meta_name = "%s %s" % (title, year) if year else title
                 description = res.get('description', '')
                 # 检查是否已处理过
-                if self.is_article_processed(task_type, title, year, enclosure):
+                if processed or (task_type == "R" and meta_name in subscribe_names):
                     log.info("【RssChecker】%s 已处理过" % title)
                     continue
 
@@ -252,6 +268,7 @@ class RssChecker(object):
                                                                    mtype=mediatype)
                             if not media_info:
                                 log.warn("【RssChecker】%s 识别媒体信息出错！" % title)
+                                failed_articles.append(res)
                                 continue
                             if not media_info.tmdb_info:
                                 log.info("【RssChecker】%s 识别为 %s 未匹配到媒体信息" % (title, media_info.get_name()))
@@ -317,6 +334,7 @@ class RssChecker(object):
                         continue
                     if media_info not in rss_download_torrents:
                         rss_download_torrents.append(media_info)
+                        download_articles[id(media_info)] = res
                         res_num = res_num + 1
                 elif task_type == "R":
                     # 识别种子名称，开始搜索TMDB
@@ -345,6 +363,7 @@ class RssChecker(object):
                     media_info.set_torrent_info(enclosure=meta_name)
                     # 添加处理历史
                     self.rsshelper.insert_rss_torrents(media_info)
+                    subscribe_names.add(meta_name)
                     if media_info not in rss_subscribe_torrents:
                         rss_subscribe_torrents.append(media_info)
                         res_num = res_num + 1
@@ -353,6 +372,7 @@ class RssChecker(object):
             except Exception as e:
                 ExceptionUtils.exception_traceback(e)
                 log.error("【RssChecker】处理RSS发生错误：%s - %s" % (str(e), traceback.format_exc()))
+                failed_articles.append(res)
                 continue
         log.info("【RssChecker】%s 处理结束，匹配到 %s 个有效资源" % (taskinfo.get("name"), res_num))
         # 添加下载
@@ -373,6 +393,7 @@ class RssChecker(object):
                 else:
                     log.error("【RssChecker】添加下载任务 %s 失败：%s" % (
                         media.get_title_string(), ret_msg or "请检查下载任务是否已存在"))
+                    failed_articles.append(download_articles.get(id(media)))
         # 添加订阅
         if rss_subscribe_torrents:
             for media in rss_subscribe_torrents:
@@ -396,6 +417,9 @@ class RssChecker(object):
                 if not rss_media or code != 0:
                     log.warn("【RssChecker】%s 添加订阅失败：%s" % (media.get_name(), msg))
 
+        # 保存拉取状态
+        for feed_state in feed_states:
+            feed_state.save(failed_articles)
         # 更新状态
         counter = len(rss_download_torrents) + len(rss_subscribe_torrents) + len(rss_search_torrents)
         if counter:
@@ -404,9 +428,11 @@ class RssChecker(object):
                 if str(taskinfo.get("counter")).isdigit() else counter
             taskinfo["update_time"] = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
 
-    def __parse_userrss_result(self, taskinfo):
+    def __parse_userrss_result(self, taskinfo, feed_states=None):
         """
         获取RSS链接数据，根据PARSER进行解析获取返回结果
+        :param taskinfo: 任务信息
+        :param feed_states: 传入列表时按拉取状态增量获取，跳过内容未变化的地址并只返回新增条目，各地址的状态追加到该列表中
         """
         task_name = taskinfo.get("name")
         rss_urls = taskinfo.get("address")
@@ -445,16 +471,40 @@ class RssChecker(object):
                     log.error(f"【RssChecker】任务 {task_name} 配置解析器 {parser_name} 附加参数不合法")
                     continue
                 rss_url = "%s?%s" % (rss_url, param_url) if rss_url.find("?") == -1 else "%s&%s" % (rss_url, param_url)
+            # 拉取状态
+            feed_state = None
+            headers = None
+            if feed_states is not None:
+                feed_state = RssFeedState(key="RssChecker:%s:%s" % (taskinfo.get("id"), i),
+                                          url=rss_url,
+                                          context=RssFeedState.make_context(
+                                              {k: v for k, v in taskinfo.items() if k not in ["update_time", "counter"]},
+                                              rss_parser,
+                                              self.filter.get_rule_infos()))
+                headers = feed_state.get_request_headers()
+                if headers:
+                    headers.update({"User-Agent": Config().get_ua()})
             # 请求数据
             try:
-                ret = RequestUtils(proxies=Config().get_proxies() if taskinfo.get("proxy") else None
+                ret = RequestUtils(headers=headers,
+                                   proxies=Config().get_proxies() if taskinfo.get("proxy") else None
                                    ).get_res(rss_url)
+                if feed_state and ret is not None and ret.status_code == 304:
+                    feed_state.check_response(ret)
                 if not ret:
                     continue
+                if feed_state and not feed_state.not_modified:
+                    feed_state.check_response(ret, hashlib.md5(ret.content).hexdigest())
+                if feed_state and feed_state.not_modified:
+                    log.info(f"【RssChecker】任务 {task_name} RSS地址 {rss_url} 内容未变化，跳过")
+                    feed_states.append(feed_state)
+                    continue
                 ret.encoding = ret.apparent_encoding
             except Exception as e2:
                 ExceptionUtils.exception_traceback(e2)
                 continue
+            # 本地址条目的起始位置
+            begin_pos = len(rss_result)
             # 解析数据 XPATH
             if rss_parser.get("type") == "XML":
                 try:
@@ -505,6 +555,10 @@ class RssChecker(object):
                             rss_item.update({key: value[0]})
                     rss_item.update({"address_index": i+1})
                     rss_result.append(rss_item)
+            # 只保留水位线之后的新条目
+            if feed_state:
+                rss_result[begin_pos:] = feed_state.filter_articles(rss_result[begin_pos:])
+                feed_states.append(feed_state)
         return rss_result
 
     def get_userrss_parser(self, pid=None):
@@ -532,7 +586,9 @@ class RssChecker(object):
         rss_result = self.__parse_userrss_result(taskinfo)
         if len(rss_result) == 0:
             return []
-        for res in rss_result:
+        # 批量检查是否已处理过
+        rss_processed = self.get_articles_processed(taskinfo.get("uses"), rss_result)
+        for res, finish_flag in zip(rss_result, rss_processed):
             try:
                 # 种子名
                 title = res.get('title')
@@ -552,8 +608,6 @@ class RssChecker(object):
                 year = res.get('year')
                 if year and len(year) > 4:
                     year = year[:4]
-                # 检查是不是处理过
-                finish_flag = self.is_article_processed(taskinfo.get("uses"), title, year, enclosure)
                 # 信息聚合
                 params = {
                     "title": title,
@@ -750,6 +804,42 @@ class RssChecker(object):
             case _:
                 return False
 
+    def get_articles_processed(self, task_type, articles):
+        """
+        批量检查报文是否已处理，与 is_article_processed 判断方式相同
+        :param task_type: 订阅任务类型
+        :param articles: 报文列表
+        :return: 与报文顺序一致的是否已处理列表
+        """
+        # (报文名称, 报文链接)
+        keys = []
+        for article in articles:
+            title = article.get("title")
+            year = article.get("year")
+            if year and len(str(year)) > 4:
+                year = str(year)[:4]
+            meta_name = f"{title} {year}" if year else title
+            match task_type:
+                case "D":
+                    keys.append((meta_name, article.get("enclosure")))
+                case "R":
+                    keys.append((meta_name, meta_name))
+                case _:
+                    keys.append(None)
+        rssd_enclosures = self.rsshelper.get_rssd_enclosures([key[1] for key in keys if key and key[1]])
+        rssd_names = self.rsshelper.get_rssd_torrent_names([key[0] for key in keys if key and not key[1]])
+        processed = []
+        for key in keys:
+            if not key:
+                processed.append(False)
+            elif key[1]:
+                processed.append(key[1] in rssd_enclosures)
+            elif key[0]:
+                processed.append(key[0] in rssd_names)
+            else:
+                processed.append(True)
+        return processed
+
     def delete_userrss_task(self, tid):
         """
         删除自定义RSS任务
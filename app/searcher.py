@@ -40,13 +40,15 @@ class Searcher:
                       key_word: Union[str, list],
                       filter_args: dict,
                       match_media=None,
-                      in_from: SearchType = None):
+                      in_from: SearchType = None,
+                      on_result=None):
         """
         根据关键字调用索引器检查媒体
         :param key_word: 搜索的关键字，不能为空
         :param filter_args: 过滤条件
         :param match_media: 区配的媒体信息
         :param in_from: 搜索渠道
+        :param on_result: 每个站点完成后的回调，参数为站点及该站点过滤后的结果
         :return: 命中的资源媒体信息列表
         """
         if not key_word:
@@ -64,7 +66,8 @@ class Searcher:
         return self.indexer.search_by_keyword(key_word=key_word,
                                               filter_args=filter_args,
                                               match_media=match_media,
-                                              in_from=in_from)
+                                              in_from=in_from,
+                                              on_result=on_result)
 
     def search_one_media(self, media_info,
                          in_from: SearchType,
@@ -61,53 +61,85 @@ def retry(ExceptionToCheck, tries=3, delay=3, backoff=2, logger=None):
 
     return deco_retry
 
-def ttl_lru(seconds = 60, maxsize = 128, typed = False):
-    cache = collections.OrderedDict()
+TTLCacheInfo = collections.namedtuple("TTLCacheInfo", ["hits", "misses", "expired", "maxsize", "currsize"])
+
+
+def ttl_lru(seconds=60, maxsize=128, typed=False):
+    """
+    带过期时间的LRU缓存装饰器，读写均为O(1)，线程安全
+    过期条目在访问时惰性淘汰，写入时顺带清理LRU队首已过期的条目
+    :param seconds: 过期时间（秒）
+    :param maxsize: 最大条目数
+    :param typed: 是否区分参数类型
+    """
 
     def decorator(func):
+        # key -> (value, 过期时间)，按最近访问排序，队首为最久未访问
+        cache = collections.OrderedDict()
+        cache_lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0, "expired": 0}
+        make_key = functools._make_key
+
+        def _sweep(now):
+            # 从队首清理已过期的条目，遇到未过期的即停止，均摊O(1)
+            while cache:
+                key, (_, expiration_time) = next(iter(cache.items()))
+                if expiration_time > now:
+                    break
+                del cache[key]
+                stats["expired"] += 1
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            _remove_expired_entries()  # 在访问缓存之前删除过期条目
-            nonlocal cache
-            key = functools._make_key(args, kwargs, typed)
-            if key in cache:
+            key = make_key(args, kwargs, typed)
+            now = time.monotonic()
+            with cache_lock:
+                item = cache.get(key)
+                if item is not None:
+                    if item[1] > now:
+                        cache.move_to_end(key)
+                        stats["hits"] += 1
+                        return item[0]
+                    del cache[key]
+                    stats["expired"] += 1
+                stats["misses"] += 1
+            # 调用时不持有锁，避免慢请求阻塞其它线程
+            result = func(*args, **kwargs)
+            with cache_lock:
+                cache[key] = (result, time.monotonic() + seconds)
                 cache.move_to_end(key)
-                return cache[key][0]  # 仅返回值，而不是过期时间
-            try:
-                result = func(*args, **kwargs)
-                cache[key] = (result, time.time() + seconds)  # 将结果与过期时间一起存储
-                if len(cache) > maxsize:
+                _sweep(now)
+                while len(cache) > maxsize:
                     cache.popitem(last=False)
-                return result
-            except Exception as e:
-                raise e
-
-        def _remove_expired_entries():
-            nonlocal cache
-            current_time = time.time()
-            for key, (value, expiration_time) in list(cache.items()):
-                if expiration_time < current_time:
-                    cache.pop(key)
+            return result
 
         def clear_cache():
-            nonlocal cache
-            cache.clear()
+            with cache_lock:
+                cache.clear()
+                stats.update({"hits": 0, "misses": 0, "expired": 0})
 
         def cache_remove(*args, **kwargs):
-            nonlocal cache
-            key = functools._make_key(args, kwargs, typed)
-            if key in cache:
-                cache.pop(key)
+            with cache_lock:
+                cache.pop(make_key(args, kwargs, typed), None)
 
         def cache_replace(value, *args, **kwargs):
-            nonlocal cache
-            key = functools._make_key(args, kwargs, typed)
-            cache[key] = value
+            with cache_lock:
+                key = make_key(args, kwargs, typed)
+                cache[key] = (value, time.monotonic() + seconds)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+
+        def cache_info():
+            with cache_lock:
+                return TTLCacheInfo(stats["hits"], stats["misses"], stats["expired"], maxsize, len(cache))
 
         wrapper.clear_cache = clear_cache
+        wrapper.cache_clear = clear_cache
         wrapper.cache_remove = cache_remove
         wrapper.cache_replace = cache_replace
+        wrapper.cache_info = cache_info
 
         return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
@@ -1,18 +1,298 @@
 import requests
 import urllib3
-from urllib3.exceptions import InsecureRequestWarning
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import InsecureRequestWarning, NameResolutionError, ConnectTimeoutError, NewConnectionError
 from urllib3.util.retry import Retry
-from requests.adapters import HTTPAdapter
-from config import Config
+from requests.adapters import BaseAdapter, HTTPAdapter
+from config import Config, HTTP_POOL_MAXSIZE, HTTP_POOL_MAX_HOSTS, HAPPY_EYEBALLS_DELAY, HAPPY_EYEBALLS_FAMILY_TTL
+from collections import OrderedDict
+from functools import partial
 from urllib.parse import urlparse
+import errno
+import os
+import selectors
+import sys
 import time
 import socket
 import threading
-from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
 
 urllib3.disable_warnings(InsecureRequestWarning)
 
 
+class HappyEyeballs:
+    """
+    Happy Eyeballs（RFC 8305）：按地址族交替发起非阻塞TCP连接，先建立的连接胜出，只竞速连接不重复发送请求
+    胜出的地址族按主机缓存一段时间，下次优先尝试
+    """
+    # 主机 -> (地址族, 过期时间)
+    _families = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_family(cls, host):
+        with cls._lock:
+            family, expire = cls._families.get(host, (None, 0))
+            if family and expire > time.monotonic():
+                return family
+            cls._families.pop(host, None)
+            return None
+
+    @classmethod
+    def set_family(cls, host, family):
+        with cls._lock:
+            cls._families[host] = (family, time.monotonic() + HAPPY_EYEBALLS_FAMILY_TTL)
+
+    @staticmethod
+    def sort_addresses(addrinfos, first_family):
+        """
+        按地址族交替排列地址，优先的地址族排在最前
+        """
+        first = [info for info in addrinfos if info[0] == first_family]
+        second = [info for info in addrinfos if info[0] != first_family]
+        if not first:
+            return second
+        sorted_infos = []
+        for i in range(max(len(first), len(second))):
+            if i < len(first):
+                sorted_infos.append(first[i])
+            if i < len(second):
+                sorted_infos.append(second[i])
+        return sorted_infos
+
+    @classmethod
+    def create_connection(cls, address, timeout=None, source_address=None, socket_options=None, prefer_ipv4=True):
+        """
+        建立TCP连接，参数与 urllib3.util.connection.create_connection 一致
+        :param prefer_ipv4: 没有缓存的地址族时是否优先尝试IPv4
+        """
+        host, port = address
+        if host.startswith("["):
+            host = host.strip("[]")
+        if not isinstance(timeout, (int, float)):
+            timeout = socket.getdefaulttimeout()
+        addrinfos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        if not addrinfos:
+            raise OSError("getaddrinfo returns an empty list")
+        first_family = cls.get_family(host) or (socket.AF_INET if prefer_ipv4 else socket.AF_INET6)
+        addrinfos = cls.sort_addresses(addrinfos, first_family)
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        selector = selectors.DefaultSelector()
+        pending = {}
+        errors = []
+        winner = None
+        next_index = 0
+        try:
+            while winner is None:
+                # 启动下一个连接尝试
+                if next_index < len(addrinfos):
+                    family, socktype, proto, _, sockaddr = addrinfos[next_index]
+                    next_index += 1
+                    sock = None
+                    try:
+                        sock = socket.socket(family, socktype, proto)
+                        for opt in socket_options or []:
+                            sock.setsockopt(*opt)
+                        if source_address:
+                            sock.bind(source_address)
+                        sock.setblocking(False)
+                        err = sock.connect_ex(sockaddr)
+                    except OSError as e:
+                        if sock:
+                            sock.close()
+                        errors.append(e)
+                        continue
+                    if err == 0:
+                        winner = (sock, family)
+                        break
+                    if err not in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                        sock.close()
+                        errors.append(OSError(err, os.strerror(err)))
+                        continue
+                    pending[sock] = family
+                    selector.register(sock, selectors.EVENT_WRITE)
+                if not pending:
+                    break
+                # 等待已发起的连接，超过间隔仍未建立时尝试下一个地址
+                wait_time = HAPPY_EYEBALLS_DELAY if next_index < len(addrinfos) else None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise socket.timeout("timed out")
+                    wait_time = remaining if wait_time is None else min(wait_time, remaining)
+                for key, _ in selector.select(wait_time):
+                    sock = key.fileobj
+                    selector.unregister(sock)
+                    family = pending.pop(sock)
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if err == 0:
+                        winner = (sock, family)
+                        break
+                    sock.close()
+                    errors.append(OSError(err, os.strerror(err)))
+        finally:
+            for sock in pending:
+                sock.close()
+            selector.close()
+        if winner is None:
+            if errors:
+                raise errors[0]
+            raise socket.timeout("timed out")
+        sock, family = winner
+        sock.setblocking(True)
+        sock.settimeout(timeout)
+        cls.set_family(host, family)
+        return sock
+
+
+class HappyEyeballsConnectionMixin:
+    """
+    使用 HappyEyeballs 建立连接的urllib3连接
+    """
+
+    def __init__(self, *args, prefer_ipv4=True, **kwargs):
+        self.prefer_ipv4 = prefer_ipv4
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        try:
+            sock = HappyEyeballs.create_connection((self._dns_host, self.port),
+                                                   self.timeout,
+                                                   source_address=self.source_address,
+                                                   socket_options=self.socket_options,
+                                                   prefer_ipv4=self.prefer_ipv4)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        except socket.timeout as e:
+            raise ConnectTimeoutError(
+                self, f"Connection to {self.host} timed out. (connect timeout={self.timeout})"
+            ) from e
+        except OSError as e:
+            raise NewConnectionError(self, f"Failed to establish a new connection: {e}") from e
+        sys.audit("http.client.connect", self, self.host, self.port)
+        return sock
+
+
+class HappyEyeballsHTTPConnection(HappyEyeballsConnectionMixin, HTTPConnection):
+    pass
+
+
+class HappyEyeballsHTTPSConnection(HappyEyeballsConnectionMixin, HTTPSConnection):
+    pass
+
+
+class HappyEyeballsHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = HappyEyeballsHTTPConnection
+
+
+class HappyEyeballsHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = HappyEyeballsHTTPSConnection
+
+
+class HappyEyeballsAdapter(HTTPAdapter):
+    """
+    直连时使用 HappyEyeballs 建立连接，经代理的连接不受影响
+    """
+
+    def __init__(self, prefer_ipv4=True, **kwargs):
+        self._prefer_ipv4 = prefer_ipv4
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # 连接池类的额外参数会传递给连接
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": partial(HappyEyeballsHTTPConnectionPool, prefer_ipv4=self._prefer_ipv4),
+            "https": partial(HappyEyeballsHTTPSConnectionPool, prefer_ipv4=self._prefer_ipv4)
+        }
+
+
+class PooledAdapter(BaseAdapter):
+    """
+    按主机、代理和重试策略路由到进程内共享的连接池，使不同RequestUtils实例间可以复用keep-alive连接和TLS会话
+    """
+    # 共享连接池：(scheme, host, port, 代理, 重试策略, 优先IPv4) -> HappyEyeballsAdapter
+    _adapters = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, retry=None, retry_key=None, prefer_ipv4=True):
+        super().__init__()
+        self._retry = retry if retry is not None else 0
+        self._retry_key = retry_key
+        self._prefer_ipv4 = prefer_ipv4
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        adapter = self.get_adapter(request.url, proxies, self._retry, self._retry_key, self._prefer_ipv4)
+        return adapter.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+    def close(self):
+        # 共享连接池不随单个会话关闭
+        pass
+
+    @classmethod
+    def get_adapter(cls, url, proxies, retry, retry_key, prefer_ipv4=True):
+        """
+        获取共享连接池，不存在时创建，超出最大主机数时关闭最久未使用的连接池
+        """
+        parsed = urlparse(url)
+        proxy = None
+        if proxies:
+            proxy = proxies.get(parsed.scheme) or proxies.get("all")
+        key = (parsed.scheme, parsed.hostname, parsed.port, proxy, retry_key, prefer_ipv4)
+        evicted = None
+        with cls._lock:
+            adapter = cls._adapters.get(key)
+            if adapter:
+                cls._adapters.move_to_end(key)
+                return adapter
+            adapter = HappyEyeballsAdapter(prefer_ipv4=prefer_ipv4,
+                                           pool_connections=1,
+                                           pool_maxsize=HTTP_POOL_MAXSIZE,
+                                           max_retries=retry)
+            cls._adapters[key] = adapter
+            if len(cls._adapters) > HTTP_POOL_MAX_HOSTS:
+                _, evicted = cls._adapters.popitem(last=False)
+        if evicted:
+            evicted.close()
+        return adapter
+
+    @classmethod
+    def get_stats(cls):
+        """
+        连接池统计：主机数、请求数、新建连接数、复用连接的请求数
+        """
+        with cls._lock:
+            adapters = list(cls._adapters.values())
+        requests_count = connections_count = 0
+        for adapter in adapters:
+            managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+            for manager in managers:
+                for pool_key in list(manager.pools.keys()):
+                    pool = manager.pools.get(pool_key)
+                    if not pool:
+                        continue
+                    requests_count += pool.num_requests
+                    connections_count += pool.num_connections
+        return {
+            "hosts": len(adapters),
+            "requests": requests_count,
+            "connections": connections_count,
+            "reused": max(requests_count - connections_count, 0)
+        }
+
+    @classmethod
+    def clear(cls):
+        """
+        关闭全部共享连接池
+        """
+        with cls._lock:
+            adapters = list(cls._adapters.values())
+            cls._adapters.clear()
+        for adapter in adapters:
+            adapter.close()
+
+
 class RequestUtils:
     _headers = None
     _cookies = None
@@ -20,28 +300,6 @@ class RequestUtils:
     _timeout = (5, 20)
     _session = None
 
-    # thread-local DNS family selector for dual-stack racing
-    _tls = threading.local()
-    _orig_getaddrinfo = socket.getaddrinfo
-    _ga_installed = False
-
-    def _ga_wrapper(host, port, family=0, type=0, proto=0, flags=0):
-        res = RequestUtils._orig_getaddrinfo(host, port, family, type, proto, flags)
-        desired = getattr(RequestUtils._tls, 'family', None)
-        if desired is None:
-            return res
-        try:
-            filtered = [r for r in res if r and r[0] == desired]
-            return filtered if filtered else res
-        except Exception:
-            return res
-
-    @staticmethod
-    def _ensure_ga_installed():
-        if not RequestUtils._ga_installed:
-            socket.getaddrinfo = RequestUtils._ga_wrapper
-            RequestUtils._ga_installed = True
-
     def __init__(self,
                  headers=None,
                  cookies=None,
@@ -93,6 +351,7 @@ class RequestUtils:
             self._proxies = proxies
         # session & retry policy (Plan A)
         # 默认开启重试，若传入retries<=0则不启用
+        # 会话只保存本实例的Cookie，连接池由 PooledAdapter 在进程内按主机共享
         if session:
             self._session = session
         else:
@@ -123,17 +382,21 @@ class RequestUtils:
                 retry = Retry(allowed_methods=allowed_methods, **retry_kwargs)
             except TypeError:
                 retry = Retry(method_whitelist=allowed_methods, **retry_kwargs)
-
-            adapter = HTTPAdapter(max_retries=retry)
+            retry_key = (retries, backoff_factor, tuple(status_forcelist), tuple(sorted(allowed_methods)))
+            adapter = PooledAdapter(retry=retry, retry_key=retry_key, prefer_ipv4=prefer_ipv4)
+            self._session.mount("http://", adapter)
+            self._session.mount("https://", adapter)
+        elif not session:
+            adapter = PooledAdapter(prefer_ipv4=prefer_ipv4)
             self._session.mount("http://", adapter)
             self._session.mount("https://", adapter)
 
+        # 直连时由 HappyEyeballs 在建立连接时竞速IPv4/IPv6，dual_stack_race 仅为兼容保留
         if timeout:
             self._timeout = timeout
-        self._dual_stack_race = dual_stack_race
-        self._prefer_ipv4 = prefer_ipv4
 
-    def _send_once(self, method, url, data=None, params=None, allow_redirects=True, files=None, json=None):
+    def _send_once(self, method, url, data=None, params=None, allow_redirects=True, files=None, json=None,
+                   stream=False):
         if self._session:
             return self._session.request(method,
                                          url,
@@ -146,7 +409,8 @@ class RequestUtils:
                                          timeout=self._timeout,
                                          allow_redirects=allow_redirects,
                                          files=files,
-                                         json=json)
+                                         json=json,
+                                         stream=stream)
         else:
             return requests.request(method,
                                     url,
@@ -159,70 +423,16 @@ class RequestUtils:
                                     timeout=self._timeout,
                                     allow_redirects=allow_redirects,
                                     files=files,
-                                    json=json)
+                                    json=json,
+                                    stream=stream)
 
-    def _send_with_race(self, method, url, data=None, params=None, allow_redirects=True, files=None, json=None, raise_exception=False):
+    def _send_with_retry(self, method, url, data=None, params=None, allow_redirects=True, files=None, json=None,
+                         raise_exception=False, stream=False):
         attempts = (self._exception_retries or 0) + 1
         for attempt in range(attempts):
             try:
-                # do not race when proxies are in use
-                if self.get_proxy(url):
-                    return self._send_once(method, url, data=data, params=params, allow_redirects=allow_redirects, files=files, json=json)
-
-                if self._dual_stack_race:
-                    RequestUtils._ensure_ga_installed()
-
-                    def runner(family):
-                        try:
-                            RequestUtils._tls.family = family
-                            return self._send_once(method, url, data=data, params=params, allow_redirects=allow_redirects, files=files, json=json)
-                        finally:
-                            RequestUtils._tls.family = None
-
-                    ex = ThreadPoolExecutor(max_workers=2)
-                    try:
-                        f6 = ex.submit(runner, socket.AF_INET6)
-                        f4 = ex.submit(runner, socket.AF_INET)
-                        done, pending = wait({f6, f4}, return_when=FIRST_COMPLETED)
-                        first = next(iter(done))
-                        try:
-                            r_first = first.result()
-                        except requests.exceptions.RequestException:
-                            r_first = None
-                        # Prefer success (2xx/3xx) if available
-                        if r_first is not None and getattr(r_first, 'status_code', None) and r_first.status_code < 400:
-                            return r_first
-                        # small grace to see if the other succeeds quickly
-                        other = next(iter(pending)) if pending else None
-                        if other:
-                            try:
-                                r_other = other.result(timeout=1)
-                                if r_other is not None and getattr(r_other, 'status_code', None) and r_other.status_code < 400:
-                                    return r_other
-                            except Exception:
-                                pass
-                        # fallback to first result (may be error or None)
-                        return r_first
-                    finally:
-                        try:
-                            ex.shutdown(wait=False, cancel_futures=True)
-                        except Exception:
-                            pass
-                else:
-                    RequestUtils._ensure_ga_installed()
-                    order = (socket.AF_INET, socket.AF_INET6) if getattr(self, '_prefer_ipv4', True) else (socket.AF_INET6, socket.AF_INET)
-                    last_exc = None
-                    for fam in order:
-                        try:
-                            RequestUtils._tls.family = fam
-                            return self._send_once(method, url, data=data, params=params, allow_redirects=allow_redirects, files=files, json=json)
-                        except requests.exceptions.RequestException as e:
-                            last_exc = e
-                        finally:
-                            RequestUtils._tls.family = None
-                    if last_exc is not None:
-                        raise last_exc
-                    return None
+                return self._send_once(method, url, data=data, params=params, allow_redirects=allow_redirects,
+                                       files=files, json=json, stream=stream)
             except requests.exceptions.RequestException:
                 if attempt < attempts - 1:
                     delay = (self._retry_backoff_factor or 0.5) * (2 ** attempt)
@@ -235,19 +445,27 @@ class RequestUtils:
     def post(self, url, data=None, json=None):
         if json is None:
             json = {}
-        return self._send_with_race("POST", url, data=data, json=json)
+        return self._send_with_retry("POST", url, data=data, json=json)
 
     def get(self, url, params=None):
-        r = self._send_with_race("GET", url, params=params)
+        r = self._send_with_retry("GET", url, params=params)
         if not r:
             return None
         return str(r.content, 'utf-8')
 
-    def get_res(self, url, params=None, allow_redirects=True, raise_exception=False):
-        return self._send_with_race("GET", url, params=params, allow_redirects=allow_redirects, raise_exception=raise_exception)
+    def get_res(self, url, params=None, allow_redirects=True, raise_exception=False, stream=False):
+        return self._send_with_retry("GET", url, params=params, allow_redirects=allow_redirects, raise_exception=raise_exception,
+                                     stream=stream)
 
     def post_res(self, url, data=None, params=None, allow_redirects=True, files=None, json=None):
-        return self._send_with_race("POST", url, data=data, params=params, allow_redirects=allow_redirects, files=files, json=json)
+        return self._send_with_retry("POST", url, data=data, params=params, allow_redirects=allow_redirects, files=files, json=json)
+
+    @staticmethod
+    def get_pool_stats():
+        """
+        进程内共享连接池的复用统计
+        """
+        return PooledAdapter.get_stats()
 
     def get_proxy(self, url):
         """
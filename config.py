@@ -41,6 +41,55 @@ RSS_REFRESH_TMDB_INTERVAL = 6
 BRUSH_REMOVE_TORRENTS_INTERVAL = 300
 # 定时清除未识别的缓存时间间隔（小时）
 META_DELETE_UNKNOWN_INTERVAL = 12
+# TMDB识别缓存在内存中保留的最大条目数，超出时淘汰最久未使用的条目（待回写的条目除外）
+META_CACHE_MEMORY_SIZE = 5000
+# 批量识别时查询TMDB的最大并发数
+TMDB_RECOGNIZE_MAX_WORKERS = 5
+# 并发下载站点RSS的最大线程数
+RSS_FETCH_MAX_WORKERS = 8
+# 下载单个站点RSS的超时时间（连接，读取）（秒）
+RSS_FETCH_TIMEOUT = (10, 30)
+# 媒体库同步分页获取媒体项目时每页的数量
+MEDIA_SYNC_PAGE_SIZE = 200
+# 媒体库同步并发查询剧集信息的最大线程数
+MEDIA_SYNC_MAX_WORKERS = 8
+# 媒体库同步每批写入本地数据库的项目数，每批一个事务
+MEDIA_SYNC_BATCH_SIZE = 500
+# 共享事件循环执行阻塞任务的最大线程数
+ASYNC_EXECUTOR_MAX_WORKERS = 32
+# 单个站点搜索的时间预算（秒），超时后不再等待该站点
+SEARCH_SITE_TIMEOUT = 30
+# 同一站点同时进行的最大搜索数
+SEARCH_SITE_CONCURRENCY = 2
+# 每个主机共享连接池保持的最大空闲连接数
+HTTP_POOL_MAXSIZE = 16
+# 进程内共享连接池的最大主机数，超出时关闭最久未使用的连接池
+HTTP_POOL_MAX_HOSTS = 128
+# Happy Eyeballs 发起下一个地址连接前等待的时间（秒）
+HAPPY_EYEBALLS_DELAY = 0.25
+# Happy Eyeballs 缓存各主机胜出地址族的时间（秒）
+HAPPY_EYEBALLS_FAMILY_TTL = 10 * 60
+# HTTP响应磁盘缓存各类接口的过期时间（秒）
+HTTP_CACHE_TTL = {
+    # 媒体详情
+    "details": 3 * 24 * 3600,
+    # 季集信息
+    "seasons": 12 * 3600,
+    # 图片信息
+    "images": 30 * 24 * 3600,
+    # 搜索
+    "search": 24 * 3600,
+    # 其它（榜单、推荐等）
+    "default": 6 * 3600
+}
+# HTTP响应磁盘缓存的最大容量（字节）
+HTTP_CACHE_MAX_SIZE = 256 * 1024 * 1024
+# 图片缓存磁盘最大容量（字节）
+IMAGE_CACHE_MAX_SIZE = 512 * 1024 * 1024
+# 图片缓存内存最大容量（字节）
+IMAGE_CACHE_MEMORY_SIZE = 32 * 1024 * 1024
+# 图片缩略图可选宽度，请求的宽度向上取整到其中之一
+IMAGE_CACHE_THUMB_WIDTHS = [200, 300, 500, 780]
 # 定时刷新壁纸的间隔（小时）
 REFRESH_WALLPAPER_INTERVAL = 1
 # fanart的api，用于拉取封面图片
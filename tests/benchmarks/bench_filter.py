@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+过滤规则匹配基准测试，对比逐条编译正则与预编译规则组
+运行：NASTOOL_CONFIG=/path/to/config.yaml python -m tests.benchmarks.bench_filter
+"""
+import random
+import re
+import time
+
+from app.filter import RuleGroupMatcher
+from app.media.meta import MetaBase
+from app.utils import StringUtils
+from app.utils.types import MediaType
+
+CORPUS_SIZE = 10000
+
+# 与 scripts/sqls/init_filter.sql 中默认规则组结构相同的规则
+EXCLUDE = r"Blu-?Ray.+VC-?1|Blu-?Ray.+AVC|UHD.+blu-?ray.+HEVC|\Wsdr\W|minibd|[\W_]diy[\W_]|[\W_]3d[\W_]|REMUX"
+CHINESE = r"[中国國繁简](/|\s|\\|\|)?[繁简英粤]|[英简繁](/|\s|\\|\|)?[中繁简]|繁體|简体|[中国國][字配]|国语|國語|中文"
+RULES = [
+    {"pri": 1, "include": ["特效", "1080[pi]", "blu-?ray", "[Hx].?26[45]"], "exclude": [EXCLUDE], "size": "1,30"},
+    {"pri": 2, "include": [CHINESE, "1080[pi]", "blu-?ray", "[Hx].?26[45]"], "exclude": [EXCLUDE], "size": "1,30"},
+    {"pri": 3, "include": ["特效", "4k|2160p", "blu-?ray", "[Hx].?26[45]"], "exclude": [EXCLUDE], "size": "1,30"},
+    {"pri": 4, "include": [CHINESE, "4k|2160p", "blu-?ray", "[Hx].?26[45]"], "exclude": [EXCLUDE], "size": "1,30"},
+    {"pri": 5, "include": ["特效", "720p", "blu-?ray", "[Hx].?26[45]"], "exclude": [EXCLUDE], "size": "30"},
+    {"pri": 6, "include": ["1080[pi]", "blu-?ray"], "exclude": [EXCLUDE], "size": "30"},
+    {"pri": 7, "include": ["4k|2160p"], "exclude": [EXCLUDE], "size": "30", "free": "1.0 0.0"},
+    {"pri": 8, "include": ["1080[pi]"], "exclude": [EXCLUDE], "size": "30"},
+    {"pri": 9, "include": ["720p"], "exclude": [EXCLUDE], "size": "30"},
+]
+GROUP = {"id": 1, "name": "benchmark"}
+
+PARTS = [
+    ["Dune", "The.Bear", "流浪地球", "Oppenheimer", "Frieren", "Severance"],
+    ["2021", "2023", "S01E02", "S02", "S03E01-E08"],
+    ["1080p", "2160p", "720p", "4K"],
+    ["BluRay", "WEB-DL", "UHD.BluRay", "BluRay.REMUX", "HDTV"],
+    ["x264", "H265", "HEVC", "AVC"],
+    ["DTS-HD.MA", "特效", "中字", "国语", "DIY", "DDP5.1"],
+    ["-CMCT", "-FRDS", "-HHWEB", ""],
+]
+
+
+def legacy_get_rules(rows):
+    """
+    旧版每次匹配都从数据库记录重新生成规则列表
+    """
+    return [{
+        "pri": row.get("pri"),
+        "include": "\n".join(row.get("include")).split("\n"),
+        "exclude": "\n".join(row.get("exclude")).split("\n"),
+        "size": row.get("size"),
+        "free": row.get("free")
+    } for row in rows]
+
+
+def legacy_check_rules(meta_info, rows, group):
+    """
+    旧版逐条编译正则的匹配逻辑
+    """
+    filters = legacy_get_rules(rows)
+    title = meta_info.rev_string
+    order_seq = 0
+    group_match = True
+    for filter_info in filters:
+        rule_match = True
+        order_seq = 100 - int(filter_info.get('pri'))
+        for include in filter_info.get('include') or []:
+            if include and not re.search(r'%s' % include.strip(), title, re.IGNORECASE):
+                rule_match = False
+                break
+        excludes = filter_info.get('exclude')
+        if excludes and rule_match:
+            exclude_flag = False
+            for exclude in excludes:
+                if not re.search(r'%s' % exclude.strip(), title, re.IGNORECASE):
+                    exclude_flag = True
+            if not exclude_flag:
+                rule_match = False
+        sizes = filter_info.get('size')
+        if sizes and rule_match and meta_info.size:
+            meta_info.size = StringUtils.num_filesize(meta_info.size)
+            if sizes.find(',') != -1:
+                sizes = sizes.split(',')
+                begin_size = int(sizes[0]) if sizes[0].isdigit() else 0
+                end_size = int(sizes[1]) if sizes[1].isdigit() else 0
+            else:
+                begin_size = 0
+                end_size = int(sizes) if sizes.isdigit() else 0
+            if not begin_size * 1024 ** 3 <= int(meta_info.size) <= end_size * 1024 ** 3:
+                rule_match = False
+        free = filter_info.get("free")
+        if free and meta_info.upload_volume_factor is not None and meta_info.download_volume_factor is not None:
+            ul_factor, dl_factor = free.split()
+            if float(ul_factor) > meta_info.upload_volume_factor \
+                    or float(dl_factor) < meta_info.download_volume_factor:
+                rule_match = False
+        if rule_match:
+            return True, order_seq, group.get("name")
+        group_match = False
+    if not group_match:
+        return False, 0, group.get("name")
+    return True, order_seq, group.get("name")
+
+
+def make_corpus():
+    random.seed(0)
+    corpus = []
+    for _ in range(CORPUS_SIZE):
+        title = ".".join(random.choice(part) for part in PARTS)
+        meta_info = MetaBase(title)
+        meta_info.rev_string = title
+        meta_info.type = MediaType.MOVIE
+        meta_info.size = random.choice([2 * 1024 ** 3, 15 * 1024 ** 3, 45 * 1024 ** 3])
+        meta_info.upload_volume_factor = random.choice([None, 1.0, 2.0])
+        meta_info.download_volume_factor = random.choice([None, 0.0, 1.0])
+        corpus.append(meta_info)
+    return corpus
+
+
+def main():
+    corpus = make_corpus()
+    matcher = RuleGroupMatcher(group=GROUP, rules=RULES)
+
+    start = time.perf_counter()
+    legacy = [legacy_check_rules(meta_info, RULES, GROUP) for meta_info in corpus]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    current = [matcher.match(meta_info, meta_info.rev_string) for meta_info in corpus]
+    current_time = time.perf_counter() - start
+
+    assert legacy == current, "匹配结果不一致"
+    print("corpus: %s titles, %s rules" % (CORPUS_SIZE, len(RULES)))
+    print("legacy:   %.3fs" % legacy_time)
+    print("compiled: %.3fs (%.1fx)" % (current_time, legacy_time / current_time))
+
+
+if __name__ == '__main__':
+    main()
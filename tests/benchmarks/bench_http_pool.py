@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+RequestUtils 连接复用基准测试，对比每个实例独立建立连接池与进程内共享连接池
+本地服务器对每个新连接延迟若干毫秒，模拟TCP及TLS握手的开销
+运行：NASTOOL_CONFIG=/path/to/config.yaml python -m tests.benchmarks.bench_http_pool
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.utils import RequestUtils
+from app.utils.http_utils import PooledAdapter
+
+HANDSHAKE_DELAY = 0.02
+REQUESTS = 200
+THREADS = [1, 8]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体一起发送，避免keep-alive连接上的延迟确认
+    wbufsize = 64 * 1024
+
+    def setup(self):
+        time.sleep(HANDSHAKE_DELAY)
+        super().setup()
+
+    def do_GET(self):
+        body = b"<rss><channel><item><title>ok</title></item></channel></rss>"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def legacy_get(url):
+    """
+    旧版逻辑：每个实例新建会话并挂载新的连接池
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0.5,
+                                            status_forcelist=(429, 500, 502, 503, 504)))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session.get(url, timeout=(5, 20))
+
+
+def current_get(url):
+    return RequestUtils().get_res(url)
+
+
+def run(func, url, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(func, [url] * REQUESTS))
+    elapsed = time.perf_counter() - start
+    assert all(res is not None and res.status_code == 200 for res in results)
+    return elapsed / REQUESTS * 1000
+
+
+def main():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%s/rss" % server.server_address[1]
+    try:
+        print("%-8s %16s %16s" % ("threads", "legacy ms/req", "current ms/req"))
+        for threads in THREADS:
+            PooledAdapter.clear()
+            legacy = run(legacy_get, url, threads)
+            current = run(current_get, url, threads)
+            print("%-8s %16.2f %16.2f" % (threads, legacy, current))
+        print("pool stats: %s" % RequestUtils.get_pool_stats())
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+MetaHelper 并发读取基准测试
+运行：NASTOOL_CONFIG=/path/to/config.yaml python -m tests.benchmarks.bench_meta_helper
+"""
+import time
+from threading import Thread
+
+from app.helper.meta_helper import MetaHelper, lock, CACHE_EXPIRE_TIMESTAMP_STR, EXPIRE_TIMESTAMP
+from app.utils.types import MediaType
+
+KEY_COUNT = 5000
+LOOKUPS_PER_THREAD = 50000
+THREAD_COUNTS = [1, 2, 4, 8, 16]
+
+
+def legacy_get(helper, key):
+    """
+    旧版读取逻辑：每次命中都加全局锁并刷新过期时间
+    """
+    with lock:
+        info = helper._meta_data.get(key)
+        if info:
+            expire = info.get(CACHE_EXPIRE_TIMESTAMP_STR)
+            if not expire or int(time.time()) < expire:
+                info[CACHE_EXPIRE_TIMESTAMP_STR] = int(time.time()) + EXPIRE_TIMESTAMP
+                helper.update_meta_data({key: info})
+        return info or {}
+
+
+def run(func, keys, threads):
+    def worker(offset):
+        for i in range(LOOKUPS_PER_THREAD):
+            func(keys[(offset + i) % len(keys)])
+
+    workers = [Thread(target=worker, args=(i * 7,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return threads * LOOKUPS_PER_THREAD / elapsed
+
+
+def main():
+    helper = MetaHelper()
+    keys = ["[电影]Benchmark %s-2020-None" % i for i in range(KEY_COUNT)]
+    helper.update_meta_data({key: {"id": i + 1,
+                                   "type": MediaType.MOVIE,
+                                   "title": key,
+                                   "year": "2020"} for i, key in enumerate(keys)})
+    try:
+        print("%-8s %16s %16s" % ("threads", "legacy ops/s", "current ops/s"))
+        for threads in THREAD_COUNTS:
+            legacy = run(lambda k: legacy_get(helper, k), keys, threads)
+            current = run(helper.get_meta_data_by_key, keys, threads)
+            print("%-8s %16.0f %16.0f" % (threads, legacy, current))
+    finally:
+        for key in keys:
+            helper.delete_meta_data(key)
+
+
+if __name__ == '__main__':
+    main()
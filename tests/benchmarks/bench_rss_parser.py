@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+RSS解析基准测试，对比 minidom 整体解析与增量解析
+运行：NASTOOL_CONFIG=/path/to/config.yaml python -m tests.benchmarks.bench_rss_parser
+"""
+import time
+import tracemalloc
+import xml.dom.minidom
+from xml.sax.saxutils import escape
+
+from app.helper.rss_helper import RssHelper, RSS_CHUNK_SIZE
+from app.utils import DomUtils, StringUtils
+
+ITEM_COUNTS = [100, 500, 2000]
+ROUNDS = 5
+
+
+def make_feed(count):
+    """
+    生成与PT站点格式相同的RSS
+    """
+    items = []
+    for i in range(count):
+        title = "[%s] The.Show.S01E%02d.2160p.WEB-DL.H265.DDP5.1-TEAM [剧集 第%s集 & 特效字幕]" % (i, i % 99, i)
+        items.append("<item>"
+                     "<title><![CDATA[%s]]></title>"
+                     "<link>https://pt.example.org/details.php?id=%s</link>"
+                     "<description>%s</description>"
+                     "<author>anonymous</author>"
+                     "<category domain=\"https://pt.example.org/?cat=402\">TV Series</category>"
+                     "<enclosure url=\"https://pt.example.org/download.php?id=%s&amp;passkey=abc\" "
+                     "length=\"%s\" type=\"application/x-bittorrent\" />"
+                     "<guid isPermaLink=\"false\">%s</guid>"
+                     "<pubDate>Mon, 02 Jan 2023 15:04:05 +0800</pubDate>"
+                     "</item>" % (title, i, escape("<p>简介 %s</p>" % title) * 5, i, i * 1024 ** 2, i))
+    return ("<?xml version=\"1.0\" encoding=\"utf-8\"?>"
+            "<rss version=\"2.0\" xmlns:dc=\"http://purl.org/dc/elements/1.1/\"><channel>"
+            "<title>Example Torrents</title><link>https://pt.example.org</link>"
+            "%s</channel></rss>" % "".join(items)).encode("utf-8")
+
+
+def legacy_parse(content):
+    """
+    旧版解析逻辑：整体解码后构建完整DOM树
+    """
+    ret_array = []
+    dom_tree = xml.dom.minidom.parseString(content.decode("utf-8"))
+    for item in dom_tree.documentElement.getElementsByTagName("item"):
+        title = DomUtils.tag_value(item, "title", default="")
+        if not title:
+            continue
+        description = DomUtils.tag_value(item, "description", default="")
+        link = DomUtils.tag_value(item, "link", default="")
+        enclosure = DomUtils.tag_value(item, "enclosure", "url", default="")
+        if not enclosure and not link:
+            continue
+        if not enclosure and link:
+            enclosure = link
+            link = None
+        size = DomUtils.tag_value(item, "enclosure", "length", default=0)
+        if size and str(size).isdigit():
+            size = int(size)
+        else:
+            size = 0
+        pubdate = DomUtils.tag_value(item, "pubDate", default="")
+        if pubdate:
+            pubdate = StringUtils.get_time_stamp(pubdate)
+        ret_array.append({'title': title,
+                          'enclosure': enclosure,
+                          'size': size,
+                          'description': description,
+                          'link': link,
+                          'pubdate': pubdate})
+    return ret_array
+
+
+def stream_parse(content):
+    chunks = (content[i:i + RSS_CHUNK_SIZE] for i in range(0, len(content), RSS_CHUNK_SIZE))
+    return list(RssHelper.iter_rssxml_items(chunks))
+
+
+def measure(func, content):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = func(content)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    tracemalloc.start()
+    func(content)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    print("%-6s %10s %14s %14s %14s %14s" % ("items", "size", "legacy", "stream",
+                                            "legacy peak", "stream peak"))
+    for count in ITEM_COUNTS:
+        content = make_feed(count)
+        legacy, legacy_time, legacy_peak = measure(legacy_parse, content)
+        current, current_time, current_peak = measure(stream_parse, content)
+        assert legacy == current, "解析结果不一致"
+        print("%-6s %9.1fK %12.1fms %12.1fms %13.1fM %13.1fM" % (
+            count, len(content) / 1024, legacy_time * 1000, current_time * 1000,
+            legacy_peak / 1024 ** 2, current_peak / 1024 ** 2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+站点种子列表解析基准测试，对比逐行 PyQuery 解析与编译选择器解析
+使用 fixtures 中保存的 NexusPHP 种子列表页面及 user.sites.bin 中的站点配置，两种解析结果必须一致
+运行：NASTOOL_CONFIG=/path/to/config.yaml python -m tests.benchmarks.bench_spider_parse
+"""
+import base64
+import copy
+import json
+import os
+import re
+import time
+
+from pyquery import PyQuery
+
+import log
+from app.indexer.client._spider import TorrentSpider, ALL_SITES_FREE_PATTERN
+from app.indexer.indexerConf import IndexerConf
+from config import Config
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "nexusphp_torrents.html")
+SITES = ["pthome", "hdfans", "audiences", "putao", "haitang", "beitai"]
+ROUNDS = 20
+
+
+class Response(object):
+
+    def __init__(self, text):
+        self.text = text
+
+    def extract(self):
+        return self.text
+
+
+def load_indexers():
+    """
+    读取内置站点配置
+    """
+    with open(Config().get_user_sites_bin_path(), "rb") as f:
+        user_sites = json.loads(base64.b64decode(f.read()).decode("utf-8"))
+    return [IndexerConf(datas=data, ua=Config().get_ua())
+            for data in user_sites.get("indexer", []) if data.get("id") in SITES]
+
+
+def legacy_parse(spider, html_text):
+    """
+    旧版逻辑：整页正则替换，每行构造 PyQuery 对象，每个选择器即时转换为XPath，结果逐行深复制
+    """
+    html_text = re.sub(ALL_SITES_FREE_PATTERN, '', html_text)
+    html_doc = PyQuery(html_text)
+    torrents = []
+    for torn in html_doc(spider.list.get('selector', '')):
+        torrents.append(copy.deepcopy(spider.Getinfo(PyQuery(torn))))
+        if len(torrents) >= int(spider.result_num):
+            break
+    return torrents
+
+
+def current_parse(spider, html_text):
+    spider.torrents_info_array = []
+    spider.parse(None, Response(html_text))
+    return spider.torrents_info_array
+
+
+def run(func, spider, html_text):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        torrents = func(spider, html_text)
+    return (time.perf_counter() - start) / ROUNDS * 1000, torrents
+
+
+def main():
+    # 部分站点的列与样例页面不一致，屏蔽字段转换的错误日志
+    log.error = lambda *args, **kwargs: None
+    with open(FIXTURE, encoding="utf-8") as f:
+        html_text = f.read()
+    spider = TorrentSpider()
+    print("%-10s %6s %16s %16s" % ("site", "rows", "legacy ms/page", "current ms/page"))
+    for indexer in load_indexers():
+        spider.setparam(indexer=indexer)
+        legacy, legacy_torrents = run(legacy_parse, spider, html_text)
+        current, current_torrents = run(current_parse, spider, html_text)
+        assert legacy_torrents == current_torrents, indexer.id
+        print("%-10s %6s %16.2f %16.2f" % (indexer.id, len(current_torrents), legacy, current))
+
+
+if __name__ == '__main__':
+    main()
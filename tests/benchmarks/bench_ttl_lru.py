@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+ttl_lru 缓存装饰器基准测试，对比每次访问全表清理过期条目的旧实现
+运行：python -m tests.benchmarks.bench_ttl_lru
+"""
+import collections
+import functools
+import time
+from threading import Thread
+
+from app.utils.commons import ttl_lru
+
+MAXSIZES = [128, 1024, 4096]
+LOOKUPS = 200000
+THREADS = 8
+
+
+def legacy_ttl_lru(seconds=60, maxsize=128, typed=False):
+    """
+    旧版实现：每次访问前遍历全部条目删除过期项
+    """
+    cache = collections.OrderedDict()
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            current_time = time.time()
+            for key, (value, expiration_time) in list(cache.items()):
+                if expiration_time < current_time:
+                    cache.pop(key)
+            key = functools._make_key(args, kwargs, typed)
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key][0]
+            result = func(*args, **kwargs)
+            cache[key] = (result, time.time() + seconds)
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def check_behaviour():
+    calls = []
+
+    @ttl_lru(seconds=0.2, maxsize=2)
+    def double(x):
+        calls.append(x)
+        return x * 2
+
+    assert [double(1), double(2), double(1)] == [2, 4, 2] and calls == [1, 2]
+    # 超出容量淘汰最久未访问的条目
+    double(3)
+    double(2)
+    assert calls == [1, 2, 3, 2]
+    # 过期后重新调用
+    time.sleep(0.25)
+    double(3)
+    assert calls == [1, 2, 3, 2, 3]
+    info = double.cache_info()
+    assert info.hits == 1 and info.misses == 5 and info.currsize <= 2, info
+
+
+def run(func, keys, threads):
+    def worker(offset):
+        for i in range(LOOKUPS // threads):
+            func(keys[(offset + i) % len(keys)])
+
+    workers = [Thread(target=worker, args=(i * 13,)) for i in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return LOOKUPS / (time.perf_counter() - start)
+
+
+def main():
+    check_behaviour()
+    print("%-8s %-8s %16s %16s" % ("maxsize", "threads", "legacy ops/s", "current ops/s"))
+    for maxsize in MAXSIZES:
+        keys = ["https://api.themoviedb.org/3/movie/%s" % i for i in range(maxsize)]
+        for threads in [1, THREADS]:
+            legacy = legacy_ttl_lru(seconds=3600, maxsize=maxsize)(lambda url: url)
+            current = ttl_lru(seconds=3600, maxsize=maxsize)(lambda url: url)
+            print("%-8s %-8s %16.0f %16.0f" % (maxsize, threads,
+                                               run(legacy, keys, threads),
+                                               run(current, keys, threads)))
+        print("%-8s cache_info: %s" % (maxsize, current.cache_info()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+from unittest import TestCase
+
+from app.helper import DbHelper
+from web.backend.web_utils import WebUtils
+
+
+class CursorTest(TestCase):
+    @staticmethod
+    def _cursor(keys):
+        return base64.urlsafe_b64encode(json.dumps(keys).encode("utf-8")).decode("utf-8")
+
+    def test_decode_cursor(self):
+        cursor = WebUtils.encode_cursor("2024-01-01 00:00:00", 3)
+        self.assertEqual(WebUtils.decode_cursor(cursor, str, int), ("2024-01-01 00:00:00", 3))
+        self.assertEqual(WebUtils.decode_cursor(WebUtils.encode_cursor(3), int), (3,))
+        self.assertEqual(WebUtils.decode_cursor(self._cursor(["3"]), int), (3,))
+
+    def test_decode_bad_cursor(self):
+        bad_cursors = [
+            None,
+            "",
+            "not base64 !",
+            base64.urlsafe_b64encode(b"not json").decode("utf-8"),
+            self._cursor({"DATE": "2024-01-01"}),
+            self._cursor([]),
+            self._cursor(["2024-01-01 00:00:00"]),
+            self._cursor(["x", "y"]),
+            self._cursor(["2024-01-01 00:00:00", None]),
+            self._cursor(["2024-01-01 00:00:00", [3]]),
+            self._cursor(["2024-01-01 00:00:00", 3, 4]),
+        ]
+        for cursor in bad_cursors:
+            self.assertIsNone(WebUtils.decode_cursor(cursor, str, int), cursor)
+        self.assertIsNone(WebUtils.decode_cursor(self._cursor(["x"]), int))
+        self.assertIsNone(WebUtils.decode_cursor(self._cursor([1, 2]), int))
+
+    def test_paging_with_bad_cursor(self):
+        """
+        无效游标按第一页查询，不应抛出异常
+        """
+        dbhelper = DbHelper()
+        bad_cursors = [self._cursor(["2024-01-01 00:00:00"]), self._cursor(["x", "y"]), "not base64 !"]
+        for cursor in bad_cursors:
+            after = WebUtils.decode_cursor(cursor, str, int)
+            self.assertEqual(dbhelper.get_transfer_history(None, 1, 30, after=after),
+                             dbhelper.get_transfer_history(None, 1, 30))
+            self.assertEqual(dbhelper.get_download_history(num=30, after=after),
+                             dbhelper.get_download_history(num=30))
+            after = WebUtils.decode_cursor(cursor, int)
+            self.assertEqual(dbhelper.get_transfer_unknown_paths_by_page(None, 1, 30, after=after),
+                             dbhelper.get_transfer_unknown_paths_by_page(None, 1, 30))
+
+    def test_plugin_history_keyset(self):
+        """
+        按游标逐页查询插件运行记录，不重复不遗漏
+        """
+        dbhelper = DbHelper()
+        plugin_id = "CursorTest"
+        keys = ["k%s" % i for i in range(5)]
+        for key in keys:
+            dbhelper.insert_plugin_history(plugin_id=plugin_id, key=key, value="{}")
+        try:
+            paged_keys = []
+            after = None
+            while True:
+                historys = dbhelper.get_plugin_history(plugin_id=plugin_id, key=None, num=2, after=after)
+                paged_keys += [history.KEY for history in historys]
+                if len(historys) < 2:
+                    break
+                after = WebUtils.decode_cursor(WebUtils.encode_cursor(historys[-1].DATE, historys[-1].ID), str, int)
+            self.assertEqual(paged_keys, list(reversed(keys)))
+        finally:
+            for key in keys:
+                dbhelper.delete_plugin_history(plugin_id=plugin_id, key=key)
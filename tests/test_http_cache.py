@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import requests
+
+from app.helper import HttpCacheHelper
+from app.media.tmdbv3api.tmdb import TMDb
+
+
+class HttpCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.http_cache = HttpCacheHelper()
+        self._state = (self.http_cache._enabled, self.http_cache._db, self.http_cache._total_size)
+        self.http_cache._enabled = True
+        self.http_cache._db = self.http_cache._HttpCacheHelper__init_db(
+            os.path.join(self.tmpdir.name, "http_cache.db"))
+        self.http_cache._total_size = 0
+        TMDb.ttl_cached_request.cache_clear()
+
+    def tearDown(self) -> None:
+        TMDb.ttl_cached_request.cache_clear()
+        self.http_cache._db.close()
+        self.http_cache._enabled, self.http_cache._db, self.http_cache._total_size = self._state
+        self.tmpdir.cleanup()
+
+    @staticmethod
+    def _response(content):
+        res = requests.Response()
+        res.status_code = 200
+        res._content = content
+        res.headers["Content-Type"] = "application/json"
+        return res
+
+    def test_tmdb_request_miss_then_hit(self):
+        url = "https://api.themoviedb.org/3/movie/550?api_key=xxx&language=zh"
+        with mock.patch("app.media.tmdbv3api.tmdb.requests.request",
+                        return_value=self._response(b'{"id": 550}')) as request:
+            # 未命中：请求接口并写入磁盘缓存
+            res = TMDb.ttl_cached_request("GET", url, None, "None")
+            self.assertEqual(res.json(), {"id": 550})
+            self.assertEqual(request.call_count, 1)
+            # 清空内存缓存后从磁盘缓存命中，不再请求
+            TMDb.ttl_cached_request.cache_clear()
+            res = TMDb.ttl_cached_request("GET", url, None, "None")
+            self.assertEqual(res.json(), {"id": 550})
+            self.assertEqual(res.headers.get("Content-Type"), "application/json")
+            self.assertEqual(request.call_count, 1)
+        self.assertEqual(self.http_cache.get_cache_info()[0], 1)
+
+    def test_url_category(self):
+        category = HttpCacheHelper().get_url_category
+        self.assertEqual(category("https://api.themoviedb.org/3/movie/550"), "details")
+        self.assertEqual(category("https://api.themoviedb.org/3/tv/1399/credits"), "details")
+        self.assertEqual(category("https://api.themoviedb.org/3/find/tt0137523"), "details")
+        self.assertEqual(category("https://frodo.douban.com/api/v2/movie/1292052"), "details")
+        self.assertEqual(category("https://api.themoviedb.org/3/search/movie"), "search")
+        self.assertEqual(category("https://api.themoviedb.org/3/tv/1399/season/1"), "seasons")
+        for path in ["movie/popular", "movie/now_playing", "movie/upcoming", "tv/on_the_air", "tv/airing_today"]:
+            self.assertEqual(category("https://api.themoviedb.org/3/%s" % path), "default", path)
+        for path in ["movie/rank_list", "tv/recommend", "movie/tag"]:
+            self.assertEqual(category("https://frodo.douban.com/api/v2/%s" % path), "default", path)
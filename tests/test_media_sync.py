@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase
+
+from app.db import MediaDb, MediaSyncWriter
+from app.db.models import MEDIASYNCITEMS
+
+
+class MediaSyncTest(TestCase):
+    server_type = "unittest"
+
+    def setUp(self) -> None:
+        self.mediadb = MediaDb()
+        self.mediadb.init_db()
+        self.mediadb.empty(server_type=self.server_type)
+
+    def tearDown(self) -> None:
+        self.mediadb.empty(server_type=self.server_type)
+
+    def _sync(self, item_ids, batch_size=500):
+        writer = MediaSyncWriter(server_type=self.server_type, batch_size=batch_size)
+        for item_id in item_ids:
+            writer.add(iteminfo={"id": item_id, "title": "title %s" % item_id}, seasoninfo=[])
+        writer.finish()
+
+    def _item_ids(self):
+        return sorted(row.ITEM_ID for row in self.mediadb.session.query(MEDIASYNCITEMS).filter(
+            MEDIASYNCITEMS.SERVER == self.server_type))
+
+    def test_resync_unchanged(self):
+        self._sync(["1", "2", "3"])
+        self._sync(["1", "2", "3"])
+        self.assertEqual(self._item_ids(), ["1", "2", "3"])
+
+    def test_resync_small_batches_reversed(self):
+        self._sync(["1", "2", "3"], batch_size=2)
+        self._sync(["3", "2", "1"], batch_size=2)
+        self.assertEqual(self._item_ids(), ["1", "2", "3"])
+
+    def test_resync_removes_stale(self):
+        self._sync(["1", "2", "3"])
+        self._sync(["2", "4"], batch_size=1)
+        self.assertEqual(self._item_ids(), ["2", "4"])
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from unittest import TestCase, mock
+
+from app.helper import MetaHelper
+
+
+class MetaCacheTest(TestCase):
+    def setUp(self) -> None:
+        self.meta = MetaHelper()
+        self.meta.clear_meta_data()
+
+    def tearDown(self) -> None:
+        self.meta.clear_meta_data()
+
+    def test_evict_after_save(self):
+        with mock.patch("app.helper.meta_helper.META_CACHE_MEMORY_SIZE", 3):
+            self.meta.update_meta_data({"k%s" % i: {"id": i + 1, "title": "t%s" % i} for i in range(5)})
+            self.meta.update_meta_data({"unknown": {"id": 0}})
+            # 未落盘的条目不淘汰
+            self.assertEqual(len(self.meta._meta_data), 6)
+            self.meta.save_meta_data()
+            self.assertEqual(len(self.meta._meta_data), 3)
+            self.assertEqual(list(self.meta._meta_data), ["k3", "k4", "unknown"])
+            self.assertEqual(set(self.meta._tmdbid_index), {"4", "5"})
+            self.assertEqual(self.meta._unknown_keys, {"unknown"})
+            # 被淘汰的条目从数据库重新加载
+            self.assertEqual(self.meta.get_meta_data_by_key("k0").get("title"), "t0")
+            self.assertEqual(len(self.meta._meta_data), 3)
+            self.assertNotIn("k3", self.meta._meta_data)
+            self.assertEqual(self.meta._tmdbid_index.get("1"), {"k0"})
@@ -2,7 +2,8 @@
 
 from unittest import TestCase
 
-from app.media.meta import MetaInfo
+from app.helper import WordsHelper
+from app.media.meta import MetaInfo, get_metainfo_cache_stats
 from tests.cases.meta_cases import meta_cases
 
 
@@ -32,3 +33,17 @@ class MetaInfoTest(TestCase):
                 "audio_codec": meta_info.audio_encode or ""
             }
             self.assertEqual(target, info.get("target"))
+
+    def test_metainfo_cache(self):
+        title = "The.Long.Season.2017.2160p.WEB-DL.H265.AAC-XXX"
+        first = MetaInfo(title=title)
+        first.cn_name = "已修改"
+        second = MetaInfo(title=title)
+        self.assertIsNot(first, second)
+        self.assertNotEqual(second.cn_name, "已修改")
+        self.assertEqual(second.org_string, title)
+        # 识别词变化后重新识别
+        misses = get_metainfo_cache_stats().get("misses")
+        WordsHelper().init_config()
+        MetaInfo(title=title)
+        self.assertEqual(get_metainfo_cache_stats().get("misses"), misses + 1)
@@ -28,7 +28,7 @@ from app.filetransfer import FileTransfer
 from app.filter import Filter
 from app.helper import DbHelper, ProgressHelper, ThreadHelper, \
     MetaHelper, DisplayHelper, WordsHelper
-from app.helper import RssHelper, PluginHelper, ChromeHelper
+from app.helper import RssHelper, PluginHelper, ChromeHelper, HttpCacheHelper
 from app.indexer import Indexer
 from app.media import Category, Media, Bangumi, DouBan, Scraper
 from app.media.meta import MetaInfo, MetaBase
@@ -247,6 +247,7 @@ class WebAction:
             "get_plugin_apps": self.get_plugin_apps,
             "get_plugin_page": self.get_plugin_page,
             "get_plugin_state": self.get_plugin_state,
+            "get_plugin_history": self.get_plugin_history,
             "get_plugins_conf": self.get_plugins_conf,
             "update_category_config": self.update_category_config,
             "get_category_config": self.get_category_config,
@@ -768,6 +769,7 @@ class WebAction:
         filters = data.get("filters")
         tmdbid = data.get("tmdbid")
         media_type = data.get("media_type")
+        search_key = data.get("search_key")
         if media_type:
             if media_type in MovieTypes:
                 media_type = MediaType.MOVIE
@@ -778,7 +780,8 @@ class WebAction:
                                                  ident_flag=ident_flag,
                                                  filters=filters,
                                                  tmdbid=tmdbid,
-                                                 media_type=media_type)
+                                                 media_type=media_type,
+                                                 search_key=search_key)
             if ret != 0:
                 return {"code": ret, "msg": ret_msg}
         return {"code": 0}
@@ -2733,10 +2736,14 @@ class WebAction:
 
     @staticmethod
     def get_downloaded(data):
-        page = data.get("page")
-        Items = Downloader().get_download_history(page=page)
+        page = data.get("page") or 1
+        num = 30
+        # 传入cursor时按游标分页
+        Items = Downloader().get_download_history(num=num, page=page,
+                                                  after=WebUtils.decode_cursor(data.get("cursor"), str, int))
         if Items:
-            return {"code": 0, "Items": [{
+            Cursor = WebUtils.encode_cursor(Items[-1].DATE, Items[-1].ID) if len(Items) >= num else ""
+            return {"code": 0, "cursor": Cursor, "Items": [{
                 'id': item.TMDBID,
                 'orgid': item.TMDBID,
                 'tmdbid': item.TMDBID,
@@ -2751,7 +2758,7 @@ class WebAction:
                 "site": item.SITE
             } for item in Items]}
         else:
-            return {"code": 0, "Items": []}
+            return {"code": 0, "cursor": "", "Items": []}
 
     @staticmethod
     def parse_brush_rule_string(rules: dict):
@@ -2860,7 +2867,7 @@ class WebAction:
         """
         try:
             MetaHelper().clear_meta_data()
-            os.remove(MetaHelper().get_meta_data_path())
+            HttpCacheHelper().clear()
         except Exception as e:
             ExceptionUtils.exception_traceback(e)
             return {"code": 0, "msg": str(e)}
@@ -4139,7 +4146,11 @@ class WebAction:
             CurrentPage = 1
         else:
             CurrentPage = int(CurrentPage)
-        totalCount, historys = FileTransfer().get_transfer_history(SearchStr, CurrentPage, PageNum)
+        # 传入cursor时按游标分页，深页与第一页开销相同
+        After = WebUtils.decode_cursor(data.get("cursor"), str, int)
+        totalCount, historys = FileTransfer().get_transfer_history(SearchStr, CurrentPage, PageNum, after=After)
+        Cursor = WebUtils.encode_cursor(historys[-1].DATE, historys[-1].ID) \
+            if len(historys) >= int(PageNum) else ""
         historys_list = []
         for history in historys:
             history = history.as_dict()
@@ -4159,7 +4170,8 @@ class WebAction:
             "result": historys_list,
             "totalPage": TotalPage,
             "pageNum": PageNum,
-            "currentPage": CurrentPage
+            "currentPage": CurrentPage,
+            "cursor": Cursor
         }
 
     @staticmethod
@@ -4282,8 +4294,11 @@ class WebAction:
             CurrentPage = 1
         else:
             CurrentPage = int(CurrentPage)
+        # 传入cursor时按游标分页
+        After = WebUtils.decode_cursor(data.get("cursor"), int)
         totalCount, Records = FileTransfer().get_transfer_unknown_paths_by_page(
-            SearchStr, CurrentPage, PageNum)
+            SearchStr, CurrentPage, PageNum, after=After)
+        Cursor = WebUtils.encode_cursor(Records[-1].ID) if len(Records) >= int(PageNum) else ""
         Items = []
         for rec in Records:
             if not rec.PATH:
@@ -4309,7 +4324,8 @@ class WebAction:
             "items": Items,
             "totalPage": TotalPage,
             "pageNum": PageNum,
-            "currentPage": CurrentPage
+            "currentPage": CurrentPage,
+            "cursor": Cursor
         }
 
     @staticmethod
@@ -5673,6 +5689,34 @@ class WebAction:
         state = PluginManager().get_plugin_state(plugin_id)
         return {"code": 0, "state": state}
 
+    @staticmethod
+    def get_plugin_history(data):
+        """
+        按游标分页查询插件运行记录
+        """
+        plugin_id = data.get("id")
+        if not plugin_id:
+            return {"code": 1, "msg": "参数错误"}
+        num = int(data.get("num") or 30)
+        historys = DbHelper().get_plugin_history(plugin_id=plugin_id,
+                                                 key=None,
+                                                 num=num,
+                                                 after=WebUtils.decode_cursor(data.get("cursor"), str, int))
+        Cursor = WebUtils.encode_cursor(historys[-1].DATE, historys[-1].ID) if len(historys) >= num else ""
+        Items = []
+        for history in historys:
+            try:
+                value = json.loads(history.VALUE)
+            except Exception:
+                value = history.VALUE
+            Items.append({
+                "id": history.ID,
+                "key": history.KEY,
+                "value": value,
+                "date": history.DATE
+            })
+        return {"code": 0, "cursor": Cursor, "Items": Items}
+
     @staticmethod
     def get_plugins_conf():
         Plugins = PluginManager().get_plugins_conf(current_user.level)
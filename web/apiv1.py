@@ -579,6 +579,7 @@ class DownloadRemove(ClientResource):
 class DownloadHistory(ClientResource):
     parser = reqparse.RequestParser()
     parser.add_argument('page', type=str, help='第几页', location='form', required=True)
+    parser.add_argument('cursor', type=str, help='游标，上次返回的cursor，传入时忽略页码', location='form')
 
     @download.doc(parser=parser)
     def post(self):
@@ -847,12 +848,29 @@ class TransferUnknownList(ClientResource):
         return WebAction().api_action(cmd='get_unknown_list')
 
 
+@organization.route('/unknown/page')
+class TransferUnknownPage(ClientResource):
+    parser = reqparse.RequestParser()
+    parser.add_argument('page', type=int, help='页码', location='form')
+    parser.add_argument('pagenum', type=int, help='每页条数', location='form', required=True)
+    parser.add_argument('keyword', type=str, help='过滤关键字', location='form')
+    parser.add_argument('cursor', type=str, help='游标，上次返回的cursor，传入时忽略页码', location='form')
+
+    @organization.doc(parser=parser)
+    def post(self):
+        """
+        分页查询未识别记录
+        """
+        return WebAction().api_action(cmd='get_unknown_list_by_page', data=self.parser.parse_args())
+
+
 @organization.route('/history/list')
 class TransferHistoryList(ClientResource):
     parser = reqparse.RequestParser()
     parser.add_argument('page', type=int, help='页码', location='form', required=True)
     parser.add_argument('pagenum', type=int, help='每页条数', location='form', required=True)
     parser.add_argument('keyword', type=str, help='过滤关键字', location='form')
+    parser.add_argument('cursor', type=str, help='游标，上次返回的cursor，传入时忽略页码', location='form')
 
     @organization.doc(parser=parser)
     def post(self):
@@ -2356,6 +2374,21 @@ class PluginApps(ClientResource):
         return WebAction().api_action(cmd='get_plugin_apps')
 
 
+@plugin.route('/history')
+class PluginHistory(ClientResource):
+    parser = reqparse.RequestParser()
+    parser.add_argument('id', type=str, help='插件ID', location='form', required=True)
+    parser.add_argument('num', type=int, help='每页条数', location='form')
+    parser.add_argument('cursor', type=str, help='游标，上次返回的cursor，为空时从最新的记录开始', location='form')
+
+    @plugin.doc(parser=parser)
+    def post(self):
+        """
+        按游标分页查询插件运行记录
+        """
+        return WebAction().api_action(cmd='get_plugin_history', data=self.parser.parse_args())
+
+
 @plugin.route('/list')
 class PluginList(ClientResource):
     @staticmethod
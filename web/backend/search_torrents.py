@@ -1,5 +1,7 @@
 import os.path
 import re
+import threading
+import time
 
 import log
 from app.downloader import Downloader
@@ -12,6 +14,7 @@ from app.searcher import Searcher
 from app.sites import Sites
 from app.subscribe import Subscribe
 from app.utils import StringUtils, Torrent
+from app.utils.commons import singleton
 from app.utils.types import SearchType, IndexerType, ProgressKey, RssType
 from config import Config
 from web.backend.web_utils import WebUtils
@@ -21,7 +24,85 @@ SEARCH_MEDIA_TYPE = {}
 SELECT_TYPE = {}
 PAGE_SIZE = 8
 
-def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None):
+
+@singleton
+class SearchResultStream(object):
+    """
+    WEB搜索结果的增量推送
+    每个站点搜索完成后推送一次 site 事件，搜索结束时推送 done 事件，页面据此逐步刷新搜索结果
+    """
+    # 当前搜索的标识，由页面生成，用于区分不同次搜索的事件
+    _search_key = None
+    # 搜索标识 -> 事件列表，只保留当前搜索的事件
+    _events = {}
+    _condition = None
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = {}
+
+    def init_config(self):
+        pass
+
+    def start(self, search_key):
+        """
+        开始新的搜索，丢弃之前搜索的事件
+        """
+        with self._condition:
+            self._search_key = search_key
+            self._events = {search_key: []}
+            self._condition.notify_all()
+
+    def push(self, search_key, event, **kwargs):
+        """
+        推送事件，不是当前搜索的事件直接丢弃
+        :param search_key: 搜索标识
+        :param event: 事件类型，site 或 done
+        """
+        with self._condition:
+            if search_key != self._search_key or search_key not in self._events:
+                return
+            self._events[search_key].append(dict(event=event, **kwargs))
+            self._condition.notify_all()
+
+    def listen(self, search_key, timeout=15, max_idle=600):
+        """
+        逐个返回指定搜索的事件，推送 done 事件后结束，搜索被新的搜索取代时也结束
+        :param search_key: 搜索标识，页面可能先于搜索开始订阅，此时等待搜索开始
+        :param timeout: 无事件时的等待时间，超时返回 None 用于保持连接
+        :param max_idle: 超过该时间没有新事件时结束
+        """
+        index = 0
+        started = False
+        last_time = time.time()
+        while time.time() - last_time < max_idle:
+            with self._condition:
+                events = self._events.get(search_key)
+                if events is None or index >= len(events):
+                    self._condition.wait(timeout=timeout)
+                    events = self._events.get(search_key)
+                if events is None:
+                    if started:
+                        # 已被新的搜索取代
+                        return
+                    events = []
+                else:
+                    started = True
+                    events = events[index:]
+            if not events:
+                yield None
+                continue
+            last_time = time.time()
+            for event in events:
+                index += 1
+                yield event
+                if event.get("event") == "done":
+                    with self._condition:
+                        self._events.pop(search_key, None)
+                    return
+
+
+def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, media_type=None, search_key=None):
     """
     WEB资源搜索
     :param content: 关键字文本，可以包括 类型、标题、季、集、年份等信息，使用 空格分隔，也支持种子的命名格式
@@ -29,8 +110,26 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     :param filters: 其它过滤条件
     :param tmdbid: TMDBID或DB:豆瓣ID
     :param media_type: 媒体类型，配合tmdbid传入
-    :return: 错误码，错误原因，成功时直接插入数据库
+    :param search_key: 页面生成的搜索标识，用于订阅增量结果
+    :return: 错误码，错误原因，每个站点搜索完成后即插入数据库
     """
+    _stream = SearchResultStream()
+    _stream.start(search_key)
+    ret, ret_msg = -1, "%s 搜索出错" % content
+    try:
+        ret, ret_msg = _search_medias_for_web(content=content,
+                                              ident_flag=ident_flag,
+                                              filters=filters,
+                                              tmdbid=tmdbid,
+                                              media_type=media_type,
+                                              stream=_stream,
+                                              search_key=search_key)
+        return ret, ret_msg
+    finally:
+        _stream.push(search_key, "done", code=ret, msg=ret_msg)
+
+
+def _search_medias_for_web(content, ident_flag, filters, tmdbid, media_type, stream, search_key=None):
     mtype, key_word, season_num, episode_num, year, content = StringUtils.get_keyword_from_string(content)
     if not key_word:
         log.info("【Web】%s 搜索关键字有误！" % content)
@@ -130,12 +229,40 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
     # 整合高级查询条件
     if filters:
         filter_args.update(filters)
+    # 清空缓存结果
+    _searcher.delete_all_search_torrents()
+    # 已入库的资源，不同站点或两次搜索返回的同一资源只保留一条
+    saved_keys = set()
+    lock = threading.Lock()
+
+    def __save_site_results(indexer, results):
+        """
+        站点搜索完成后立即入库并推送事件
+        """
+        with lock:
+            medias = []
+            for media in results:
+                key = media.enclosure or "%s%s" % (media.site, media.org_string)
+                if key in saved_keys:
+                    continue
+                saved_keys.add(key)
+                medias.append(media)
+            if medias:
+                medias = sorted(medias, key=lambda x: "%s%s%s" % (str(x.res_order).rjust(3, '0'),
+                                                                  str(x.site_order).rjust(3, '0'),
+                                                                  str(x.seeders).rjust(10, '0')), reverse=True)
+                _searcher.insert_search_results(media_items=medias,
+                                                ident_flag=ident_flag,
+                                                title=content)
+            stream.push(search_key, "site", site=indexer.name, count=len(medias), total=len(saved_keys))
+
     # 开始搜索
     log.info("【Web】开始搜索 %s ..." % content)
     media_list = _searcher.search_medias(key_word=first_search_name,
                                          filter_args=filter_args,
                                          match_media=media_info,
-                                         in_from=SearchType.WEB)
+                                         in_from=SearchType.WEB,
+                                         on_result=__save_site_results)
     # 使用第二名称重新搜索
     if ident_flag \
             and len(media_list) == 0 \
@@ -149,23 +276,15 @@ def search_medias_for_web(content, ident_flag=True, filters=None, tmdbid=None, m
         media_list = _searcher.search_medias(key_word=second_search_name,
                                              filter_args=filter_args,
                                              match_media=media_info,
-                                             in_from=SearchType.WEB)
-    # 清空缓存结果
-    _searcher.delete_all_search_torrents()
+                                             in_from=SearchType.WEB,
+                                             on_result=__save_site_results)
     # 结束进度
     _process.end(ProgressKey.Search)
     if len(media_list) == 0:
         log.info("【Web】%s 未搜索到任何资源" % content)
         return 1, "%s 未搜索到任何资源" % content
     else:
-        log.info("【Web】共搜索到 %s 个有效资源" % len(media_list))
-        # 插入数据库
-        media_list = sorted(media_list, key=lambda x: "%s%s%s" % (str(x.res_order).rjust(3, '0'),
-                                                                  str(x.site_order).rjust(3, '0'),
-                                                                  str(x.seeders).rjust(10, '0')), reverse=True)
-        _searcher.insert_search_results(media_items=media_list,
-                                        ident_flag=ident_flag,
-                                        title=content)
+        log.info("【Web】共搜索到 %s 个有效资源" % len(saved_keys))
         return 0, ""
 
 def handle_invalid_input(input_str, in_from, user_id):
@@ -1,3 +1,5 @@
+import base64
+import json
 from functools import lru_cache
 
 import cn2an
@@ -193,10 +195,36 @@ class WebUtils:
                     EndPage = total_page
         return range(StartPage, EndPage + 1)
 
+    @staticmethod
+    def encode_cursor(*keys):
+        """
+        将上一页最后一条记录的排序键编码为游标分页的 cursor
+        """
+        return base64.urlsafe_b64encode(json.dumps(keys).encode("utf-8")).decode("utf-8")
+
+    @staticmethod
+    def decode_cursor(cursor, *types):
+        """
+        解析游标分页的 cursor，无效时返回None，从第一页开始
+        :param cursor: encode_cursor 生成的游标
+        :param types: 各排序键的类型，如 (str, int)，个数或类型不符的游标视为无效
+        """
+        if not cursor or not types:
+            return None
+        try:
+            keys = json.loads(base64.urlsafe_b64decode(str(cursor).encode("utf-8")).decode("utf-8"))
+            if not isinstance(keys, list) or len(keys) != len(types):
+                return None
+            if not all(isinstance(key, (str, int, float)) for key in keys):
+                return None
+            return tuple(_type(key) for _type, key in zip(types, keys))
+        except Exception:
+            return None
+
     @staticmethod
     def request_cache(url, cookies=None):
         """
-        带缓存的请求
+        下载图片，缓存由 ImageCacheHelper 负责
         :param url: 图片URL
         :param cookies: 可选的Cookie字典
         """
@@ -40,9 +40,9 @@ from app.brushtask import BrushTask
 from app.conf import ModuleConf, SystemConfig
 from app.downloader import Downloader
 from app.filter import Filter
-from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper
+from app.helper import SecurityHelper, MetaHelper, ChromeHelper, ThreadHelper, ImageCacheHelper
 from app.indexer import Indexer
-from app.media.meta import MetaInfo
+from app.media.meta import MetaInfo, get_metainfo_cache_stats
 from app.mediaserver import MediaServer
 from app.message import Message
 from app.plugins import EventManager
@@ -58,6 +58,7 @@ from web.action import WebAction
 from web.apiv1 import apiv1_bp
 from web.backend.WXBizMsgCrypt3 import WXBizMsgCrypt
 from web.backend.pro_user import ProUser
+from web.backend.search_torrents import SearchResultStream
 from web.backend.wallpaper import get_login_wallpaper
 from web.backend.web_utils import WebUtils
 from web.security import require_auth
@@ -1181,6 +1182,7 @@ def tmdbcache():
                            TotalCount=total_count,
                            Count=len(tmdb_caches),
                            TmdbCaches=tmdb_caches,
+                           MetaInfoStats=get_metainfo_cache_stats(),
                            Search=search_str,
                            CurrentPage=current_page,
                            TotalPage=total_page,
@@ -2161,7 +2163,7 @@ def Img():
         except Exception:
             return make_response("参数错误", 400)
     # 计算Etag
-    etag = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    etag = hashlib.sha256(("%s|%s" % (url, request.args.get('w') or "")).encode('utf-8')).hexdigest()
     # 检查协商缓存
     if_none_match = request.headers.get('If-None-Match')
     if if_none_match and if_none_match == etag:
@@ -2183,7 +2185,9 @@ def Img():
       except Exception:
           pass
       
-      img = WebUtils.request_cache(url, cookies=cookies)
+      img = ImageCacheHelper().get_image(url,
+                                         fetcher=lambda: WebUtils.request_cache(url, cookies=cookies),
+                                         width=request.args.get('w'))
       guess_type, _ = mimetypes.guess_type(url)
       response = Response(
           img,
@@ -2256,6 +2260,27 @@ def stream_progress():
     )
 
 
+@App.route('/stream-search')
+@login_required
+def stream_search():
+    """
+    搜索结果增量推送EventSources响应
+    """
+
+    def __search_events(_search_key):
+        for event in SearchResultStream().listen(_search_key):
+            if event is None:
+                # 保持连接
+                yield ': keepalive\n\n'
+            else:
+                yield 'data: %s\n\n' % json.dumps(event)
+
+    return Response(
+        __search_events(request.args.get("key")),
+        mimetype='text/event-stream'
+    )
+
+
 @Sock.route('/message')
 @login_required
 def message_handler(ws):
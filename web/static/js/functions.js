@@ -24,6 +24,12 @@ let ProgressES;
 let LoggingSource = "";
 // 日志EventSource
 let LoggingES;
+// 搜索结果EventSource
+let SearchES;
+// 搜索结果已按站点增量展示
+let SearchStreamShown = false;
+// 搜索结果页面上次刷新的时间
+let SearchStreamRefreshTime = 0;
 // 消息WebSocket
 let MessageWS;
 // 当前协议
@@ -414,15 +420,73 @@ function navmenu(page, newflag = false) {
   });
 }
 
+// 订阅搜索结果，每个站点完成后即展示已搜索到的资源，返回搜索标识
+function start_search_stream(title) {
+  stop_search_stream();
+  const search_key = new Date().getTime() + "" + Math.floor(Math.random() * 1000);
+  const page = 'search?s=' + title;
+  SearchES = new EventSource(`stream-search?key=${search_key}`);
+  SearchES.onmessage = function (event) {
+    const ret = JSON.parse(event.data);
+    if (ret.event === "done") {
+      stop_search_stream();
+      return;
+    }
+    if (!ret.count) {
+      return;
+    }
+    if (!SearchStreamShown) {
+      // 第一个站点有结果时关闭进度框并跳转到结果页面
+      SearchStreamShown = true;
+      SearchStreamRefreshTime = new Date().getTime();
+      hide_refresh_process();
+      navmenu(page);
+    } else if (CurrentPageUri.startsWith('search') && new Date().getTime() - SearchStreamRefreshTime > 2000) {
+      // 仍在结果页面时刷新，限制刷新频率
+      SearchStreamRefreshTime = new Date().getTime();
+      navmenu(page, true);
+    }
+  };
+  SearchES.onerror = function () {
+    stop_search_stream();
+  };
+  return search_key;
+}
+
+// 停止订阅搜索结果
+function stop_search_stream() {
+  if (SearchES) {
+    SearchES.close();
+    SearchES = undefined;
+  }
+}
+
+// 搜索完成后展示结果页面
+function show_search_result(title) {
+  stop_search_stream();
+  if (SearchStreamShown) {
+    SearchStreamShown = false;
+    // 已跳转到结果页面时只刷新，用户已离开结果页面时不再跳转
+    if (CurrentPageUri.startsWith('search')) {
+      navmenu('search?s=' + title, true);
+    }
+  } else {
+    navmenu('search?s=' + title);
+  }
+}
+
 // 搜索
 function media_search(tmdbid, title, type) {
   const param = {"tmdbid": tmdbid, "search_word": title, "media_type": type};
   show_refresh_progress("正在搜索 " + title + " ...", "search");
+  SearchStreamShown = false;
+  param.search_key = start_search_stream(title);
   ajax_post("search", param, function (ret) {
     hide_refresh_process();
     if (ret.code === 0) {
-      navmenu('search?s=' + title)
+      show_search_result(title);
     } else {
+      stop_search_stream();
       show_fail_modal(ret.msg);
     }
   }, true, false);
@@ -1030,11 +1094,14 @@ function search_mediainfo_media(tmdbid, title, typestr) {
   hide_mediainfo_modal();
   const param = {"tmdbid": tmdbid, "search_word": title, "media_type": typestr};
   show_refresh_progress("正在搜索 " + title + " ...", "search");
+  SearchStreamShown = false;
+  param.search_key = start_search_stream(title);
   ajax_post("search", param, function (ret) {
     hide_refresh_process();
     if (ret.code === 0) {
-      navmenu('search?s=' + title);
+      show_search_result(title);
     } else {
+      stop_search_stream();
       show_fail_modal(ret.msg);
     }
   }, true, false);
@@ -1693,11 +1760,14 @@ function search_media_advanced() {
   const param = {"search_word": keyword, "filters": filters, "unident": true};
   $("#modal-search-advanced").modal("hide");
   show_refresh_progress(`正在搜索 ${keyword} ...`, "search");
+  SearchStreamShown = false;
+  param.search_key = start_search_stream(keyword);
   ajax_post("search", param, function (ret) {
     hide_refresh_process();
     if (ret.code === 0) {
-      navmenu(`search?s=${keyword}`);
+      show_search_result(keyword);
     } else {
+      stop_search_stream();
       show_fail_modal(ret.msg, function () {
         $("#modal-search-advanced").modal("show");
       });